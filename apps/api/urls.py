@@ -5,4 +5,6 @@ app_name = 'api'
 
 urlpatterns = [
     path('', views.api_index, name='index'),
+    path('metrics/throttles/', views.throttle_stats, name='throttle_stats'),
+    path('metrics/cache/', views.cache_stats, name='cache_stats'),
 ]
@@ -1,5 +1,21 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.http import JsonResponse
 
+from apps.core.cache import get_cache_stats
+from apps.users.throttling import get_throttle_stats
+
 
 def api_index(request):
     return JsonResponse({'status': 'ok', 'service': 'TeamUp API placeholder'})
+
+
+@staff_member_required
+def throttle_stats(request):
+    """Allowed/blocked counters for the auth throttles (monitoring)."""
+    return JsonResponse({'throttles': get_throttle_stats()})
+
+
+@staff_member_required
+def cache_stats(request):
+    """Hit/miss counters per cache namespace (monitoring)."""
+    return JsonResponse({'cache': get_cache_stats()})
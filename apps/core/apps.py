@@ -5,3 +5,8 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
     verbose_name = 'Core (public)'
+
+    def ready(self):
+        from . import checks  # noqa: F401 - registers the system checks
+        from .signals import connect_versioned_models
+        connect_versioned_models()
@@ -0,0 +1,189 @@
+"""
+Shared cache helpers used by every app.
+
+Keys are namespaced (``<namespace>:<part>:<part>``) so apps can't collide, and
+each namespace can carry a version token. Bumping the token makes every key
+written under the old version unreachable, which is how we invalidate whole
+groups of entries without knowing their keys. Models listed in
+``settings.CACHE_VERSIONED_MODELS`` get their namespace bumped automatically
+on save/delete (wired up in ``CoreConfig.ready``).
+
+Hits and misses are counted per namespace in the cache itself so the numbers
+add up across workers; see ``get_cache_stats``. Each process tallies them in
+memory and adds them to the shared counters in one batch every
+``CACHE_STATS_FLUSH_INTERVAL`` seconds or ``CACHE_STATS_FLUSH_EVERY`` reads,
+so a cache read doesn't cost extra writes to the cache (on the file backend,
+each of those is a file rewrite and a directory scan).
+"""
+
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULT_TIMEOUT = getattr(settings, 'CACHE_DEFAULT_TIMEOUT', 60 * 5)
+
+_MISSING = object()
+
+
+def make_key(namespace, *parts):
+    """Build a namespaced cache key, e.g. make_key('search', 'football', 3)."""
+    return ':'.join([namespace, *(str(part) for part in parts)])
+
+
+# ===== Versioning =====
+
+def get_version(namespace):
+    """Current version token of a namespace, created on first use."""
+    key = make_key('version', namespace)
+    version = cache.get(key)
+    if version is None:
+        # A fresh token (rather than 1) guarantees an evicted version never
+        # resurrects entries written under an older one
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    """Invalidate everything cached under a namespace."""
+    cache.set(make_key('version', namespace), time.time_ns(), None)
+
+
+def get_versions(*namespaces):
+    """Version tokens for several namespaces in one round trip."""
+    keys = {make_key('version', namespace): namespace for namespace in namespaces}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, namespace in keys.items():
+        versions[namespace] = found[key] if key in found else get_version(namespace)
+    return versions
+
+
+def versioned_key(namespace, *parts, depends_on=()):
+    """
+    Key that changes whenever `namespace` or any namespace in `depends_on` is bumped.
+    """
+    versions = get_versions(namespace, *depends_on)
+    tokens = [versions[ns] for ns in (namespace, *depends_on)]
+    return make_key(namespace, *parts, 'v' + '.'.join(str(token) for token in tokens))
+
+
+def model_namespace(model):
+    """Namespace used for a model's version token, e.g. 'model:users.userprofile'."""
+    return f'model:{model._meta.label_lower}'
+
+
+def get_model_version(model):
+    return get_version(model_namespace(model))
+
+
+def bump_model_version(model):
+    bump_version(model_namespace(model))
+
+
+# ===== Instrumented access =====
+
+class HitCounter:
+    """Per-process hit/miss tallies, added to the shared counters in batches."""
+
+    flush_interval = property(lambda self: getattr(settings, 'CACHE_STATS_FLUSH_INTERVAL', 10))
+    flush_every = property(lambda self: getattr(settings, 'CACHE_STATS_FLUSH_EVERY', 200))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # (namespace, outcome) -> count
+        self._reads = 0
+        self._flushed_at = time.monotonic()
+        atexit.register(self.flush)
+
+    def count(self, namespace, outcome, n=1):
+        if not n:
+            return
+        with self._lock:
+            self._pending[(namespace, outcome)] = self._pending.get((namespace, outcome), 0) + n
+            self._reads += n
+            due = self._reads >= self.flush_every or time.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Add the tallies to the shared counters."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._reads = 0
+            self._flushed_at = time.monotonic()
+        for (namespace, outcome), n in pending.items():
+            key = make_key('stats', namespace, outcome)
+            cache.add(key, 0, None)
+            try:
+                cache.incr(key, n)
+            except ValueError:
+                cache.set(key, n, None)
+
+    def reset(self):
+        with self._lock:
+            self._pending = {}
+            self._reads = 0
+
+
+hit_counter = HitCounter()
+
+
+def _count(namespace, outcome, n=1):
+    hit_counter.count(namespace, outcome, n)
+
+
+def cached_get(namespace, key, default=None):
+    """cache.get() that records a hit or miss for `namespace`."""
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        _count(namespace, 'misses')
+        return default
+    _count(namespace, 'hits')
+    return value
+
+
+def cached_get_many(namespace, keys):
+    """cache.get_many() that records hits and misses for `namespace`."""
+    found = cache.get_many(list(keys))
+    _count(namespace, 'hits', len(found))
+    _count(namespace, 'misses', len(keys) - len(found))
+    return found
+
+
+def get_or_compute(namespace, key, compute, timeout=DEFAULT_TIMEOUT, should_cache=None):
+    """
+    Return the cached value for `key`, computing and storing it on a miss.
+    `should_cache(value)` can veto storing a result (e.g. error messages).
+    """
+    value = cached_get(namespace, key, _MISSING)
+    if value is not _MISSING:
+        return value
+    value = compute()
+    if should_cache is None or should_cache(value):
+        cache.set(key, value, timeout)
+    return value
+
+
+def get_cache_stats(namespaces=None):
+    """Hit/miss counts and hit ratio per namespace (this process's tallies included)."""
+    hit_counter.flush()
+    if namespaces is None:
+        namespaces = getattr(settings, 'CACHE_STATS_NAMESPACES', [])
+    keys = [make_key('stats', ns, outcome) for ns in namespaces for outcome in ('hits', 'misses')]
+    found = cache.get_many(keys)
+    stats = {}
+    for namespace in namespaces:
+        hits = found.get(make_key('stats', namespace, 'hits'), 0)
+        misses = found.get(make_key('stats', namespace, 'misses'), 0)
+        total = hits + misses
+        stats[namespace] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 3) if total else None,
+        }
+    return stats
+
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """locmem is per process: with several workers, versions and counters would diverge."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if settings.DEBUG or not backend.endswith('.LocMemCache'):
+        return []
+    return [
+        Warning(
+            'The default cache is per-process memory (locmem) with DEBUG off.',
+            hint='Set CACHE_BACKEND to file, memcached or redis so every worker shares the cache.',
+            id='core.W001',
+        )
+    ]
@@ -0,0 +1,94 @@
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter: times django.setup() and loading the URLconf
+# (which imports every view module), then reports which modules were loaded
+CHILD = '''
+import os, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls_done = time.perf_counter()
+print('setup_ms', (setup_done - started) * 1000)
+print('urls_ms', (urls_done - setup_done) * 1000)
+for name in {watch!r}:
+    print('loaded', name, name in sys.modules)
+'''
+
+# Heavy modules that should only load on first use
+WATCHED_MODULES = ('google.generativeai', 'markdown', 'PIL.Image', 'numpy')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures django.setup() and URLconf load time in fresh interpreters and '
+        'lists the slowest imports (python -X importtime).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5,
+                            help='Interpreters started; medians are reported (default: 5)')
+        parser.add_argument('--top', type=int, default=15,
+                            help='Number of slowest top-level imports to list (default: 15)')
+
+    def handle(self, *args, **options):
+        code = CHILD.format(settings_module=os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+                            watch=WATCHED_MODULES)
+        setup_times, url_times = [], []
+        for _ in range(options['runs']):
+            result = self.run_child(code)
+            setup_times.append(result['setup_ms'])
+            url_times.append(result['urls_ms'])
+
+        setup_ms, urls_ms = statistics.median(setup_times), statistics.median(url_times)
+        self.stdout.write(f'Startup benchmark (median of {options["runs"]} runs)\n')
+        self.stdout.write(f'{"django.setup()":<24} {setup_ms:>9.1f} ms')
+        self.stdout.write(f'{"URLconf load":<24} {urls_ms:>9.1f} ms')
+        self.stdout.write(f'{"total":<24} {setup_ms + urls_ms:>9.1f} ms\n')
+
+        self.stdout.write('Watched modules loaded at startup:')
+        for name in WATCHED_MODULES:
+            self.stdout.write(f'  {name:<22} {"yes" if result["loaded"][name] else "no"}')
+
+        self.stdout.write('\nSlowest top-level imports (cumulative, last run):')
+        for module, micros in result['imports'][:options['top']]:
+            self.stdout.write(f'  {micros / 1000:>9.1f} ms  {module}')
+
+    def run_child(self, code):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        result = {'loaded': {}}
+        for line in completed.stdout.splitlines():
+            parts = line.split()
+            if parts[0] == 'loaded':
+                result['loaded'][parts[1]] = parts[2] == 'True'
+            elif len(parts) == 2:
+                result[parts[0]] = float(parts[1])
+        result['imports'] = self.parse_importtime(completed.stderr)
+        return result
+
+    def parse_importtime(self, stderr):
+        """[(module, cumulative us)] for top-level imports, slowest first."""
+        imports = []
+        for line in stderr.splitlines():
+            # "import time:       self [us] |  cumulative | imported package"
+            if not line.startswith('import time:') or '[us]' in line:
+                continue
+            _self_us, cumulative, name = line[len('import time:'):].split('|')
+            # Nested imports are indented under the module that triggered them
+            if name.startswith('  '):
+                continue
+            imports.append((name.strip(), int(cumulative)))
+        imports.sort(key=lambda item: item[1], reverse=True)
+        return imports
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        'Compiles all templates, builds the URL resolver, loads the static '
+        'manifest and primes hot cache entries, reporting how long each step took.'
+    )
+
+    def handle(self, *args, **options):
+        timings = warm_up()
+        total = 0
+        for name, elapsed, result in timings:
+            total += elapsed
+            if name == 'templates':
+                compiled, failed = result
+                detail = f'{compiled} compiled'
+                if failed:
+                    detail += f', {len(failed)} failed'
+                    for failure in failed:
+                        self.stdout.write(self.style.WARNING(f'  {failure}'))
+            else:
+                detail = str(result)
+            self.stdout.write(f'{name:<16} {elapsed:8.1f} ms  ({detail})')
+        self.stdout.write(self.style.SUCCESS(f'Warm-up finished in {total:.1f} ms'))
@@ -0,0 +1,116 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .staticfiles import is_hashed_name
+
+# (Accept-Encoding token, file suffix), best first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(header):
+    """{coding: q-value} of an Accept-Encoding header ("br;q=0" is a refusal)."""
+    accepted = {}
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """
+    Serves collected static files straight from STATIC_ROOT when no reverse
+    proxy is in front of Django (SERVE_STATIC=True, DEBUG off).
+
+    Picks the pre-compressed .br/.gz variant the client accepts and marks
+    content-hashed files as immutable so browsers never revalidate them.
+    Files found are memoised per worker: collected files don't change while
+    the process runs. Misses aren't, so arbitrary URLs can't grow the memo.
+    """
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not getattr(settings, 'SERVE_STATIC', False):
+            # runserver's staticfiles handler covers DEBUG
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.root = str(settings.STATIC_ROOT)
+        self.prefix = '/' + settings.STATIC_URL.strip('/') + '/'
+        self.max_age = getattr(settings, 'STATIC_MAX_AGE', 60 * 60)
+        self.files = {}
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            response = self.serve(request, request.path_info[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def find(self, name):
+        """Return (path, stat, available encodings) for a collected file, or None."""
+        entry = self.files.get(name)
+        if entry is not None:
+            return entry
+        try:
+            path = safe_join(self.root, name)
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        if os.path.isdir(path):
+            return None
+        encodings = [
+            (encoding, path + suffix)
+            for encoding, suffix in ENCODINGS
+            if os.path.exists(path + suffix)
+        ]
+        entry = self.files[name] = (path, stat, encodings)
+        return entry
+
+    def serve(self, request, name):
+        entry = self.find(name)
+        if entry is None:
+            return None
+        path, stat, encodings = entry
+
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            return HttpResponseNotModified()
+
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding, serve_path = None, path
+        # Highest q-value wins; ties go to the first in ENCODINGS (max keeps the first)
+        candidates = [
+            (accepted.get(candidate, accepted.get('*', 0)), candidate, variant)
+            for candidate, variant in encodings
+        ]
+        if candidates:
+            quality, candidate, variant = max(candidates, key=lambda item: item[0])
+            if quality > 0:
+                encoding, serve_path = candidate, variant
+
+        content_type, _ = mimetypes.guess_type(path)
+        response = FileResponse(open(serve_path, 'rb'), content_type=content_type or 'application/octet-stream')
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if encodings:
+            response['Vary'] = 'Accept-Encoding'
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if is_hashed_name(name):
+            response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={self.max_age}'
+        return response
@@ -0,0 +1,18 @@
+from django.apps import apps
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+
+from .cache import bump_model_version
+
+
+def bump_model_cache_version(sender, **kwargs):
+    """Any write to a versioned model invalidates what was cached for it."""
+    bump_model_version(sender)
+
+
+def connect_versioned_models():
+    for label in getattr(settings, 'CACHE_VERSIONED_MODELS', []):
+        model = apps.get_model(label)
+        uid = f'core.cache_version:{label}'
+        post_save.connect(bump_model_cache_version, sender=model, dispatch_uid=uid)
+        post_delete.connect(bump_model_cache_version, sender=model, dispatch_uid=uid)
@@ -0,0 +1,231 @@
+"""
+Static files storage used by collectstatic.
+
+On top of Django's ManifestStaticFilesStorage (content-hashed file names, so
+they can be cached forever) this storage:
+
+- tolerates the broken url() references shipped with the vendor theme instead
+  of aborting collectstatic;
+- deduplicates identical files: ``static/assets`` and ``static/core`` are two
+  copies of the same theme, so every group of identical files is hard-linked to
+  a single inode and the manifest points all of them at one canonical hashed
+  URL (the browser downloads and caches it once);
+- pre-compresses text assets to ``.gz`` (and ``.br`` when the optional
+  ``brotli`` package is installed), skipping variants that are already up to
+  date so repeated collectstatic runs stay cheap.
+
+The compressed variants are served by ``apps.core.middleware.StaticFilesMiddleware``
+when no reverse proxy sits in front of Django.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.html', '.txt', '.xml',
+    '.eot', '.ttf', '.otf', '.ico',
+}
+# Below this size compression saves less than a TCP packet
+MIN_COMPRESS_SIZE = 1024
+VARIANT_SUFFIXES = ('.br', '.gz')
+
+# Names produced by ManifestStaticFilesStorage.hashed_name, e.g. app.3f2a9c1b0d4e.css
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME_RE.search(name))
+
+
+def _file_digest(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _is_fresh(variant, source):
+    return os.path.exists(variant) and os.path.getmtime(variant) >= os.path.getmtime(source)
+
+
+def compress_file(path):
+    """Write .gz/.br next to `path` when worthwhile. Returns the suffixes written or kept."""
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+        return []
+    size = os.path.getsize(path)
+    if size < MIN_COMPRESS_SIZE:
+        return []
+
+    written = []
+    data = None
+    compressors = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressors.insert(0, ('.br', lambda raw: brotli.compress(raw, quality=11)))
+
+    for suffix, compress in compressors:
+        variant = path + suffix
+        if _is_fresh(variant, path):
+            written.append(suffix)
+            continue
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        compressed = compress(data)
+        # Not worth serving if it barely shrinks
+        if len(compressed) >= size * 0.95:
+            if os.path.exists(variant):
+                os.remove(variant)
+            continue
+        # Write beside and swap in, so a variant hard-linked to other copies is never rewritten in place
+        tmp = f'{variant}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp, variant)
+        written.append(suffix)
+    return written
+
+
+def _link(source, target):
+    """Replace `target` with a hard link to `source`; copy when links aren't supported."""
+    if os.path.exists(target) and os.path.samefile(source, target):
+        return
+    tmp = f'{target}.tmp-link'
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copyfile(source, tmp)
+    os.replace(tmp, target)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    manifest_strict = False
+    max_workers = min(8, os.cpu_count() or 1)
+
+    def stored_name(self, name):
+        # Fall back to the plain name when collectstatic hasn't been run
+        # (tests, fresh checkouts) instead of raising on every {% static %}.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def tolerant_converter(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                # Vendor CSS references a file that isn't shipped; leave it as is
+                return matchobj.group('matched')
+
+        return tolerant_converter
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        started = time.perf_counter()
+        stats = self.dedupe_and_compress()
+        self.save_manifest()
+        logger.info(
+            'Static post-processing: %(files)d files, %(duplicates)d duplicates linked '
+            '(%(saved_bytes)d bytes saved), %(compressed)d compressed in %(seconds).1fs',
+            dict(stats, seconds=time.perf_counter() - started),
+        )
+
+    def _collected_files(self):
+        """(name, path, stat) for every collected file, compressed variants excluded."""
+        location = os.path.join(str(self.location), '')
+        collected = []
+        for root, _dirs, files in os.walk(location):
+            for filename in files:
+                if filename.endswith(VARIANT_SUFFIXES) or filename == self.manifest_name:
+                    continue
+                path = os.path.join(root, filename)
+                name = path[len(location):].replace(os.sep, '/')
+                collected.append((name, path, os.stat(path)))
+        return collected
+
+    def dedupe_and_compress(self):
+        """
+        Group identical files, compress one member per group, hard-link the
+        rest (variants included) and point the manifest at one canonical URL.
+        """
+        collected = self._collected_files()
+
+        # Only files of equal size can be identical; files already sharing an
+        # inode (linked by a previous run) are hashed once
+        by_size = {}
+        for name, path, stat in collected:
+            by_size.setdefault(stat.st_size, []).append((name, path, stat))
+
+        groups = {}
+        digests = {}
+        for size, members in by_size.items():
+            if len(members) == 1:
+                groups[('size', size)] = members
+                continue
+            for name, path, stat in members:
+                inode = (stat.st_dev, stat.st_ino)
+                if inode not in digests:
+                    digests[inode] = _file_digest(path)
+                groups.setdefault(digests[inode], []).append((name, path, stat))
+
+        canonical = {}
+        for members in groups.values():
+            members.sort()
+            hashed = [member for member in members if is_hashed_name(member[0])]
+            chosen_name, chosen_path, _stat = (hashed or members)[0]
+            for name, _path, _stat in members:
+                canonical[name] = (chosen_name, chosen_path)
+
+        chosen_paths = {path for _name, path in canonical.values()}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            variants = dict(zip(chosen_paths, pool.map(compress_file, chosen_paths)))
+
+        chosen_stats = {path: stat for _name, path, stat in collected if path in chosen_paths}
+        duplicates = saved = 0
+        for name, path, stat in collected:
+            chosen_path = canonical[name][1]
+            if chosen_path == path:
+                continue
+            duplicates += 1
+            chosen_stat = chosen_stats[chosen_path]
+            if (stat.st_dev, stat.st_ino) != (chosen_stat.st_dev, chosen_stat.st_ino):
+                saved += stat.st_size
+                _link(chosen_path, path)
+            for suffix in VARIANT_SUFFIXES:
+                if suffix in variants[chosen_path]:
+                    _link(chosen_path + suffix, path + suffix)
+                elif os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+        # Same content -> same URL, whichever theme copy the template asked for
+        for name, hashed_name in self.hashed_files.items():
+            if hashed_name in canonical:
+                self.hashed_files[name] = canonical[hashed_name][0]
+
+        return {
+            'files': len(canonical),
+            'duplicates': duplicates,
+            'saved_bytes': saved,
+            'compressed': sum(1 for suffixes in variants.values() if suffixes),
+        }
@@ -0,0 +1,159 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+
+from apps.core.cache import (
+    bump_model_version, get_cache_stats, get_model_version, get_or_compute, hit_counter,
+    make_key, versioned_key,
+)
+from apps.core.middleware import StaticFilesMiddleware
+from apps.core.staticfiles import CompressedManifestStaticFilesStorage
+from apps.search.cities import city_autocomplete
+from apps.search.profile_store import profile_store
+from apps.users.models import User, UserProfile
+
+
+class SharedCacheHelpersTestCase(TestCase):
+    """Test cases for the namespaced, versioned cache helpers."""
+    
+    def setUp(self):
+        cache.clear()
+        hit_counter.reset()
+    
+    def test_make_key(self):
+        self.assertEqual(make_key('search', 'football', 3), 'search:football:3')
+    
+    def test_bumping_a_dependency_changes_the_key(self):
+        """Keys built with depends_on move when the dependency is bumped."""
+        before = versioned_key('ai_insight', 1, depends_on=('model:user_sessions.invitation',))
+        self.assertEqual(before, versioned_key('ai_insight', 1, depends_on=('model:user_sessions.invitation',)))
+        
+        from apps.sessions.models import Invitation
+        bump_model_version(Invitation)
+        self.assertNotEqual(before, versioned_key('ai_insight', 1, depends_on=('model:user_sessions.invitation',)))
+    
+    def test_model_save_bumps_version(self):
+        """Saving a model listed in CACHE_VERSIONED_MODELS bumps its version."""
+        version = get_model_version(UserProfile)
+        user = User.objects.create_user(email='versioned@example.com', password='testpass123')
+        UserProfile.objects.create(user=user, first_name='Version')
+        self.assertNotEqual(version, get_model_version(UserProfile))
+    
+    def test_get_or_compute_counts_hits_and_misses(self):
+        """Misses compute once, hits are served from the cache, both are counted."""
+        calls = []
+        compute = lambda: calls.append(1) or 'value'
+        
+        for _ in range(3):
+            self.assertEqual(get_or_compute('demo', 'demo:key', compute), 'value')
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(get_cache_stats(['demo'])['demo'], {'hits': 2, 'misses': 1, 'hit_ratio': 0.667})
+    
+    @override_settings(CACHE_STATS_FLUSH_EVERY=1000, CACHE_STATS_FLUSH_INTERVAL=3600)
+    def test_hit_counts_are_written_in_batches(self):
+        """Reads are tallied in memory; the shared counters are updated when the batch is flushed."""
+        for _ in range(3):
+            get_or_compute('demo', 'demo:batched', lambda: 'value')
+        self.assertIsNone(cache.get(make_key('stats', 'demo', 'hits')))
+        
+        self.assertEqual(get_cache_stats(['demo'])['demo']['hits'], 2)
+        self.assertEqual(cache.get(make_key('stats', 'demo', 'hits')), 2)
+    
+    def test_should_cache_veto(self):
+        """Results rejected by should_cache are recomputed next time."""
+        calls = []
+        compute = lambda: calls.append(1) or 'Failed to generate'
+        for _ in range(2):
+            get_or_compute('demo', 'demo:error', compute, should_cache=lambda text: not text.startswith('Failed'))
+        self.assertEqual(len(calls), 2)
+
+
+class StaticPipelineTestCase(TestCase):
+    """Test cases for static deduplication, pre-compression and serving."""
+    
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        css = b'body { color: #333; }\n' * 200
+        for tree in ('assets', 'core'):
+            os.makedirs(os.path.join(self.root, tree, 'css'))
+            with open(os.path.join(self.root, tree, 'css', 'theme.css'), 'wb') as f:
+                f.write(css)
+        self.storage = CompressedManifestStaticFilesStorage(location=self.root)
+        self.storage.hashed_files = {
+            'assets/css/theme.css': 'assets/css/theme.css',
+            'core/css/theme.css': 'core/css/theme.css',
+        }
+    
+    def test_identical_files_are_linked_and_share_one_url(self):
+        stats = self.storage.dedupe_and_compress()
+        
+        assets = os.path.join(self.root, 'assets', 'css', 'theme.css')
+        core = os.path.join(self.root, 'core', 'css', 'theme.css')
+        self.assertEqual(stats['duplicates'], 1)
+        self.assertTrue(os.path.samefile(assets, core))
+        self.assertTrue(os.path.samefile(assets + '.gz', core + '.gz'))
+        self.assertEqual(self.storage.hashed_files['core/css/theme.css'], 'assets/css/theme.css')
+    
+    def test_middleware_serves_compressed_variant(self):
+        self.storage.dedupe_and_compress()
+        
+        with override_settings(DEBUG=False, SERVE_STATIC=True, STATIC_ROOT=self.root):
+            response = Client().get('/static/core/css/theme.css', HTTP_ACCEPT_ENCODING='gzip, deflate')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            
+            response = Client().get('/static/core/css/theme.css')
+            self.assertNotIn('Content-Encoding', response)
+            
+            response = Client().get('/static/core/css/theme.css', HTTP_ACCEPT_ENCODING='br;q=0, gzip;q=0')
+            self.assertNotIn('Content-Encoding', response)
+    
+    def test_middleware_memoises_only_found_files(self):
+        with override_settings(DEBUG=False, SERVE_STATIC=True, STATIC_ROOT=self.root):
+            middleware = StaticFilesMiddleware(lambda request: None)
+            self.assertIsNone(middleware.find('core/css/missing.css'))
+            self.assertIsNotNone(middleware.find('core/css/theme.css'))
+        
+        self.assertEqual(list(middleware.files), ['core/css/theme.css'])
+
+
+class WarmupTestCase(TestCase):
+    """Test cases for the worker warm-up command."""
+    
+    def setUp(self):
+        # Warm-up fills these from this test's database; don't leak them into other tests
+        self.addCleanup(city_autocomplete.reset)
+        self.addCleanup(profile_store.reset)
+    
+    def test_reports_every_step(self):
+        """Each step is timed and templates compile without errors."""
+        out = StringIO()
+        call_command('warmup', stdout=out)
+        output = out.getvalue()
+        
+        for step in ('templates', 'urls', 'static manifest', 'caches', 'city autocomplete', 'search facets', 'profile store'):
+            self.assertIn(step, output)
+        self.assertNotIn('failed', output)
+        self.assertIn('Warm-up finished', output)
+
+
+class StartupImportsTestCase(TestCase):
+    """Heavy optional dependencies must not load at startup."""
+    
+    def test_setup_and_urlconf_skip_heavy_modules(self):
+        """A fresh django.setup() + URLconf load imports neither Gemini, markdown, Pillow nor NumPy."""
+        out = StringIO()
+        call_command('benchmark_startup', runs=1, top=0, stdout=out)
+        output = out.getvalue()
+        
+        self.assertIn('URLconf load', output)
+        for name in ('google.generativeai', 'markdown', 'PIL.Image', 'numpy'):
+            self.assertRegex(output, rf'{name}\s+no')
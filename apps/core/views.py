@@ -1,4 +1,8 @@
+from django.conf import settings
 from django.shortcuts import render
+from django.views.static import serve
+
+from apps.users.storage import is_content_addressed
 
 
 def index(request):
@@ -9,3 +13,14 @@ def index(request):
 def dashboard_index(request):
     """Dashboard view moved into core (Medium layout): simple placeholder."""
     return render(request, 'core/dashboard.html')
+
+
+def immutable_media(request, path):
+    """
+    Serve MEDIA_ROOT when there is no reverse proxy. Content-addressed files
+    never change under the same name, so they are cached forever.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if response.status_code == 200 and is_content_addressed(path):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -0,0 +1,121 @@
+"""
+Worker warm-up.
+
+Django compiles a template, builds the URL resolver's lookup tables and loads
+the static manifest lazily, on the first request that needs them. With large
+templates (``sessions/list.html``, the ``users/*_minimal.html`` pages) that
+first request per worker is noticeably slow. ``warm_up()`` does all of it up
+front; run it from ``python manage.py warmup`` or let ``config/wsgi.py`` call
+it before the worker serves traffic (``WARMUP_ON_STARTUP=True``), which then
+closes the database connections warm-up opened so forked workers each open
+their own.
+
+Apps add their own steps with ``register_step`` from ``AppConfig.ready()``
+(the search app warms its city trie, facet counts and profile snapshot).
+
+Templates stay compiled afterwards because Django's cached template loader
+(the default in 4.2 unless ``loaders`` is set) keeps every compiled template
+for the life of the process.
+"""
+
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.urls import URLResolver, get_resolver
+
+from .cache import get_versions, model_namespace
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def warm_templates():
+    """Compile every template the engines can find. Returns (count, failed names)."""
+    compiled, failed = 0, []
+    for engine in engines.all():
+        seen = set()
+        for directory in engine.template_dirs:
+            directory = str(directory)
+            for root, _dirs, files in os.walk(directory):
+                for filename in files:
+                    if not filename.endswith(TEMPLATE_EXTENSIONS):
+                        continue
+                    name = os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+                    if name in seen:
+                        # Shadowed by an earlier directory; get_template would return that one
+                        continue
+                    seen.add(name)
+                    try:
+                        engine.get_template(name)
+                    except (TemplateDoesNotExist, TemplateSyntaxError, UnicodeDecodeError) as e:
+                        failed.append(f'{name}: {e}')
+                    else:
+                        compiled += 1
+    return compiled, failed
+
+
+def warm_urls():
+    """Build the reverse/namespace tables of every resolver. Returns the pattern count."""
+    def populate(resolver):
+        resolver.reverse_dict  # noqa: B018 - triggers _populate()
+        count = 0
+        for pattern in resolver.url_patterns:
+            count += populate(pattern) if isinstance(pattern, URLResolver) else 1
+        return count
+
+    return populate(get_resolver())
+
+
+def warm_static():
+    """Load the static manifest. Returns the number of entries."""
+    return len(getattr(staticfiles_storage, 'hashed_files', {}))
+
+
+def warm_caches():
+    """Open the database connection and fetch the version tokens every page reads."""
+    for alias in connections:
+        connections[alias].ensure_connection()
+    namespaces = [
+        model_namespace(apps.get_model(label))
+        for label in getattr(settings, 'CACHE_VERSIONED_MODELS', [])
+    ]
+    get_versions(*namespaces)
+    return len(namespaces)
+
+
+STEPS = [
+    ('templates', warm_templates),
+    ('urls', warm_urls),
+    ('static manifest', warm_static),
+    ('caches', warm_caches),
+]
+
+
+def register_step(name, step):
+    """Run `step` (no arguments; its result is reported) after the built-in steps."""
+    if all(existing != name for existing, _step in STEPS):
+        STEPS.append((name, step))
+
+
+def warm_up():
+    """Run every step. Returns [(step, milliseconds, result)]."""
+    timings = []
+    for name, step in STEPS:
+        started = time.perf_counter()
+        try:
+            result = step()
+        except Exception as e:
+            # Whatever wasn't warmed is built by the first request that needs it
+            logger.exception('Warm-up %s failed', name)
+            result = f'failed: {e}'
+        elapsed = (time.perf_counter() - started) * 1000
+        timings.append((name, elapsed, result))
+        logger.info('Warm-up %s: %.1f ms', name, elapsed)
+    return timings
@@ -1,22 +1,25 @@
 from django.contrib import admin
-from .models import SearchFilter, PartnerRecommendation, SearchHistory
+from .models import (
+    SearchFilter, SearchAlert, PartnerRecommendation, RecommendationGeneration, DismissedPartner, SearchHistory,
+    DailySearchRollup,
+)
 
 # DON'T import or register UserProfile - it's managed by apps.users
 
 
 @admin.register(SearchFilter)
 class SearchFilterAdmin(admin.ModelAdmin):
-    list_display = ['name', 'user', 'sport_type', 'level', 'is_favorite', 'created_at']
-    list_filter = ['is_favorite', 'sport_type', 'level', 'created_at']
+    list_display = ['name', 'user', 'sport_type', 'level', 'is_favorite', 'alerts_enabled', 'created_at']
+    list_filter = ['is_favorite', 'alerts_enabled', 'sport_type', 'level', 'created_at']
     search_fields = ['name', 'user__username', 'user__email', 'location']
     readonly_fields = ['created_at']
     
     fieldsets = (
         ('Filter Info', {
-            'fields': ('user', 'name', 'is_favorite')
+            'fields': ('user', 'name', 'is_favorite', 'alerts_enabled')
         }),
         ('Search Criteria', {
-            'fields': ('sport_type', 'location', 'max_distance_km', 'level')
+            'fields': ('sport_type', 'location', 'country', 'max_distance_km', 'level')
         }),
         ('Availability', {
             'fields': ('availability_days', 'availability_times')
@@ -27,22 +30,33 @@ class SearchFilterAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(SearchAlert)
+class SearchAlertAdmin(admin.ModelAdmin):
+    """Saved-search matches; queued on profile save, emailed by send_search_alerts."""
+    list_display = ['search_filter', 'user', 'profile', 'created_at', 'sent_at']
+    list_filter = ['sent_at', 'created_at']
+    search_fields = ['search_filter__name', 'user__email', 'profile__user__email']
+    list_select_related = ['search_filter', 'user', 'profile__user']
+    raw_id_fields = ['search_filter', 'user', 'profile']
+    readonly_fields = ['created_at']
+
+
 @admin.register(PartnerRecommendation)
 class PartnerRecommendationAdmin(admin.ModelAdmin):
-    list_display = ['user', 'recommended_user', 'match_score', 'is_viewed', 'is_dismissed', 'created_at']
-    list_filter = ['is_viewed', 'is_dismissed', 'created_at']
+    list_display = ['user', 'recommended_user', 'match_score', 'generation', 'is_viewed', 'is_dismissed', 'created_at']
+    list_filter = ['is_viewed', 'is_dismissed', 'is_liked', 'created_at']
     search_fields = ['user__username', 'user__email', 'recommended_user__username', 'recommended_user__email']
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'generation']
     
     fieldsets = (
         ('Recommendation', {
-            'fields': ('user', 'recommended_user', 'match_score')
+            'fields': ('user', 'recommended_user', 'match_score', 'generation')
         }),
         ('Explanation', {
             'fields': ('explanation', 'reasons')
         }),
         ('Status', {
-            'fields': ('is_viewed', 'is_dismissed', 'created_at')
+            'fields': ('is_viewed', 'is_dismissed', 'is_liked', 'created_at')
         }),
     )
     
@@ -51,16 +65,41 @@ class PartnerRecommendationAdmin(admin.ModelAdmin):
         return qs.select_related('user', 'recommended_user')
 
 
+@admin.register(RecommendationGeneration)
+class RecommendationGenerationAdmin(admin.ModelAdmin):
+    """Live recommendation generation per user; flipped by apps.search.generations."""
+    list_display = ['user', 'current', 'published_at']
+    search_fields = ['user__username', 'user__email']
+    list_select_related = ['user']
+    readonly_fields = ['user', 'current', 'published_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(DismissedPartner)
+class DismissedPartnerAdmin(admin.ModelAdmin):
+    """Partners never recommended again; delete a row to let the pair be suggested."""
+    list_display = ['user', 'partner', 'created_at']
+    search_fields = ['user__username', 'user__email', 'partner__username', 'partner__email']
+    list_select_related = ['user', 'partner']
+    raw_id_fields = ['user', 'partner']
+    readonly_fields = ['created_at']
+
+
 @admin.register(SearchHistory)
 class SearchHistoryAdmin(admin.ModelAdmin):
-    list_display = ['user', 'search_query', 'results_count', 'created_at']
+    list_display = ['user', 'search_query', 'results_count', 'repeat_count', 'created_at']
     list_filter = ['created_at']
     search_fields = ['user__username', 'user__email', 'search_query']
     readonly_fields = ['created_at']
+    list_select_related = ['user']
+    # Skip the COUNT(*) over the whole table on every changelist page
+    show_full_result_count = False
     
     fieldsets = (
         ('Search Info', {
-            'fields': ('user', 'search_query', 'results_count')
+            'fields': ('user', 'search_query', 'results_count', 'repeat_count')
         }),
         ('Filters Used', {
             'fields': ('filters_used',)
@@ -68,4 +107,17 @@ class SearchHistoryAdmin(admin.ModelAdmin):
         ('Metadata', {
             'fields': ('created_at',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(DailySearchRollup)
+class DailySearchRollupAdmin(admin.ModelAdmin):
+    """Search analytics; built by the rollup_search_history command."""
+    list_display = ['day', 'search_query', 'searches', 'users', 'average_results']
+    list_filter = ['day']
+    search_fields = ['search_query']
+    date_hierarchy = 'day'
+    readonly_fields = ['day', 'search_query', 'filters_used', 'filters_key', 'searches', 'users', 'results_total']
+
+    def has_add_permission(self, request):
+        return False
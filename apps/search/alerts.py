@@ -0,0 +1,123 @@
+"""
+Saved-search alerts: "notify me when a new partner matches".
+
+Matching runs the other way round from a search (percolator style): when a
+UserProfile is created or its sports, city or country change, we look up
+the saved filters that could match it and evaluate only those, instead of
+re-running every saved search.
+
+The reverse index is ``search_filter_alert_idx`` on
+(alerts_enabled, sport_key, country, city_key), the keys being derived from
+the filter in ``SearchFilter.save()``. A profile playing tennis and football
+in Sfax, Tunisia is looked up as::
+
+    sport_key IN ('tennis', 'football', '')
+    AND country IN ('TN', '') AND city_key IN ('sfax', '')
+
+where '' is a filter that doesn't restrict that field. The candidates are
+then checked against the criteria the index doesn't cover (availability
+days). Profiles carry no level, so a filter's level isn't checked; the
+partner search doesn't filter on it either.
+
+Matches are written to ``SearchAlert``, at most once per (filter, profile).
+``send_search_alerts`` drains them into one digest email per user.
+"""
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.utils import timezone
+
+from .cities import normalize_city
+from .models import SearchAlert, SearchFilter
+from .results import parse_sports
+
+# Profile fields the index keys and checks depend on
+MATCHED_FIELDS = {'sports', 'city', 'country', 'availability'}
+# Partners listed per saved search in a digest
+DIGEST_LIMIT = 10
+
+
+def candidate_filters(profile):
+    """Saved filters whose index keys match the profile, other than the owner's own."""
+    sports = {sport.strip().lower() for sport in parse_sports(profile.sports) if isinstance(sport, str)}
+    return (
+        SearchFilter.objects.filter(
+            alerts_enabled=True,
+            sport_key__in=[*sports, ''],
+            country__in=[profile.country, ''],
+            city_key__in=[normalize_city(profile.city), ''],
+        )
+        # A filter with neither a sport nor a city would match everyone
+        .exclude(sport_key='', city_key='')
+        .exclude(user_id=profile.user_id)
+    )
+
+
+def filter_matches(search_filter, profile):
+    """Criteria not covered by the index keys."""
+    if search_filter.availability_days:
+        availability = profile.availability.lower()
+        if not any(day.lower() in availability for day in search_filter.availability_days):
+            return False
+    return True
+
+
+def match_profile(profile):
+    """Queue alerts for every saved filter the profile matches. Returns the number of matches."""
+    matches = [
+        SearchAlert(search_filter=search_filter, user_id=search_filter.user_id, profile=profile)
+        for search_filter in candidate_filters(profile)
+        if filter_matches(search_filter, profile)
+    ]
+    # Already announced matches are skipped by the unique (filter, profile) key
+    SearchAlert.objects.bulk_create(matches, ignore_conflicts=True)
+    return len(matches)
+
+
+def send_digests(batch_size=500):
+    """Email each user their pending alerts as one digest. Returns (users, alerts) sent."""
+    users = alerts_sent = 0
+    while True:
+        pending = list(
+            SearchAlert.objects.filter(sent_at__isnull=True)
+            .select_related('user', 'search_filter', 'profile__user')
+            .order_by('user_id', 'created_at')[:batch_size]
+        )
+        if not pending:
+            return users, alerts_sent
+        # Don't split the last user of a full batch across two emails
+        if len(pending) == batch_size and pending[0].user_id != pending[-1].user_id:
+            pending = [alert for alert in pending if alert.user_id != pending[-1].user_id]
+
+        by_user = {}
+        for alert in pending:
+            by_user.setdefault(alert.user_id, []).append(alert)
+        for alerts in by_user.values():
+            send_digest(alerts[0].user, alerts)
+            SearchAlert.objects.filter(pk__in=[alert.pk for alert in alerts]).update(sent_at=timezone.now())
+            users += 1
+            alerts_sent += len(alerts)
+
+
+def send_digest(user, alerts):
+    by_filter = {}
+    for alert in alerts:
+        by_filter.setdefault(alert.search_filter, []).append(alert.profile)
+
+    lines = ['New partners match your saved searches on TeamUp:', '']
+    for search_filter, profiles in by_filter.items():
+        lines.append(f'{search_filter.name}:')
+        for profile in profiles[:DIGEST_LIMIT]:
+            place = f' ({profile.city})' if profile.city else ''
+            lines.append(f'  - {profile.full_name}{place}')
+        if len(profiles) > DIGEST_LIMIT:
+            lines.append(f'  ... and {len(profiles) - DIGEST_LIMIT} more')
+        lines.append('')
+
+    send_mail(
+        subject='New partners for your saved searches',
+        message='\n'.join(lines),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[user.email],
+        fail_silently=False,
+    )
@@ -4,4 +4,14 @@ from django.apps import AppConfig
 class SearchConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.search'
-    verbose_name = 'Partner Search & Discovery'
\ No newline at end of file
+    verbose_name = 'Partner Search & Discovery'
+
+    def ready(self):
+        # Full-text index maintenance and saved-search alerts
+        from . import signals  # noqa: F401
+
+        from apps.core.warmup import register_step
+        from .warmup import warm_city_autocomplete, warm_facet_counts, warm_profile_store
+        register_step('city autocomplete', warm_city_autocomplete)
+        register_step('search facets', warm_facet_counts)
+        register_step('profile store', warm_profile_store)
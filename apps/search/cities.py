@@ -0,0 +1,185 @@
+"""
+City autocomplete.
+
+An in-memory prefix trie per country, built from the distinct
+``UserProfile.city`` values (and an optional offline gazetteer). Every trie
+node keeps its own best completions, so a lookup is a walk down the prefix
+and a slice; no search below the node. Matching ignores case and accents
+("sfa", "SFA" and "Sfàx" all find "Sfax"); each city is shown in its most
+common spelling.
+
+Cities are ranked by how many profiles use them; gazetteer-only cities
+come after those. Each country holds at most
+``CITY_AUTOCOMPLETE_MAX_PER_COUNTRY`` cities (the most used ones). The trie
+picks up new cities from recently saved profiles every
+``CITY_AUTOCOMPLETE_REFRESH`` seconds and is rebuilt from scratch every
+``CITY_AUTOCOMPLETE_REBUILD`` seconds to correct counts.
+
+The gazetteer is a UTF-8 text file named by ``CITY_GAZETTEER_PATH``, with one
+``<country code>,<city>`` per line. It is skipped when the file doesn't exist.
+"""
+
+import os
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from apps.users.models import UserProfile
+
+ALL_COUNTRIES = '*'
+# Completions kept per trie node; also the most a lookup can return
+NODE_CAPACITY = 10
+
+
+def normalize_city(name):
+    """Lookup key: lower case, no accents, single spaces."""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+class _Node:
+    __slots__ = ('children', 'best')
+
+    def __init__(self):
+        self.children = {}
+        self.best = []  # [(-count, key)] sorted, at most NODE_CAPACITY
+
+
+class CityTrie:
+    def __init__(self):
+        self.root = _Node()
+        self.counts = {}  # key -> count
+        self.display = {}  # key -> spelling shown
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, name, count=1):
+        """Add `count` uses of a city (0 for gazetteer-only entries)."""
+        key = normalize_city(name)
+        if not key:
+            return
+        self.display.setdefault(key, ' '.join(name.split()))
+        self.counts[key] = self.counts.get(key, 0) + count
+        entry = (-self.counts[key], key)
+
+        node = self.root
+        self._place(node, key, entry)
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+            self._place(node, key, entry)
+
+    def _place(self, node, key, entry):
+        best = [item for item in node.best if item[1] != key]
+        if len(best) < NODE_CAPACITY or entry < best[-1]:
+            best.append(entry)
+            best.sort()
+            del best[NODE_CAPACITY:]
+        node.best = best
+
+    def complete(self, prefix, limit=NODE_CAPACITY):
+        node = self.root
+        for char in normalize_city(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [self.display[key] for _count, key in node.best[:limit]]
+
+
+class CityAutocomplete:
+    refresh_interval = property(lambda self: getattr(settings, 'CITY_AUTOCOMPLETE_REFRESH', 60))
+    rebuild_interval = property(lambda self: getattr(settings, 'CITY_AUTOCOMPLETE_REBUILD', 60 * 60))
+    max_per_country = property(lambda self: getattr(settings, 'CITY_AUTOCOMPLETE_MAX_PER_COUNTRY', 5000))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tries = None  # country -> CityTrie ('*' = every country)
+        self._built_at = 0
+        self._refreshed_at = 0
+        self._watermark = None  # latest profile updated_at seen
+
+    def complete(self, prefix, country='', limit=NODE_CAPACITY):
+        tries = self._current()
+        trie = tries.get(country or ALL_COUNTRIES)
+        return trie.complete(prefix, limit) if trie else []
+
+    def reset(self):
+        with self._lock:
+            self._tries = None
+
+    def _current(self):
+        now = time.monotonic()
+        if self._tries is None or now - self._built_at >= self.rebuild_interval:
+            with self._lock:
+                if self._tries is None or now - self._built_at >= self.rebuild_interval:
+                    self._build()
+        elif now - self._refreshed_at >= self.refresh_interval:
+            with self._lock:
+                if now - self._refreshed_at >= self.refresh_interval:
+                    self._refresh()
+        return self._tries
+
+    def _build(self):
+        uses = {}  # country -> Counter(spelling -> profiles)
+        rows = UserProfile.objects.exclude(city='').values_list('country', 'city').annotate(n=Count('id'))
+        for country, city, n in rows.order_by():
+            uses.setdefault(country, Counter())[city] += n
+        gazetteer = load_gazetteer()
+
+        tries = {ALL_COUNTRIES: CityTrie()}
+        for country in set(uses) | set(gazetteer):
+            trie = tries[country] = CityTrie()
+            # Most used first so the cap drops the rarest cities
+            for city, n in uses.get(country, Counter()).most_common():
+                if len(trie) >= self.max_per_country:
+                    break
+                trie.add(city, n)
+                tries[ALL_COUNTRIES].add(city, n)
+            for city in gazetteer.get(country, ()):
+                if len(trie) >= self.max_per_country:
+                    break
+                trie.add(city, 0)
+                tries[ALL_COUNTRIES].add(city, 0)
+
+        self._tries = tries
+        self._watermark = UserProfile.objects.aggregate(latest=Max('updated_at'))['latest']
+        self._built_at = self._refreshed_at = time.monotonic()
+
+    def _refresh(self):
+        """Add the cities of profiles saved since the last look."""
+        rows = UserProfile.objects.exclude(city='')
+        if self._watermark is not None:
+            rows = rows.filter(updated_at__gt=self._watermark)
+        latest = self._watermark
+        for country, city, updated_at in rows.values_list('country', 'city', 'updated_at').order_by('updated_at'):
+            trie = self._tries.setdefault(country, CityTrie())
+            key = normalize_city(city)
+            if key not in trie.counts and len(trie) < self.max_per_country:
+                trie.add(city)
+                self._tries[ALL_COUNTRIES].add(city)
+            latest = updated_at
+        self._watermark = latest or timezone.now()
+        self._refreshed_at = time.monotonic()
+
+
+def load_gazetteer():
+    """{country: [city, ...]} from CITY_GAZETTEER_PATH, or {} when there is none."""
+    path = getattr(settings, 'CITY_GAZETTEER_PATH', None)
+    if not path or not os.path.exists(path):
+        return {}
+    cities = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            country, _, city = line.strip().partition(',')
+            if country and city:
+                cities.setdefault(country.strip().upper(), []).append(city.strip())
+    return cities
+
+
+city_autocomplete = CityAutocomplete()
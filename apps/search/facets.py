@@ -0,0 +1,129 @@
+"""
+Facet counts for the search page: "Football (1,240) · Tennis (310)".
+
+``sports`` is JSON text, so counting profiles per sport means reading every
+profile. Instead the counts are kept in ``SearchFacetCount`` and adjusted as
+profiles change: each UserProfile save compares the profile's facets as
+loaded with its facets as saved and moves the difference (see
+``apps.search.signals``). Writes that bypass the signals (queryset.update(),
+raw SQL) let the counters drift, so ``reconcile_search_facets`` recounts
+everything; run it daily from cron.
+
+Facets are ``sport``, ``country`` and ``city``; city values include the
+country (``TN:sfax``) and ignore case and accents. Reads go through the cache
+under the ``search_facets`` namespace, whose version is bumped by every
+change to the counters.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from apps.core.cache import bump_version, get_or_compute, versioned_key
+from apps.users.models import UserProfile
+
+from .cities import normalize_city
+from .models import SearchFacetCount
+from .results import parse_sports
+
+NAMESPACE = 'search_facets'
+FACETS_CACHE_TIMEOUT = 60 * 60 * 24
+
+COUNTRY_NAMES = dict(UserProfile.COUNTRY_CHOICES)
+
+
+def profile_facets(sports, city, country):
+    """{(facet, value): label} of one profile's fields."""
+    facets = {}
+    for sport in parse_sports(sports):
+        if isinstance(sport, str) and sport.strip():
+            facets[('sport', sport.strip())] = sport.strip()
+    if country:
+        facets[('country', country)] = COUNTRY_NAMES.get(country, country)
+    key = normalize_city(city)
+    if key:
+        facets[('city', f'{country}:{key}')] = ' '.join(city.split())
+    return facets
+
+
+def apply_change(before, after):
+    """Move the counters from one set of profile facets to another. Returns True if anything changed."""
+    changes = [(facet, -1, label) for facet, label in before.items() if facet not in after]
+    changes += [(facet, 1, label) for facet, label in after.items() if facet not in before]
+    if not changes:
+        return False
+    for (facet, value), step, label in changes:
+        rows = SearchFacetCount.objects.filter(facet=facet, value=value)
+        if step > 0:
+            if rows.update(count=F('count') + 1):
+                continue
+            try:
+                with transaction.atomic():
+                    SearchFacetCount.objects.create(facet=facet, value=value, label=label, count=1)
+            except IntegrityError:
+                # Created by a concurrent save in the meantime
+                rows.update(count=F('count') + 1)
+        else:
+            rows.update(count=F('count') - 1)
+    bump_version(NAMESPACE)
+    return True
+
+
+def count_facets(rows):
+    """{(facet, value): [label, count]} from (sports, city, country) rows."""
+    counts = {}
+    for sports, city, country in rows:
+        for facet, label in profile_facets(sports, city, country).items():
+            counts.setdefault(facet, [label, 0])[1] += 1
+    return counts
+
+
+def reconcile(profiles=None):
+    """Recount every facet from the profiles. Returns the number of counters corrected."""
+    profiles = UserProfile.objects.all() if profiles is None else profiles
+    counts = count_facets(profiles.values_list('sports', 'city', 'country').iterator(chunk_size=2000))
+    with transaction.atomic():
+        current = {
+            (row.facet, row.value): row.count
+            for row in SearchFacetCount.objects.select_for_update()
+        }
+        corrected = sum(
+            1 for facet in set(current) | set(counts)
+            if current.get(facet, 0) != (counts[facet][1] if facet in counts else 0)
+        )
+        SearchFacetCount.objects.all().delete()
+        SearchFacetCount.objects.bulk_create([
+            SearchFacetCount(facet=facet, value=value, label=label, count=count)
+            for (facet, value), (label, count) in counts.items()
+        ], batch_size=500)
+    bump_version(NAMESPACE)
+    return corrected
+
+
+def facet_counts(country='', city_limit=10):
+    """
+    {'sport': [...], 'country': [...], 'city': [...]}, each a list of
+    {'value', 'label', 'count'} with the largest counts first. Cities are
+    those of `country` (of every country when empty), at most `city_limit`.
+    """
+    key = versioned_key(NAMESPACE, country or '*', city_limit)
+
+    def compute():
+        rows = SearchFacetCount.objects.filter(count__gt=0).order_by('-count', 'label')
+        facets = {
+            facet: [
+                {'value': value, 'label': label, 'count': count}
+                for value, label, count in rows.filter(facet=facet).values_list('value', 'label', 'count')
+            ]
+            for facet in ('sport', 'country')
+        }
+        cities = rows.filter(facet='city')
+        if country:
+            cities = cities.filter(value__startswith=f'{country}:')
+        facets['city'] = [
+            {'value': label, 'label': label, 'count': count}
+            for label, count in cities.values_list('label', 'count')[:city_limit]
+        ]
+        return facets
+
+    return get_or_compute(NAMESPACE, key, compute, timeout=FACETS_CACHE_TIMEOUT)
+
@@ -0,0 +1,110 @@
+"""
+The recommendations feed.
+
+A user's undismissed recommendations of the current generation (see
+``apps.search.generations``), best first, read through ``search_rec_feed_idx``
+on (user, generation, is_dismissed, -match_score, -created_at) and
+paged with a keyset cursor ("load more"), so later pages don't re-read the
+earlier ones.
+
+Marking the shown rows as viewed is a write nobody waits for, so it is
+handed to ``viewed_marker``: the ids of every page shown are queued and
+written with one UPDATE on a background thread. With
+``RECOMMENDATIONS_VIEWED_ASYNC`` off (tests) the request writes them itself.
+Queued ids are written at interpreter exit; a crash can lose the "viewed"
+flag of the last pages shown, which only affects analytics.
+"""
+
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .generations import current_generation
+from .models import PartnerRecommendation
+from .results import after_cursor, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 10
+
+# Type of the values of each ordering term (see results.decode_cursor)
+CURSOR_KINDS = {'match_score': float, 'created_at': datetime, 'pk': int}
+
+
+def recommendation_page(user, cursor=None, limit=PAGE_SIZE):
+    """(recommendations, next_cursor) of `user`'s undismissed recommendations, best first."""
+    feed = (
+        PartnerRecommendation.objects.filter(user=user, generation=current_generation(user), is_dismissed=False)
+        .select_related('recommended_user', 'recommended_user__profile')
+        .order_by('-match_score', '-created_at', '-pk')
+    )
+    ordering = feed.query.order_by
+    values = decode_cursor(cursor, ordering, CURSOR_KINDS) if cursor else None
+    if values is not None:
+        feed = after_cursor(feed, values)
+    page = list(feed[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1], ordering) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+class ViewedMarker:
+    """Collects shown recommendation ids and marks them viewed in bulk, off the request."""
+
+    run_async = property(lambda self: getattr(settings, 'RECOMMENDATIONS_VIEWED_ASYNC', True))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = set()
+        self._thread = None
+        atexit.register(self.flush)
+
+    def mark(self, ids):
+        ids = [pk for pk in ids if pk is not None]
+        if not ids:
+            return
+        with self._lock:
+            self._pending.update(ids)
+        if self.run_async:
+            self._ensure_thread()
+            self._wakeup.set()
+        else:
+            self.flush()
+
+    def flush(self):
+        """Write every queued id. Returns the number of rows updated."""
+        with self._lock:
+            ids, self._pending = self._pending, set()
+        if not ids:
+            return 0
+        try:
+            return PartnerRecommendation.objects.filter(pk__in=ids, is_viewed=False).update(is_viewed=True)
+        except Exception as e:
+            logger.error(f"Could not mark {len(ids)} recommendations as viewed: {e}")
+            return 0
+
+    def reset(self):
+        with self._lock:
+            self._pending = set()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='recommendation-viewed-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.flush()
+            close_old_connections()
+
+
+viewed_marker = ViewedMarker()
@@ -0,0 +1,91 @@
+"""
+Recommendation feedback: dismiss, like and viewed events.
+
+The recommendations page queues the user's clicks and posts them in batches
+to ``recommendation_feedback`` as ``{"events": [{"id": 12, "action":
+"dismiss"}, ...]}``. A batch is applied with one UPDATE per action, scoped
+to the user's own rows, whatever its size (up to ``MAX_EVENTS``).
+
+Dismissing also records the pair in DismissedPartner, which outlives the
+recommendation rows: every generation published afterwards (see
+``apps.search.generations``) drops the partners in the user's exclusion
+set, so a dismissed partner is never suggested again. The set is read once
+per run as a frozenset of user ids, cached under ``search_exclusions`` and
+invalidated per user by a write version bumped on every new dismissal.
+Likes are kept on the row and carried over to the next generation.
+"""
+
+from django.db import transaction
+
+from apps.core.cache import bump_version, get_or_compute, versioned_key
+
+from .models import DismissedPartner, PartnerRecommendation
+
+NAMESPACE = 'search_exclusions'
+EXCLUSIONS_CACHE_TIMEOUT = 60 * 60 * 24
+
+MAX_EVENTS = 500
+
+# Event action -> flag set on the recommendation
+ACTIONS = {
+    'dismiss': 'is_dismissed',
+    'like': 'is_liked',
+    'viewed': 'is_viewed',
+}
+
+
+def exclusion_namespace(user_id):
+    return f'{NAMESPACE}:user:{user_id}'
+
+
+def excluded_partners(user):
+    """Ids of the partners never to recommend to `user` again."""
+    key = versioned_key(NAMESPACE, user.pk, depends_on=(exclusion_namespace(user.pk),))
+    return get_or_compute(
+        NAMESPACE,
+        key,
+        lambda: frozenset(DismissedPartner.objects.filter(user=user).values_list('partner_id', flat=True)),
+        timeout=EXCLUSIONS_CACHE_TIMEOUT,
+    )
+
+
+def parse_events(events):
+    """
+    {action: {recommendation ids}} from a list of {'id', 'action'} events.
+    Raises ValueError on anything malformed, so a bad batch changes nothing.
+    """
+    if not isinstance(events, list):
+        raise ValueError('events must be a list')
+    if len(events) > MAX_EVENTS:
+        raise ValueError(f'At most {MAX_EVENTS} events per request')
+    grouped = {}
+    for event in events:
+        if not isinstance(event, dict) or event.get('action') not in ACTIONS:
+            raise ValueError(f'Invalid event: {event!r}')
+        recommendation_id = event.get('id')
+        # bool is an int subclass; true isn't an id
+        if not isinstance(recommendation_id, int) or isinstance(recommendation_id, bool):
+            raise ValueError(f'Invalid recommendation id: {recommendation_id!r}')
+        grouped.setdefault(event['action'], set()).add(recommendation_id)
+    return grouped
+
+
+def apply_feedback(user, grouped):
+    """
+    Apply parsed events to `user`'s recommendations, one UPDATE per action.
+    Returns {action: rows matched}; ids of other users' rows are ignored.
+    """
+    matched = {}
+    with transaction.atomic():
+        for action, ids in grouped.items():
+            rows = PartnerRecommendation.objects.filter(user=user, pk__in=ids)
+            matched[action] = rows.update(**{ACTIONS[action]: True})
+            if action == 'dismiss' and matched[action]:
+                partner_ids = set(rows.values_list('recommended_user_id', flat=True))
+                DismissedPartner.objects.bulk_create(
+                    [DismissedPartner(user=user, partner_id=partner_id) for partner_id in partner_ids],
+                    ignore_conflicts=True,
+                )
+    if matched.get('dismiss'):
+        bump_version(exclusion_namespace(user.pk))
+    return matched
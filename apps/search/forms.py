@@ -56,7 +56,10 @@ class SearchFilterForm(forms.ModelForm):
     class Meta:
         model = SearchFilter
         fields = ['name', 'sport_type', 'location', 'max_distance_km', 'level', 
-                  'availability_days', 'availability_times', 'is_favorite']
+                  'availability_days', 'availability_times', 'is_favorite', 'alerts_enabled']
+        labels = {
+            'alerts_enabled': 'Email me when a new partner matches',
+        }
         widgets = {
             'name': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -64,7 +67,9 @@ class SearchFilterForm(forms.ModelForm):
             }),
             'location': forms.TextInput(attrs={
                 'class': 'form-control',
-                'placeholder': 'e.g., Paris, France'
+                'placeholder': 'e.g., Paris, France',
+                'list': 'city-suggestions',
+                'autocomplete': 'off',
             }),
             'max_distance_km': forms.NumberInput(attrs={
                 'class': 'form-control',
@@ -79,6 +84,9 @@ class SearchFilterForm(forms.ModelForm):
             }),
             'is_favorite': forms.CheckboxInput(attrs={
                 'class': 'form-check-input'
+            }),
+            'alerts_enabled': forms.CheckboxInput(attrs={
+                'class': 'form-check-input'
             })
         }
 
@@ -97,7 +105,9 @@ class AdvancedSearchForm(forms.Form):
         label='Location',
         widget=forms.TextInput(attrs={
             'class': 'form-control',
-            'placeholder': 'City or address'
+            'placeholder': 'City or address',
+            'list': 'city-suggestions',
+            'autocomplete': 'off',
         })
     )
     
@@ -0,0 +1,117 @@
+"""
+Full-text index over partner profiles (first name, last name, bio, city).
+
+Every backend gives a query the same meaning: each keyword (stopwords
+dropped) must match the start of a word in one of the fields, so
+"mara coach" finds "Marathon coach".
+
+- SQLite: an FTS5 table, ``search_profile_fts``, whose rowid is the
+  UserProfile id. It is kept in sync by the UserProfile signals in
+  ``apps.search.signals`` and can be rebuilt with
+  ``python manage.py rebuild_profile_index``. Ranked with bm25().
+- MySQL: a FULLTEXT index on the profile table itself, maintained by InnoDB,
+  queried in boolean mode (``+word*``). Ranked by MATCH ... AGAINST.
+- Other databases: each keyword must start a field or follow a space in one
+  (istartswith / icontains), unranked.
+
+``keyword_search(queryset, text)`` filters and orders a UserProfile queryset,
+so the keyword match combines with any other filter in a single query.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'search_profile_fts'
+PROFILE_TABLE = 'users_userprofile'
+FIELDS = ('first_name', 'last_name', 'bio', 'city')
+
+# Too common to be worth matching ("marathon coach in Sfax")
+STOPWORDS = {'a', 'an', 'and', 'at', 'de', 'du', 'for', 'in', 'la', 'le', 'of', 'on', 'or', 'the', 'to', 'with'}
+
+
+def keywords(text):
+    return [
+        word for word in re.findall(r'\w+', (text or '').lower())
+        if len(word) > 1 and word not in STOPWORDS
+    ]
+
+
+def fts5_query(words):
+    """Every word, each as a prefix; quoted so user input can't inject FTS syntax."""
+    return ' AND '.join(f'"{word}"*' for word in words)
+
+
+def boolean_query(words):
+    """MySQL boolean-mode equivalent of fts5_query (keywords() leaves no operators in the words)."""
+    return ' '.join(f'+{word}*' for word in words)
+
+
+def keyword_search(queryset, text):
+    """Restrict `queryset` (UserProfile) to profiles matching `text`, best matches first."""
+    words = keywords(text)
+    if not words:
+        return queryset
+
+    if uses_fts5():
+        query = fts5_query(words)
+        # One MATCH for the whole index restricts the profiles first; bm25() (lower is
+        # better) is then only looked up for the matches, by rowid
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query])
+        rank = RawSQL(
+            f'SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {PROFILE_TABLE}.id',
+            [query],
+        )
+        return queryset.filter(id__in=matches).annotate(search_rank=rank).order_by('search_rank')
+
+    if connection.vendor == 'mysql':
+        columns = ', '.join(f'{PROFILE_TABLE}.{field}' for field in FIELDS)
+        rank = RawSQL(f'MATCH ({columns}) AGAINST (%s IN BOOLEAN MODE)', [boolean_query(words)])
+        return queryset.annotate(search_rank=rank).filter(search_rank__gt=0).order_by('-search_rank')
+
+    for word in words:
+        match = Q()
+        for field in FIELDS:
+            match |= Q(**{f'{field}__istartswith': word}) | Q(**{f'{field}__icontains': f' {word}'})
+        queryset = queryset.filter(match)
+    return queryset
+
+
+# ===== Index maintenance (SQLite only; MySQL maintains its own index) =====
+
+def uses_fts5():
+    return connection.vendor == 'sqlite'
+
+
+def index_profile(profile):
+    if not uses_fts5():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [profile.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FIELDS)}) VALUES (%s, %s, %s, %s, %s)',
+            [profile.pk, *(getattr(profile, field) or '' for field in FIELDS)],
+        )
+
+
+def unindex_profile(profile_id):
+    if not uses_fts5():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [profile_id])
+
+
+def rebuild_index():
+    """Re-index every profile in one statement. Returns the number of profiles indexed."""
+    if not uses_fts5():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FIELDS)}) '
+            f'SELECT id, {", ".join(FIELDS)} FROM {PROFILE_TABLE}'
+        )
+        return cursor.rowcount
@@ -0,0 +1,200 @@
+"""
+Versioned recommendation sets.
+
+Each recommendation run for a user is written as a new *generation* of
+PartnerRecommendation rows rather than appended to the old ones:
+
+1. the new rows are bulk inserted with the next generation number, invisible
+   to readers, which only see ``RecommendationGeneration.current``;
+2. the pointer is flipped to the new generation in the same transaction, so
+   readers see either the whole old set or the whole new one;
+3. the older generations are deleted in chunks afterwards.
+
+Runs for the same user are serialized by a row lock on the pointer. Partners
+the user dismissed are left out (see ``apps.search.feedback``), the viewed
+and liked flags carry over to the new row of the same partner, and each
+run keeps at most ``RECOMMENDATIONS_PER_USER`` rows, so the table stays at
+about users x K rows. Rows left by a run that died before pruning are removed
+by ``prune_recommendations``.
+
+``build_recommendations`` runs the whole thing for one user: their best
+partners by the ``match_score`` of ``apps.search.results``, scored over the
+in-memory profile store when NumPy is installed (``apps.search.profile_store``)
+and in SQL otherwise, then published as a new generation.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from apps.users.models import UserProfile
+
+from .feedback import excluded_partners
+from .models import PartnerRecommendation, RecommendationGeneration
+from .profile_store import profile_store
+from .results import (
+    CITY_WEIGHT, COUNTRY_WEIGHT, DAY_WEIGHT, DAYS, RECENT_WEEK_WEIGHT, SPORT_WEIGHT, rank_profiles,
+    ranking_context,
+)
+
+PRUNE_CHUNK_SIZE = 1000
+
+
+def per_user_limit():
+    return getattr(settings, 'RECOMMENDATIONS_PER_USER', 50)
+
+
+def current_generation(user):
+    """The generation readers should see (0 for users never published)."""
+    return RecommendationGeneration.objects.filter(user=user).values_list('current', flat=True).first() or 0
+
+
+def current_recommendations(user):
+    return PartnerRecommendation.objects.filter(user=user, generation=current_generation(user))
+
+
+def publish_recommendations(user, recommendations):
+    """
+    Replace `user`'s recommendations with `recommendations`, a list of dicts
+    with recommended_user (or recommended_user_id), match_score and optionally
+    explanation and reasons. Returns the new generation number.
+    """
+    excluded = excluded_partners(user)
+    best = {}
+    for rec in recommendations:
+        partner_id = rec.get('recommended_user_id') or rec['recommended_user'].pk
+        if partner_id == user.pk or partner_id in excluded:
+            continue
+        if partner_id not in best or rec['match_score'] > best[partner_id]['match_score']:
+            best[partner_id] = rec
+    kept = sorted(best.items(), key=lambda item: item[1]['match_score'], reverse=True)[:per_user_limit()]
+
+    with transaction.atomic():
+        pointer, _created = RecommendationGeneration.objects.select_for_update().get_or_create(user=user)
+        previous = pointer.current
+        # Past every generation still stored, including one left by a failed run
+        latest = PartnerRecommendation.objects.filter(user=user).order_by('-generation').values_list(
+            'generation', flat=True
+        ).first()
+        generation = max(previous, latest or 0) + 1
+
+        flags = {
+            partner_id: (is_viewed, is_liked)
+            for partner_id, is_viewed, is_liked in PartnerRecommendation.objects.filter(
+                user=user, generation=previous, recommended_user_id__in=list(best),
+            ).values_list('recommended_user_id', 'is_viewed', 'is_liked')
+        }
+        PartnerRecommendation.objects.bulk_create([
+            PartnerRecommendation(
+                user=user,
+                recommended_user_id=partner_id,
+                match_score=rec['match_score'],
+                explanation=rec.get('explanation', {}),
+                reasons=rec.get('reasons', []),
+                is_viewed=flags.get(partner_id, (False, False))[0],
+                is_liked=flags.get(partner_id, (False, False))[1],
+                generation=generation,
+            )
+            for partner_id, rec in kept
+        ], batch_size=500)
+        pointer.current = generation
+        pointer.save(update_fields=['current', 'published_at'])
+
+    prune_user(user, generation)
+    return generation
+
+
+def best_score(context):
+    """Highest match_score possible for a ranking context; scores are published as a percentage of it."""
+    sports, city, country, days = context
+    return (
+        SPORT_WEIGHT * len(sports) + DAY_WEIGHT * len(days) + RECENT_WEEK_WEIGHT
+        + (CITY_WEIGHT if city else 0) + (COUNTRY_WEIGHT if country else 0)
+    )
+
+
+def match_details(context, partner):
+    """(explanation, reasons) of why `partner` (a UserProfile) suits the searcher of `context`."""
+    sports, city, country, days = ranking_context(partner)
+    shared_sports = sorted(set(sports) & set(context[0]))
+    shared_days = [day for day in DAYS if day in days and day in context[3]]
+    same_city = bool(city) and city == context[1]
+    explanation = {
+        'sport_match': bool(shared_sports),
+        'same_city': same_city,
+        'same_country': bool(country) and country == context[2],
+        'common_days': shared_days,
+    }
+    reasons = []
+    if shared_sports:
+        reasons.append(f"Same sport practiced ({', '.join(shared_sports)})")
+    if same_city:
+        reasons.append('Lives nearby')
+    if shared_days:
+        reasons.append('Similar availability')
+    return explanation, reasons
+
+
+def recommend_partners(profile, limit=None):
+    """The best partners for `profile` as publish_recommendations input, dismissed ones left out."""
+    limit = per_user_limit() if limit is None else limit
+    context = ranking_context(profile)
+    exclude = {profile.user_id, *excluded_partners(profile.user)}
+    if profile_store.available:
+        ranked = profile_store.snapshot().top(context, limit, exclude_user_ids=exclude)
+    else:
+        ranked = list(
+            rank_profiles(UserProfile.objects.exclude(user_id__in=exclude), context)
+            .values_list('user_id', 'match_score')[:limit]
+        )
+    # Also drops users deleted since the profile store was built
+    partners = UserProfile.objects.in_bulk([user_id for user_id, _score in ranked], field_name='user_id')
+    best = best_score(context)
+    recommendations = []
+    for user_id, score in ranked:
+        if user_id not in partners:
+            continue
+        explanation, reasons = match_details(context, partners[user_id])
+        recommendations.append({
+            'recommended_user_id': user_id,
+            'match_score': round(100 * score / best, 1),
+            'explanation': explanation,
+            'reasons': reasons,
+        })
+    return recommendations
+
+
+def build_recommendations(profile):
+    """Compute and publish a new generation for `profile`'s user. Returns the generation number."""
+    return publish_recommendations(profile.user, recommend_partners(profile))
+
+
+def prune_user(user, keep_generation, chunk_size=PRUNE_CHUNK_SIZE):
+    """
+    Delete `user`'s rows of generations older than `keep_generation`, a chunk
+    at a time. Returns rows deleted. Newer generations are left alone: a
+    concurrent run may have published one since.
+    """
+    stale = PartnerRecommendation.objects.filter(user=user, generation__lt=keep_generation)
+    return _delete_in_chunks(stale, chunk_size)
+
+
+def prune_stale(chunk_size=PRUNE_CHUNK_SIZE):
+    """Delete every row outside its user's current generation. Returns rows deleted."""
+    current = Coalesce(
+        Subquery(RecommendationGeneration.objects.filter(user=OuterRef('user')).values('current')[:1]),
+        Value(0),
+        output_field=IntegerField(),
+    )
+    stale = PartnerRecommendation.objects.alias(current=current).exclude(generation=current)
+    return _delete_in_chunks(stale, chunk_size)
+
+
+def _delete_in_chunks(queryset, chunk_size):
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += PartnerRecommendation.objects.filter(pk__in=ids).delete()[0]
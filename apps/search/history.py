@@ -0,0 +1,205 @@
+"""
+Buffered SearchHistory writer.
+
+Logging a search used to be one INSERT inside every ``search_partners``
+request. ``record_search()`` only appends to a per-process buffer instead;
+the buffer is written with one ``bulk_create`` when it holds
+``SEARCH_HISTORY_BUFFER_SIZE`` entries or its oldest entry is
+``SEARCH_HISTORY_FLUSH_INTERVAL`` seconds old. With ``SEARCH_HISTORY_ASYNC``
+(the default) the flush runs on a background thread, so no request waits for
+it; otherwise the request that crosses a threshold flushes inline.
+
+A user repeating the same search (same query and filters) within
+``SEARCH_HISTORY_COLLAPSE_WINDOW`` seconds bumps ``repeat_count`` on the
+existing row instead of adding one. Once that row is written the extra
+searches are added with a single UPDATE; on databases that can't return
+primary keys from ``bulk_create`` (MySQL) they start a new row instead.
+
+Each flush also feeds the popular-search summaries in
+``apps.search.suggestions``. Pending entries are flushed at interpreter exit,
+and ``search_history_view`` flushes first so users always see their latest
+searches. ``created_at`` is
+the flush time, at most one flush interval after the search. A crash can lose
+at most one buffer of analytics rows, which is the trade-off.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from apps.users.display import get_display_profile
+
+from .models import SearchHistory
+from .suggestions import heavy_hitters
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """One history row, pending or already written."""
+
+    __slots__ = ('user_id', 'country', 'query', 'filters', 'results_count', 'last_seen', 'unsaved', 'pk')
+
+    def __init__(self, user_id, country, query, filters, results_count, now):
+        self.user_id = user_id
+        self.country = country
+        self.query = query
+        self.filters = filters
+        self.results_count = results_count
+        self.last_seen = now
+        self.unsaved = 1  # searches not written to the database yet
+        self.pk = None
+
+
+class SearchHistoryBuffer:
+    # Thresholds are read from settings on use, so override_settings applies
+    max_size = property(lambda self: getattr(settings, 'SEARCH_HISTORY_BUFFER_SIZE', 100))
+    flush_interval = property(lambda self: getattr(settings, 'SEARCH_HISTORY_FLUSH_INTERVAL', 5))
+    collapse_window = property(lambda self: timedelta(seconds=getattr(settings, 'SEARCH_HISTORY_COLLAPSE_WINDOW', 60)))
+    run_async = property(lambda self: getattr(settings, 'SEARCH_HISTORY_ASYNC', True))
+
+    def __init__(self):
+        self._lock = threading.Lock()  # guards the fields below
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self._dirty = []  # entries with unsaved searches, in arrival order
+        self._last = {}  # user id -> that user's latest entry
+        self._oldest = None  # monotonic time of the oldest unsaved search
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, user, query, filters, results_count):
+        """Log one search; usually just an append to the buffer."""
+        now = timezone.now()
+        with self._lock:
+            entry = self._last.get(user.pk)
+            if (entry is not None and entry.query == query and entry.filters == filters
+                    and now - entry.last_seen <= self.collapse_window):
+                entry.results_count = results_count
+                entry.last_seen = now
+                if not entry.unsaved:
+                    self._dirty.append(entry)
+                entry.unsaved += 1
+            else:
+                entry = _Entry(user.pk, _country(user), query, filters, results_count, now)
+                self._last[user.pk] = entry
+                self._dirty.append(entry)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = len(self._dirty) >= self.max_size or time.monotonic() - self._oldest >= self.flush_interval
+
+        if self.run_async:
+            self._ensure_thread()
+            if due:
+                self._wakeup.set()
+        elif due:
+            self.flush()
+
+    def reset(self):
+        """Drop everything not written yet."""
+        with self._lock:
+            self._dirty = []
+            self._last = {}
+            self._oldest = None
+
+    def pending(self):
+        with self._lock:
+            return sum(entry.unsaved for entry in self._dirty)
+
+    def flush(self):
+        """Write every unsaved search. Returns the number of searches written."""
+        with self._flush_lock:
+            with self._lock:
+                batch = [(entry, entry.unsaved) for entry in self._dirty]
+                for entry, _count in batch:
+                    entry.unsaved = 0
+                self._dirty = []
+                self._oldest = None
+                self._forget_idle()
+            if not batch:
+                return 0
+
+            written = sum(count for _entry, count in batch)
+            try:
+                self._write(batch)
+            except Exception as e:
+                # Analytics must never break a request
+                logger.error(f"Could not write {len(batch)} search history entries: {e}")
+                written = 0
+
+            try:
+                # Feed the popular-search summaries (see apps.search.suggestions)
+                for entry, count in batch:
+                    sport = (entry.filters or {}).get('sport', '')
+                    heavy_hitters.observe(entry.query, entry.country, sport, count)
+                heavy_hitters.persist_if_due()
+            except Exception as e:
+                logger.error(f"Could not update search suggestions: {e}")
+            return written
+
+    def _write(self, batch):
+        new = [(entry, count) for entry, count in batch if entry.pk is None]
+        repeated = [(entry, count) for entry, count in batch if entry.pk is not None]
+
+        if new:
+            rows = [
+                SearchHistory(
+                    user_id=entry.user_id,
+                    search_query=entry.query,
+                    filters_used=entry.filters,
+                    results_count=entry.results_count,
+                    repeat_count=count,
+                )
+                for entry, count in new
+            ]
+            SearchHistory.objects.bulk_create(rows)
+            for (entry, _count), row in zip(new, rows):
+                # None where the database can't return keys; later repeats then start a new row
+                entry.pk = row.pk
+
+        for entry, count in repeated:
+            SearchHistory.objects.filter(pk=entry.pk).update(
+                repeat_count=F('repeat_count') + count,
+                results_count=entry.results_count,
+            )
+
+    def _forget_idle(self):
+        """Drop entries that can no longer be collapsed into (caller holds the lock)."""
+        cutoff = timezone.now() - self.collapse_window
+        for user_id, entry in list(self._last.items()):
+            if entry.last_seen < cutoff and not entry.unsaved:
+                del self._last[user_id]
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='search-history-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            close_old_connections()
+
+
+def _country(user):
+    profile = get_display_profile(user)
+    return getattr(profile, 'country', '') or ''
+
+
+history_buffer = SearchHistoryBuffer()
+atexit.register(history_buffer.flush)
+
+
+def record_search(user, query, filters, results_count):
+    history_buffer.record(user, query, filters, results_count)
@@ -0,0 +1,132 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from collections import deque
+from datetime import timedelta
+import json
+import os
+import random
+import time
+
+from apps.search.profile_store import ProfileSnapshot, profile_store
+from apps.search.results import DAYS, ranking_context
+from apps.search.snapshot_files import current_file, publish_snapshot, read_current
+from apps.search.views import SEARCH_SPORTS
+from apps.users.models import UserProfile
+
+COUNTRIES = [code for code, _name in UserProfile.COUNTRY_CHOICES if code]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the profile store on synthetic profiles: build time, memory footprint '
+        'and the cost of scoring every profile for one searcher. No database access. '
+        'With --snapshot-dir, also the mapped snapshot workers share and their private memory growth.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=1_000_000)
+        parser.add_argument('--cities', type=int, default=5000, help='Distinct cities')
+        parser.add_argument('--queries', type=int, default=20, help='Searchers scored')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--snapshot-dir', help='Also publish the snapshot here and score on the memory-mapped copy, as workers do',
+        )
+
+    def handle(self, *args, **options):
+        if not profile_store.available:
+            raise CommandError('NumPy is not installed.')
+        cities = [f'City {i}' for i in range(options['cities'])]
+        now = timezone.now()
+
+        def rows():
+            rng = random.Random(options['seed'])
+            for pk in range(1, options['profiles'] + 1):
+                updated_at = now - timedelta(minutes=rng.randrange(60 * 24 * 90))
+                yield (
+                    pk,
+                    pk,
+                    json.dumps(rng.sample(SEARCH_SPORTS, rng.randint(1, 3))),
+                    ', '.join(rng.sample(DAYS, rng.randint(0, 4))),
+                    rng.choice(COUNTRIES),
+                    rng.choice(cities),
+                    rng.randint(16, 70),
+                    updated_at,
+                    None,
+                )
+
+        # Generating the rows is timed on its own and taken out of the build time
+        started = time.perf_counter()
+        deque(rows(), maxlen=0)
+        generate_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        snapshot = ProfileSnapshot.from_rows(rows())
+        build_ms = (time.perf_counter() - started) * 1000 - generate_ms
+
+        self.stdout.write(f'Profile store benchmark ({len(snapshot):,} profiles, {len(snapshot.cities) - 1:,} cities)\n')
+        self.stdout.write(f'{"generate rows (not counted)":<28} {generate_ms:>10.0f} ms')
+        self.stdout.write(f'{"build (encode + columns)":<28} {build_ms:>10.0f} ms')
+        self.stdout.write(f'{"columns":<28} {snapshot.nbytes / 2**20:>10.1f} MiB')
+        self.stdout.write(f'{"bytes per profile":<28} {snapshot.nbytes / max(len(snapshot), 1):>10.1f}')
+
+        rng = random.Random(options['seed'])
+        searchers = [_Searcher(rng, cities) for _ in range(options['queries'])]
+        started = time.perf_counter()
+        for searcher in searchers:
+            snapshot.scores(ranking_context(searcher), now)
+        score_ms = (time.perf_counter() - started) * 1000 / len(searchers)
+        started = time.perf_counter()
+        for searcher in searchers:
+            snapshot.top(ranking_context(searcher), 50, now=now)
+        top_ms = (time.perf_counter() - started) * 1000 / len(searchers)
+        started = time.perf_counter()
+        for searcher in searchers:
+            snapshot.match(sport=rng.choice(SEARCH_SPORTS), country=searcher.country)
+        match_ms = (time.perf_counter() - started) * 1000 / len(searchers)
+
+        self.stdout.write(f'{"score all (per searcher)":<28} {score_ms:>10.1f} ms')
+        self.stdout.write(f'{"top 50 (per searcher)":<28} {top_ms:>10.1f} ms')
+        self.stdout.write(f'{"sport + country filter":<28} {match_ms:>10.1f} ms')
+
+        if options['snapshot_dir']:
+            self.benchmark_mapped(snapshot, options['snapshot_dir'], searchers, now)
+
+    def benchmark_mapped(self, snapshot, directory, searchers, now):
+        """
+        Private (anonymous) memory is what each worker pays for; the mapped
+        file's pages show up as RssFile but are shared by every process.
+        """
+        publish_snapshot(snapshot, directory)
+        path = os.path.join(directory, current_file(directory))
+        before = _memory()
+        started = time.perf_counter()
+        _name, _version, mapped = read_current(directory)
+        map_ms = (time.perf_counter() - started) * 1000
+        for searcher in searchers:
+            mapped.top(ranking_context(searcher), 50, now=now)
+        after = _memory()
+
+        self.stdout.write(f'\n{"snapshot file":<28} {os.path.getsize(path) / 2**20:>10.1f} MiB')
+        self.stdout.write(f'{"map (per worker)":<28} {map_ms:>10.1f} ms')
+        if before and after:
+            self.stdout.write(f'{"private memory growth":<28} {(after[0] - before[0]) / 1024:>10.1f} MiB')
+            self.stdout.write(f'{"shared file pages touched":<28} {(after[1] - before[1]) / 1024:>10.1f} MiB')
+
+
+def _memory():
+    """(RssAnon, RssFile) of this process in KiB, or None off Linux."""
+    try:
+        with open('/proc/self/status') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(fields['RssAnon'].split()[0]), int(fields['RssFile'].split()[0])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class _Searcher:
+    """The UserProfile fields ranking_context reads."""
+
+    def __init__(self, rng, cities):
+        self.sports = json.dumps(rng.sample(SEARCH_SPORTS, rng.randint(1, 3)))
+        self.city = rng.choice(cities)
+        self.country = rng.choice(COUNTRIES)
+        self.availability = ', '.join(rng.sample(DAYS, rng.randint(1, 4)))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+import time
+
+from apps.search.generations import build_recommendations
+from apps.search.profile_store import profile_store
+from apps.users.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        'Computes every user\'s partner recommendations and publishes them as a new generation. '
+        'Scores over the in-memory profile store when NumPy is installed, in SQL otherwise.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Only this user')
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.select_related('user').order_by('pk')
+        if options['email']:
+            profiles = profiles.filter(user__email=options['email'])
+
+        started = time.perf_counter()
+        built = 0
+        for profile in profiles.iterator(chunk_size=1000):
+            build_recommendations(profile)
+            built += 1
+        elapsed = (time.perf_counter() - started) * 1000
+        engine = 'profile store' if profile_store.available else 'SQL'
+        self.stdout.write(self.style.SUCCESS(
+            f'Built recommendations for {built} user(s) with the {engine} in {elapsed:.1f} ms'
+        ))
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from apps.users.models import User, UserProfile
-from apps.search.models import PartnerRecommendation
+from apps.search.generations import publish_recommendations
 import random
 import json
 
@@ -134,36 +134,27 @@ class Command(BaseCommand):
                 # Get other users to recommend
                 other_users = User.objects.exclude(email=main_user.email)[:8]
                 
-                for other_user in other_users:
-                    # Check if recommendation already exists
-                    if PartnerRecommendation.objects.filter(
-                        user=main_user, 
-                        recommended_user=other_user
-                    ).exists():
-                        continue
-                    
-                    # Generate random match score
-                    match_score = random.randint(65, 95)
-                    
-                    # Create recommendation
-                    PartnerRecommendation.objects.create(
-                        user=main_user,
-                        recommended_user=other_user,
-                        match_score=match_score,
-                        explanation={
+                # Publish them as the user's new recommendation generation
+                publish_recommendations(main_user, [
+                    {
+                        'recommended_user': other_user,
+                        'match_score': random.randint(65, 95),
+                        'explanation': {
                             'sport_match': random.choice([True, False]),
                             'level_compatible': random.choice([True, False]),
                             'distance_km': round(random.uniform(0.5, 15), 1)
                         },
-                        reasons=random.sample([
+                        'reasons': random.sample([
                             'Same sport practiced',
                             'Compatible level',
                             'Similar availability',
                             'Common goals',
                             'Lives nearby',
                             'Similar age group'
-                        ], k=random.randint(2, 4))
-                    )
+                        ], k=random.randint(2, 4)),
+                    }
+                    for other_user in other_users
+                ])
             
             self.stdout.write(self.style.SUCCESS('✓ Recommendations generated'))
         except Exception as e:
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+import time
+
+from apps.search.generations import PRUNE_CHUNK_SIZE, prune_stale
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes partner recommendations outside their user\'s current generation, '
+        'such as the rows of a run that failed before pruning. Safe to run at any time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=PRUNE_CHUNK_SIZE, help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        deleted = prune_stale(chunk_size=options['chunk_size'])
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f'Pruned {deleted} stale recommendation(s) in {elapsed:.1f} ms'
+        ))
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+import time
+
+from apps.search.profile_store import ProfileSnapshot, profile_rows, profile_store
+from apps.search.snapshot_files import SnapshotFileError, publish_snapshot, read_current
+
+
+class Command(BaseCommand):
+    help = (
+        'Builds the profile store snapshot and publishes it to PROFILE_STORE_DIR, where every worker maps it. '
+        'Adds the profiles saved since the last snapshot, or rebuilds it all every PROFILE_STORE_REBUILD seconds. '
+        'Run it from cron, or with --interval as a background process.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild from every profile')
+        parser.add_argument('--interval', type=int, help='Keep running, publishing every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        if not profile_store.available:
+            raise CommandError('NumPy is not installed.')
+        directory = getattr(settings, 'PROFILE_STORE_DIR', '')
+        if not directory:
+            raise CommandError('PROFILE_STORE_DIR is not set.')
+
+        while True:
+            self.publish(directory, options['full'])
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def publish(self, directory, full):
+        started = time.perf_counter()
+        try:
+            current = read_current(directory)
+        except (OSError, SnapshotFileError) as e:
+            self.stderr.write(f'Rebuilding: the current snapshot is unusable ({e})')
+            current = None
+
+        rebuild_interval = getattr(settings, 'PROFILE_STORE_REBUILD', 60 * 60)
+        if current is None or full or time.time() - (current[2].built_at or 0) >= rebuild_interval:
+            snapshot = ProfileSnapshot.from_rows(profile_rows())
+            kind = 'Rebuilt profile snapshot'
+        else:
+            _name, _version, previous = current
+            rows = list(profile_rows(since=previous.watermark))
+            if not rows:
+                self.stdout.write('Profile snapshot is up to date')
+                return
+            snapshot = previous.with_rows(rows)
+            kind = f'Updated profile snapshot ({len(rows)} profile(s) saved since)'
+
+        version = publish_snapshot(snapshot, directory)
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f'{kind} as version {version}: {len(snapshot)} profiles, '
+            f'{snapshot.nbytes / 2**20:.1f} MiB in {elapsed:.1f} ms'
+        ))
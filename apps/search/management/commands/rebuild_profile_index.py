@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+import time
+
+from apps.search.fulltext import rebuild_index, uses_fts5
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the SQLite full-text index of partner profiles (MySQL maintains its own).'
+
+    def handle(self, *args, **options):
+        if not uses_fts5():
+            self.stdout.write('Nothing to do: the database maintains its full-text index itself.')
+            return
+        started = time.perf_counter()
+        indexed = rebuild_index()
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} profile(s) in {elapsed:.1f} ms'))
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+import time
+
+from apps.search.rollups import purge_raw_history, rollup_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Builds the daily search rollups incrementally, then deletes raw search '
+        'history older than the retention period. Run it daily from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int,
+                            default=getattr(settings, 'SEARCH_HISTORY_RETENTION_DAYS', 90),
+                            help='Raw rows kept (default: SEARCH_HISTORY_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows deleted per query (default: 1000)')
+        parser.add_argument('--no-purge', action='store_true',
+                            help='Only build rollups, keep every raw row')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        days = rollup_pending()
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {len(days)} day(s), {sum(days.values())} row(s) in {elapsed:.1f} ms'
+        ))
+
+        if options['no_purge']:
+            return
+        started = time.perf_counter()
+        deleted = purge_raw_history(options['retention_days'], options['batch_size'])
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} raw search history row(s) older than {options["retention_days"]} day(s) in {elapsed:.1f} ms'
+        ))
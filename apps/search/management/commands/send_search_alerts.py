@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+import time
+
+from apps.search.alerts import send_digests
+
+
+class Command(BaseCommand):
+    help = (
+        'Emails each user one digest of the new partners matching their saved '
+        'searches, then marks those alerts as sent. Run it from cron (e.g. hourly).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Alerts read per query (default: 500)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        users, alerts = send_digests(options['batch_size'])
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {users} digest(s) covering {alerts} alert(s) in {elapsed:.1f} ms'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchhistory',
+            name='repeat_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_searchhistory_repeat_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySearchRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('search_query', models.CharField(max_length=255)),
+                ('filters_used', models.JSONField(default=dict)),
+                ('filters_key', models.CharField(max_length=40)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('users', models.PositiveIntegerField(default=0)),
+                ('results_total', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day', '-searches'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchhistory',
+            index=models.Index(fields=['user', '-created_at'], name='search_hist_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchhistory',
+            index=models.Index(fields=['created_at'], name='search_hist_created_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailysearchrollup',
+            unique_together={('day', 'search_query', 'filters_key')},
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0003_search_history_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchSuggestionSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=120, unique=True)),
+                ('counters', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
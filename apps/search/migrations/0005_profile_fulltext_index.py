@@ -0,0 +1,41 @@
+from django.db import migrations
+
+FTS_TABLE = 'search_profile_fts'
+PROFILE_TABLE = 'users_userprofile'
+FIELDS = 'first_name, last_name, bio, city'
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"{FIELDS}, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {FIELDS}) SELECT id, {FIELDS} FROM {PROFILE_TABLE}'
+        )
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            f'ALTER TABLE {PROFILE_TABLE} ADD FULLTEXT INDEX userprofile_fulltext ({FIELDS})'
+        )
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE {PROFILE_TABLE} DROP INDEX userprofile_fulltext')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0004_search_suggestion_sketch'),
+        ('users', '0007_userprofile_avatar_content_addressed'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:22
+
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def city_key(location):
+    # apps.search.cities.normalize_city at the time of writing (lower case, no
+    # accents, single spaces), inlined so later changes to it don't change
+    # the keys this migration writes
+    decomposed = unicodedata.normalize('NFKD', location.split(',')[0])
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+def fill_alert_keys(apps, schema_editor):
+    """Historical models don't run SearchFilter.save(), so derive the keys here."""
+    SearchFilter = apps.get_model('search', 'SearchFilter')
+    for search_filter in SearchFilter.objects.only('sport_type', 'location'):
+        search_filter.sport_key = search_filter.sport_type.strip().lower()
+        search_filter.city_key = city_key(search_filter.location)
+        search_filter.save(update_fields=['sport_key', 'city_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0007_userprofile_avatar_content_addressed'),
+        ('search', '0005_profile_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='searchfilter',
+            name='alerts_enabled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='searchfilter',
+            name='city_key',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='searchfilter',
+            name='country',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='searchfilter',
+            name='sport_key',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='searchfilter',
+            index=models.Index(fields=['alerts_enabled', 'sport_key', 'country', 'city_key'], name='search_filter_alert_idx'),
+        ),
+        migrations.AddField(
+            model_name='searchalert',
+            name='profile',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_alerts', to='users.userprofile'),
+        ),
+        migrations.AddField(
+            model_name='searchalert',
+            name='search_filter',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='search.searchfilter'),
+        ),
+        migrations.AddField(
+            model_name='searchalert',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_alerts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='searchalert',
+            index=models.Index(fields=['sent_at', 'user'], name='search_alert_pending_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='searchalert',
+            unique_together={('search_filter', 'profile')},
+        ),
+        migrations.RunPython(fill_alert_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:36
+
+import json
+import unicodedata
+
+from django.db import migrations, models
+
+
+def count_existing_profiles(apps, schema_editor):
+    # Same counting as apps.search.facets at the time of writing, inlined so
+    # later changes to that module or to UserProfile don't affect this migration
+    UserProfile = apps.get_model('users', 'UserProfile')
+    SearchFacetCount = apps.get_model('search', 'SearchFacetCount')
+    country_names = dict(UserProfile._meta.get_field('country').choices)
+
+    counts = {}
+    for sports, city, country in UserProfile.objects.values_list('sports', 'city', 'country').iterator(chunk_size=2000):
+        facets = {}
+        try:
+            parsed = json.loads(sports or '[]')
+        except (json.JSONDecodeError, TypeError):
+            parsed = []
+        for sport in parsed if isinstance(parsed, list) else []:
+            if isinstance(sport, str) and sport.strip():
+                facets[('sport', sport.strip())] = sport.strip()
+        if country:
+            facets[('country', country)] = country_names.get(country, country)
+        decomposed = unicodedata.normalize('NFKD', city or '')
+        key = ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).casefold().split())
+        if key:
+            facets[('city', f'{country}:{key}')] = ' '.join(city.split())
+        for facet, label in facets.items():
+            counts.setdefault(facet, [label, 0])[1] += 1
+
+    SearchFacetCount.objects.bulk_create([
+        SearchFacetCount(facet=facet, value=value, label=label, count=count)
+        for (facet, value), (label, count) in counts.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0006_saved_search_alerts'),
+        ('users', '0007_userprofile_avatar_content_addressed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=120)),
+                ('label', models.CharField(max_length=120)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['facet', '-count'], name='search_facet_count_idx')],
+                'unique_together': {('facet', 'value')},
+            },
+        ),
+        migrations.RunPython(count_existing_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0007_search_facet_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='partnerrecommendation',
+            index=models.Index(fields=['user', 'is_dismissed', '-match_score', '-created_at'], name='search_rec_feed_idx'),
+        ),
+    ]
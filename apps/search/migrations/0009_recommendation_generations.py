@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def keep_latest_per_pair(apps, schema_editor):
+    """Earlier runs appended rows for the same pair; keep the newest one of each, as generation 0."""
+    PartnerRecommendation = apps.get_model('search', 'PartnerRecommendation')
+    seen = set()
+    stale = []
+    rows = PartnerRecommendation.objects.order_by('user_id', 'recommended_user_id', '-created_at', '-pk')
+    for pk, user_id, recommended_user_id in rows.values_list('pk', 'user_id', 'recommended_user_id').iterator():
+        if (user_id, recommended_user_id) in seen:
+            stale.append(pk)
+        else:
+            seen.add((user_id, recommended_user_id))
+    for start in range(0, len(stale), 1000):
+        PartnerRecommendation.objects.filter(pk__in=stale[start:start + 1000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('search', '0008_recommendation_feed_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current', models.PositiveIntegerField(default=0)),
+                ('published_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='partnerrecommendation',
+            name='search_rec_feed_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='partnerrecommendation',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='partnerrecommendation',
+            name='generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(keep_latest_per_pair, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='partnerrecommendation',
+            unique_together={('user', 'recommended_user', 'generation')},
+        ),
+        migrations.AddIndex(
+            model_name='partnerrecommendation',
+            index=models.Index(fields=['user', 'generation', 'is_dismissed', '-match_score', '-created_at'], name='search_rec_feed_idx'),
+        ),
+        migrations.AddField(
+            model_name='recommendationgeneration',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recommendation_generation', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_dismissals(apps, schema_editor):
+    """Partners already dismissed stay out of future recommendations."""
+    PartnerRecommendation = apps.get_model('search', 'PartnerRecommendation')
+    DismissedPartner = apps.get_model('search', 'DismissedPartner')
+    pairs = PartnerRecommendation.objects.filter(is_dismissed=True).values_list('user_id', 'recommended_user_id').distinct()
+    DismissedPartner.objects.bulk_create(
+        [DismissedPartner(user_id=user_id, partner_id=partner_id) for user_id, partner_id in pairs.iterator()],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('search', '0009_recommendation_generations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partnerrecommendation',
+            name='is_liked',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='DismissedPartner',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('partner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dismissed_by', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dismissed_partners', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'unique_together': {('user', 'partner')},
+            },
+        ),
+        migrations.RunPython(copy_dismissals, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
 
+from .cities import normalize_city
+
 
 class SearchFilter(models.Model):
     """Stores user's search filters for quick access"""
@@ -13,14 +15,33 @@ class SearchFilter(models.Model):
     availability_days = models.JSONField(default=list)  # e.g., ["monday", "wednesday"]
     availability_times = models.JSONField(default=list)  # e.g., ["08:00-10:00"]
     is_favorite = models.BooleanField(default=False)
+    # "Notify me when a new partner matches" (see apps.search.alerts)
+    alerts_enabled = models.BooleanField(default=False)
+    country = models.CharField(max_length=10, blank=True)  # '' = any country
+    # Reverse-index keys for alerts, derived from sport_type and location on save
+    sport_key = models.CharField(max_length=100, blank=True, editable=False)
+    city_key = models.CharField(max_length=255, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Candidate filters of a saved profile, looked up by its sport(s), country and city
+            models.Index(fields=['alerts_enabled', 'sport_key', 'country', 'city_key'], name='search_filter_alert_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        self.sport_key = self.sport_type.strip().lower()
+        # "Paris, France" -> "paris"
+        self.city_key = normalize_city(self.location.split(',')[0])
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'sport_key', 'city_key'}
+        super().save(*args, **kwargs)
+
 
 class PartnerRecommendation(models.Model):
     """Stores AI recommendations for transparency and caching"""
@@ -32,26 +53,139 @@ class PartnerRecommendation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_viewed = models.BooleanField(default=False)
     is_dismissed = models.BooleanField(default=False)
+    is_liked = models.BooleanField(default=False)
+    # Run that produced the row; only the user's current one is shown (see apps.search.generations)
+    generation = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ['-match_score', '-created_at']
-        unique_together = ['user', 'recommended_user', 'created_at']
+        unique_together = ['user', 'recommended_user', 'generation']
+        indexes = [
+            # The recommendations feed: a user's current undismissed rows, best first
+            models.Index(
+                fields=['user', 'generation', 'is_dismissed', '-match_score', '-created_at'],
+                name='search_rec_feed_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Recommendation: {self.recommended_user.username} for {self.user.username} ({self.match_score}%)"
 
 
+class RecommendationGeneration(models.Model):
+    """Which PartnerRecommendation generation of a user is live; flipped when a new run is published."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='recommendation_generation')
+    current = models.PositiveIntegerField(default=0)
+    published_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}: generation {self.current}"
+
+
+class DismissedPartner(models.Model):
+    """A partner the user dismissed; never recommended to them again (see apps.search.feedback)."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='dismissed_partners')
+    partner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='dismissed_by')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = ['user', 'partner']
+
+    def __str__(self):
+        return f"{self.user.username} dismissed {self.partner.username}"
+
+
 class SearchHistory(models.Model):
     """Track user searches for analytics and improvements"""
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='search_history')
     search_query = models.CharField(max_length=255)
     filters_used = models.JSONField(default=dict)
     results_count = models.IntegerField(default=0)
+    # Identical searches repeated within a short window share one row (see apps.search.history)
+    repeat_count = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Search histories'
+        indexes = [
+            # A user's latest searches (search_history_view)
+            models.Index(fields=['user', '-created_at'], name='search_hist_user_created_idx'),
+            # Admin ordering, rollups and retention all scan by date
+            models.Index(fields=['created_at'], name='search_hist_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.search_query} ({self.created_at})"
+
+
+class DailySearchRollup(models.Model):
+    """Per-day totals of SearchHistory, one row per (day, query, filters). Built by rollup_search_history."""
+    day = models.DateField()
+    search_query = models.CharField(max_length=255)
+    filters_used = models.JSONField(default=dict)
+    # sha1 of filters_used as canonical JSON; JSON columns can't be part of a unique key on every backend
+    filters_key = models.CharField(max_length=40)
+    searches = models.PositiveIntegerField(default=0)  # repeats included
+    users = models.PositiveIntegerField(default=0)  # distinct users
+    results_total = models.BigIntegerField(default=0)  # sum of results_count over searches
+
+    class Meta:
+        ordering = ['-day', '-searches']
+        unique_together = ['day', 'search_query', 'filters_key']
+
+    def __str__(self):
+        return f"{self.day} - {self.search_query or 'General search'} ({self.searches})"
+
+    @property
+    def average_results(self):
+        return self.results_total / self.searches if self.searches else 0
+
+
+class SearchSuggestionSketch(models.Model):
+    """Persisted heavy-hitter summary of one suggestion scope (see apps.search.suggestions)."""
+    scope = models.CharField(max_length=120, unique=True)  # "<country>:<sport>", '*' for any
+    counters = models.JSONField(default=dict)  # {query: [count, error]}
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.scope} ({len(self.counters)} queries)"
+
+
+class SearchAlert(models.Model):
+    """A profile that matched a saved search, waiting for the owner's next digest (send_search_alerts)."""
+    search_filter = models.ForeignKey(SearchFilter, on_delete=models.CASCADE, related_name='alerts')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='search_alerts')  # filter owner
+    profile = models.ForeignKey('users.UserProfile', on_delete=models.CASCADE, related_name='search_alerts')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        # A partner is announced once per saved search, however often they edit their profile
+        unique_together = ['search_filter', 'profile']
+        indexes = [
+            # The digest worker drains unsent alerts owner by owner
+            models.Index(fields=['sent_at', 'user'], name='search_alert_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.search_filter.name}: {self.profile} ({'sent' if self.sent_at else 'pending'})"
+
+
+class SearchFacetCount(models.Model):
+    """Number of profiles per sport, country or city, kept up to date on profile save (see apps.search.facets)."""
+    facet = models.CharField(max_length=20)  # 'sport', 'country' or 'city'
+    value = models.CharField(max_length=120)  # cities are '<country>:<normalized city>'
+    label = models.CharField(max_length=120)  # as shown, e.g. the first spelling of a city seen
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['facet', 'value']
+        indexes = [
+            models.Index(fields=['facet', '-count'], name='search_facet_count_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} - {self.search_query} ({self.created_at})"
\ No newline at end of file
+        return f"{self.facet}={self.label} ({self.count})"
@@ -0,0 +1,365 @@
+"""
+Columnar in-memory snapshot of every profile, for matching.
+
+Ranking partners in Python means re-reading every UserProfile and re-parsing
+its JSON sports and free-text availability. The profile store does that once
+and keeps the result as one NumPy array per column, a row per profile, sorted
+by profile id:
+
+- ``ids``, ``user_ids`` (int64)
+- ``sports`` (uint64): a bit per sport, numbered in ``sport_bits`` as first
+  seen (the first ``MAX_SPORTS`` sports; later ones are ignored)
+- ``days`` (uint8): a bit per weekday the availability mentions
+- ``countries`` (uint16), ``cities`` (uint32): indexes into the ``countries``
+  and ``cities`` vocabularies (0 is "none"); cities are normalized with
+  ``normalize_city``
+- ``ages`` (uint8): 0 when unknown
+- ``active`` (int64): the later of the last login and the last profile
+  update, as a Unix timestamp
+
+That is 40 bytes per profile, about 40 MB for a million; see
+``python manage.py benchmark_profile_store`` for the build time and footprint
+at that size. Profiles have no coordinates, so there are no lat/lon columns.
+
+``ProfileSnapshot.scores`` computes the ``match_score`` of
+``apps.search.results.rank_profiles`` for every profile at once with
+vectorized bit tests, and ``top`` returns the best partners, so
+recommendation runs (``apps.search.generations``) never touch the profile
+table. A snapshot is never modified: refreshing builds a new one, so a reader
+always sees a consistent set of columns.
+
+``profile_store`` follows the pattern of ``apps.search.cities``: built on
+first use, refreshed from the profiles saved since the last look
+(``updated_at``) every ``PROFILE_STORE_REFRESH`` seconds and rebuilt every
+``PROFILE_STORE_REBUILD`` seconds, which drops deleted profiles and picks up
+logins. With ``PROFILE_STORE_DIR`` set, processes instead map the snapshot
+published there, shared by every worker (see ``apps.search.snapshot_files``),
+and only build their own until one is published. NumPy is an optional
+dependency, imported the first time a snapshot is built or used (it takes
+about 100 ms, too much for every worker and management command to pay at
+startup); without it ``profile_store.available`` is False and callers rank in
+SQL instead.
+"""
+
+import importlib.util
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.users.models import UserProfile
+
+from .cities import normalize_city
+from .results import (
+    CITY_WEIGHT, COUNTRY_WEIGHT, DAY_WEIGHT, DAYS, RECENT_MONTH_WEIGHT, RECENT_WEEK_WEIGHT, SPORT_WEIGHT,
+    parse_sports,
+)
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    ('ids', 'int64'),
+    ('user_ids', 'int64'),
+    ('sports', 'uint64'),
+    ('days', 'uint8'),
+    ('countries', 'uint16'),
+    ('cities', 'uint32'),
+    ('ages', 'uint8'),
+    ('active', 'int64'),
+)
+# What a row is built from, in this order
+PROFILE_FIELDS = (
+    'pk', 'user_id', 'sports', 'availability', 'country', 'city', 'age', 'updated_at', 'user__last_login',
+)
+MAX_SPORTS = 64
+CHUNK_SIZE = 10000
+
+
+def numpy_installed():
+    """Whether NumPy can be imported, without importing it."""
+    return importlib.util.find_spec('numpy') is not None
+
+
+def load_numpy():
+    """The numpy module, imported on first use (see the module docstring)."""
+    import numpy
+
+    return numpy
+
+
+def days_mask(days):
+    return sum(1 << DAYS.index(day) for day in days if day in DAYS)
+
+
+def profile_rows(since=None):
+    """PROFILE_FIELDS tuples of every profile (saved after `since`), by id."""
+    profiles = UserProfile.objects.order_by('pk')
+    if since is not None:
+        profiles = profiles.filter(updated_at__gt=since)
+    return profiles.values_list(*PROFILE_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+class ProfileSnapshot:
+    """The profile columns at one point in time (see the module docstring)."""
+
+    def __init__(self, columns=None, sport_bits=None, countries=None, cities=None, watermark=None, built_at=None):
+        np = load_numpy()
+        self.columns = columns if columns is not None else {name: np.zeros(0, dtype) for name, dtype in COLUMNS}
+        self.sport_bits = sport_bits if sport_bits is not None else {}  # sport -> bit
+        self.countries = countries if countries is not None else {'': 0}  # code -> index
+        self.cities = cities if cities is not None else {'': 0}  # normalized city -> index
+        self.watermark = watermark  # latest updated_at included
+        self.built_at = built_at  # Unix time of the full build it was refreshed from
+
+    def __len__(self):
+        return len(self.columns['ids'])
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Snapshot of `rows`, PROFILE_FIELDS tuples ordered by id."""
+        snapshot = cls(built_at=time.time())
+        snapshot.columns = snapshot._encode(rows)
+        return snapshot
+
+    def with_rows(self, rows):
+        """New snapshot with `rows` (PROFILE_FIELDS tuples) replacing or added to these ones."""
+        updated = ProfileSnapshot(
+            dict(self.columns), dict(self.sport_bits), dict(self.countries), dict(self.cities), self.watermark,
+            self.built_at,
+        )
+        fresh = updated._encode(rows)
+        if not len(fresh['ids']):
+            return updated
+
+        np = load_numpy()
+        ids = self.columns['ids']
+        positions = np.searchsorted(ids, fresh['ids'])
+        known = positions < len(ids)
+        known[known] = ids[positions[known]] == fresh['ids'][known]
+        columns = {name: column.copy() for name, column in self.columns.items()}
+        for name, column in columns.items():
+            column[positions[known]] = fresh[name][known]
+        if not known.all():
+            columns = {name: np.concatenate([column, fresh[name][~known]]) for name, column in columns.items()}
+            order = np.argsort(columns['ids'], kind='stable')
+            columns = {name: column[order] for name, column in columns.items()}
+        updated.columns = columns
+        return updated
+
+    # ===== Encoding =====
+
+    def _encode(self, rows):
+        """Columns of `rows`, growing the vocabularies and watermark as needed."""
+        np = load_numpy()
+        chunks, batch = [], []
+        for row in rows:
+            batch.append(self._encode_row(row))
+            if len(batch) >= CHUNK_SIZE:
+                chunks.append(self._to_arrays(batch))
+                batch = []
+        if batch or not chunks:
+            chunks.append(self._to_arrays(batch))
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name, _dtype in COLUMNS}
+
+    def _to_arrays(self, batch):
+        np = load_numpy()
+        values = list(zip(*batch)) if batch else [()] * len(COLUMNS)
+        return {name: np.array(column, dtype=dtype) for (name, dtype), column in zip(COLUMNS, values)}
+
+    def _encode_row(self, row):
+        pk, user_id, sports, availability, country, city, age, updated_at, last_login = row
+        bits = 0
+        for sport in parse_sports(sports):
+            bit = self._sport_bit(sport)
+            if bit is not None:
+                bits |= 1 << bit
+        availability = (availability or '').lower()
+        if self.watermark is None or updated_at > self.watermark:
+            self.watermark = updated_at
+        active = max(updated_at, last_login) if last_login is not None else updated_at
+        return (
+            pk,
+            user_id,
+            bits,
+            days_mask(day for day in DAYS if day in availability),
+            self._index(self.countries, country or ''),
+            self._index(self.cities, normalize_city(city)),
+            min(age or 0, 255),
+            int(active.timestamp()),
+        )
+
+    def _sport_bit(self, sport):
+        if not isinstance(sport, str):
+            return None
+        bit = self.sport_bits.get(sport)
+        if bit is None and len(self.sport_bits) < MAX_SPORTS:
+            bit = self.sport_bits[sport] = len(self.sport_bits)
+        return bit
+
+    @staticmethod
+    def _index(vocabulary, value):
+        index = vocabulary.get(value)
+        if index is None:
+            index = vocabulary[value] = len(vocabulary)
+        return index
+
+    # ===== Matching =====
+
+    def match(self, sport='', country='', city=''):
+        """Boolean mask of the profiles with `sport`, in `country` and `city` ('' = any)."""
+        np = load_numpy()
+        columns = self.columns
+        city = normalize_city(city)
+        nothing = np.zeros(len(self), dtype=bool)
+        mask = np.ones(len(self), dtype=bool)
+        if sport:
+            if sport not in self.sport_bits:
+                return nothing
+            mask &= (columns['sports'] & np.uint64(1 << self.sport_bits[sport])) != 0
+        for column, vocabulary, value in (('countries', self.countries, country), ('cities', self.cities, city)):
+            if value:
+                if value not in vocabulary:
+                    return nothing
+                mask &= columns[column] == vocabulary[value]
+        return mask
+
+    def scores(self, context, now=None):
+        """match_score of every profile for a ranking context (see results.ranking_context)."""
+        np = load_numpy()
+        sports, city, country, days = context
+        columns = self.columns
+        now = now or timezone.now()
+        week = int((now - timedelta(days=7)).timestamp())
+        month = int((now - timedelta(days=30)).timestamp())
+        active = columns['active']
+        score = np.where(
+            active >= week, RECENT_WEEK_WEIGHT, np.where(active >= month, RECENT_MONTH_WEIGHT, 0),
+        ).astype(np.int32)
+
+        # One pass per bit the searcher has (a few sports and days) beats a popcount over every row
+        for sport in set(sports):
+            if sport in self.sport_bits:
+                score += SPORT_WEIGHT * ((columns['sports'] & np.uint64(1 << self.sport_bits[sport])) != 0)
+        for day in set(days):
+            if day in DAYS:
+                score += DAY_WEIGHT * ((columns['days'] & np.uint8(1 << DAYS.index(day))) != 0)
+        city = self.cities.get(normalize_city(city)) if city else None
+        if city:
+            score += CITY_WEIGHT * (columns['cities'] == city)
+        country = self.countries.get(country) if country else None
+        if country:
+            score += COUNTRY_WEIGHT * (columns['countries'] == country)
+        return score
+
+    def top(self, context, limit, exclude_user_ids=(), mask=None, now=None):
+        """
+        [(user id, match_score)] of the `limit` best profiles for `context`,
+        best first, then the most recently active. Profiles of
+        `exclude_user_ids` and outside `mask` are left out.
+        """
+        np = load_numpy()
+        if limit <= 0 or not len(self):
+            return []
+        columns = self.columns
+        score = self.scores(context, now)
+        keep = np.ones(len(self), dtype=bool) if mask is None else mask.copy()
+        if exclude_user_ids:
+            keep &= ~np.isin(columns['user_ids'], np.fromiter(exclude_user_ids, dtype=np.int64))
+        candidates = np.flatnonzero(keep)
+        if len(candidates) > limit:
+            # The best `limit` without sorting everything; ties at the cut are kept arbitrarily
+            candidates = candidates[np.argpartition(-score[candidates], limit - 1)[:limit]]
+        order = np.lexsort((-columns['ids'][candidates], -columns['active'][candidates], -score[candidates]))
+        candidates = candidates[order]
+        return [(int(user_id), int(value)) for user_id, value in zip(columns['user_ids'][candidates], score[candidates])]
+
+
+class ProfileStore:
+    refresh_interval = property(lambda self: getattr(settings, 'PROFILE_STORE_REFRESH', 60))
+    rebuild_interval = property(lambda self: getattr(settings, 'PROFILE_STORE_REBUILD', 60 * 60))
+    # Where publish_profile_snapshot writes the shared snapshot ('' = each process builds its own)
+    directory = property(lambda self: getattr(settings, 'PROFILE_STORE_DIR', ''))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._built_at = 0
+        self._refreshed_at = 0
+        self._checked_at = 0
+        self.build_ms = None  # duration of the last full build
+        self.mapped_file = ''  # published snapshot in use ('' = built in this process)
+        self.version = None  # its version
+
+    @property
+    def available(self):
+        return numpy_installed()
+
+    def snapshot(self):
+        """The current ProfileSnapshot: the published one when there is one, else built or refreshed when due."""
+        now = time.monotonic()
+        if self.directory and (not self.mapped_file or now - self._checked_at >= self.refresh_interval):
+            with self._lock:
+                if not self.mapped_file or now - self._checked_at >= self.refresh_interval:
+                    self._map_published()
+        if self.mapped_file:
+            return self._snapshot
+
+        if self._snapshot is None or now - self._built_at >= self.rebuild_interval:
+            with self._lock:
+                if self._snapshot is None or now - self._built_at >= self.rebuild_interval:
+                    self._build()
+        elif now - self._refreshed_at >= self.refresh_interval:
+            with self._lock:
+                if now - self._refreshed_at >= self.refresh_interval:
+                    self._refresh()
+        return self._snapshot
+
+    def reset(self):
+        with self._lock:
+            self._snapshot = None
+            self.mapped_file = ''
+            self.version = None
+            self._checked_at = 0
+
+    def _map_published(self):
+        """Switch to the published snapshot if a new one appeared (see apps.search.snapshot_files)."""
+        from .snapshot_files import SnapshotFileError, current_file, read_snapshot
+
+        self._checked_at = time.monotonic()
+        name = current_file(self.directory)
+        if not name or name == self.mapped_file:
+            return
+        try:
+            version, snapshot = read_snapshot(os.path.join(self.directory, name))
+        except (OSError, SnapshotFileError) as e:
+            logger.error(f"Could not map profile snapshot {name}: {e}")
+            return
+        # Readers still holding the previous snapshot keep its mapping alive
+        self._snapshot, self.mapped_file, self.version = snapshot, name, version
+
+    def _build(self):
+        started = time.perf_counter()
+        snapshot = ProfileSnapshot.from_rows(profile_rows())
+        self.build_ms = (time.perf_counter() - started) * 1000
+        self._snapshot = snapshot
+        self._built_at = self._refreshed_at = time.monotonic()
+        logger.info(
+            f"Profile store built: {len(snapshot)} profiles, {snapshot.nbytes / 2**20:.1f} MiB "
+            f"in {self.build_ms:.0f} ms"
+        )
+
+    def _refresh(self):
+        """Re-encode the profiles saved since the last look."""
+        self._snapshot = self._snapshot.with_rows(profile_rows(since=self._snapshot.watermark))
+        self._refreshed_at = time.monotonic()
+
+
+profile_store = ProfileStore()
@@ -0,0 +1,291 @@
+"""
+Ranked, cached partner search results.
+
+Matching is done in SQL on the normalized filter tuple (sport, location,
+keywords): the location lower-cased, the keywords reduced to their sorted
+set. Parameters that don't change the matches (level, distance,
+availability) aren't part of it.
+
+Ranking is relative to the searcher and computed in SQL as the
+``match_score`` annotation (see ``rank_profiles``):
+
+- ``SPORT_WEIGHT`` per sport shared with the searcher,
+- ``CITY_WEIGHT`` for the same city, ``COUNTRY_WEIGHT`` for the same country,
+- ``DAY_WEIGHT`` per day of the week both mention in their availability,
+- ``RECENT_WEEK_WEIGHT`` / ``RECENT_MONTH_WEIGHT`` when the partner logged in
+  or edited their profile in the last week / month.
+
+Keyword relevance breaks ties, then the most recently updated profile. Pages
+are cut with a keyset cursor on those values, so a deep page costs the same
+as the first one, and the count is capped at ``SEARCH_RESULTS_COUNT_CAP`` so
+it never walks every match.
+
+Searches are cached per filter tuple and *ranking context* (the searcher's
+sports, city, country and available days), so users who'd see the same order
+share an entry: the ranked profile ids (at most ``SEARCH_RESULTS_CACHE_MAX_IDS``)
+and the capped count. The requesting user's own profile is dropped when
+reading, and only the profiles shown are loaded from the database.
+
+Entries are invalidated by write versions: every UserProfile write bumps the
+version of each sport the profile has (before and after the write) plus the
+"any sport" version, so a new tennis player leaves the cached football
+searches alone (see ``apps.search.signals``). Login recency only moves with
+the timeout. Hits and misses are reported under the ``search_results``
+namespace of ``/api/metrics/cache/``.
+"""
+
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import Case, ExpressionWrapper, IntegerField, Q, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.core.cache import bump_version, get_or_compute, versioned_key
+from apps.users.display import get_display_profile
+from apps.users.models import UserProfile
+
+from .fulltext import keyword_search, keywords
+from .rollups import filters_key
+
+NAMESPACE = 'search_results'
+SEARCH_RESULTS_CACHE_TIMEOUT = getattr(settings, 'SEARCH_RESULTS_CACHE_TIMEOUT', 60 * 60)
+
+SPORT_WEIGHT = 3
+CITY_WEIGHT = 4
+COUNTRY_WEIGHT = 1
+DAY_WEIGHT = 1
+RECENT_WEEK_WEIGHT = 2
+RECENT_MONTH_WEIGHT = 1
+
+DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+# Type of the values of each term find_partners orders by (see decode_cursor)
+CURSOR_KINDS = {'match_score': int, 'search_rank': float, 'updated_at': datetime, 'pk': int}
+
+SearchPage = namedtuple('SearchPage', 'profiles total total_capped next_cursor')
+
+
+def max_ids():
+    return getattr(settings, 'SEARCH_RESULTS_CACHE_MAX_IDS', 1000)
+
+
+def count_cap():
+    return getattr(settings, 'SEARCH_RESULTS_COUNT_CAP', 1000)
+
+
+def parse_sports(sports):
+    """The list in UserProfile.sports ([] when it isn't valid JSON)."""
+    try:
+        parsed = json.loads(sports or '[]')
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def normalize_filters(sport='', location='', text=''):
+    """The (sport, location, keywords) tuple results are matched on."""
+    return (
+        sport.strip(),
+        ' '.join(location.lower().split()),
+        ' '.join(sorted(set(keywords(text)))),
+    )
+
+
+def ranking_context(profile):
+    """What the order of results depends on: the searcher's (sports, city, country, days)."""
+    if profile is None:
+        return ((), '', '', ())
+    availability = profile.availability.lower()
+    return (
+        tuple(sorted({sport for sport in parse_sports(profile.sports) if isinstance(sport, str)})),
+        ' '.join(profile.city.lower().split()),
+        profile.country,
+        tuple(day for day in DAYS if day in availability),
+    )
+
+
+def sport_namespace(sport=''):
+    """Version namespace of one sport's searches; '' is searches without a sport."""
+    return f'{NAMESPACE}:sport:{quote(sport) or "*"}'
+
+
+def bump_sport_versions(sports):
+    """Invalidate the cached searches a profile with these sports can appear in."""
+    for namespace in {sport_namespace(), *(sport_namespace(sport) for sport in sports if isinstance(sport, str))}:
+        bump_version(namespace)
+
+
+# ===== SQL =====
+
+def filter_profiles(filters, queryset=None):
+    """Profiles matching normalized `filters`, nobody excluded (ordered by keyword rank if any)."""
+    sport, location, text = filters
+    profiles = UserProfile.objects.all() if queryset is None else queryset
+    # sports is a JSON list as text; the quoted name only matches a whole element.
+    # LIKE ignores case on SQLite and MySQL, so 'Tennis' also finds "tennis" there
+    if sport:
+        profiles = profiles.filter(sports__contains=json.dumps(sport))
+    if location:
+        profiles = profiles.filter(city__icontains=location)
+    if text:
+        profiles = keyword_search(profiles, text)
+    return profiles
+
+
+def rank_profiles(profiles, context):
+    """Annotate `match_score` for the ranking context and order by it (see the module docstring)."""
+    sports, city, country, days = context
+    now = timezone.now()
+    week, month = now - timedelta(days=7), now - timedelta(days=30)
+    score = Case(
+        When(Q(user__last_login__gte=week) | Q(updated_at__gte=week), then=Value(RECENT_WEEK_WEIGHT)),
+        When(Q(user__last_login__gte=month) | Q(updated_at__gte=month), then=Value(RECENT_MONTH_WEIGHT)),
+        default=Value(0),
+    )
+    terms = [(Q(sports__contains=json.dumps(sport)), SPORT_WEIGHT) for sport in sports]
+    terms += [(Q(availability__icontains=day), DAY_WEIGHT) for day in days]
+    if city:
+        terms.append((Q(city__iexact=city), CITY_WEIGHT))
+    if country:
+        terms.append((Q(country=country), COUNTRY_WEIGHT))
+    for condition, weight in terms:
+        score = score + Case(When(condition, then=Value(weight)), default=Value(0))
+
+    # keyword_search orders by its rank; keep that as the tie-breaker
+    text_order = [term for term in profiles.query.order_by if term.lstrip('-') == 'search_rank']
+    return profiles.annotate(
+        match_score=ExpressionWrapper(score, output_field=IntegerField()),
+    ).order_by('-match_score', *text_order, '-updated_at', '-pk')
+
+
+def after_cursor(profiles, values):
+    """Rows strictly after `values` in the queryset's order (a keyset over every ordering term)."""
+    ordering = profiles.query.order_by
+    after = Q()
+    for i, term in enumerate(ordering):
+        field = term.lstrip('-')
+        step = Q(**{f'{field}__lt' if term.startswith('-') else f'{field}__gt': values[i]})
+        for previous, value in zip(ordering[:i], values):
+            step &= Q(**{previous.lstrip('-'): value})
+        after |= step
+    return profiles.filter(after)
+
+
+def encode_cursor(row, ordering):
+    """Opaque cursor for the rows after `row` (see after_cursor)."""
+    values = [getattr(row, term.lstrip('-')) for term in ordering]
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def cursor_value(value, kind):
+    """`value` as a `kind` ordering value (int, float or datetime), or None when it isn't one."""
+    if kind is datetime:
+        if not isinstance(value, str):
+            return None
+        try:
+            value = parse_datetime(value)
+        except (ValueError, TypeError):
+            return None
+        return value if value is not None and timezone.is_aware(value) else None
+    # bool is an int to Python, but never a valid score or pk
+    if isinstance(value, bool):
+        return None
+    if kind is float and isinstance(value, (int, float)):
+        return float(value)
+    return value if isinstance(value, kind) else None
+
+
+def decode_cursor(cursor, ordering, kinds=CURSOR_KINDS):
+    """
+    Cursor values, or None when the cursor is invalid or from another
+    ordering. `kinds` maps each ordering term to the type of its values.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(ordering):
+        return None
+    decoded = []
+    for term, value in zip(ordering, values):
+        kind = kinds.get(term.lstrip('-'))
+        value = cursor_value(value, kind) if kind is not None else None
+        if value is None:
+            return None
+        decoded.append(value)
+    return decoded
+
+
+# ===== Cached entry =====
+
+def cached_results(filters, context):
+    """{'ids': [...], 'total': n} for `filters` ranked for `context`, from the cache when still valid."""
+    key = versioned_key(
+        NAMESPACE, filters_key([list(filters), list(context)]), depends_on=(sport_namespace(filters[0]),)
+    )
+
+    def compute():
+        profiles = filter_profiles(filters)
+        # Capped count: at most cap + 1 rows are looked at
+        total = profiles.order_by().values('pk')[:count_cap() + 1].count()
+        # One spare id, so dropping the requester still leaves max_ids
+        ids = list(rank_profiles(profiles, context).values_list('pk', flat=True)[:max_ids() + 1])
+        return {'ids': ids, 'total': total}
+
+    return get_or_compute(NAMESPACE, key, compute, timeout=SEARCH_RESULTS_CACHE_TIMEOUT)
+
+
+def find_partners(user, sport='', location='', text='', limit=20, cursor=None):
+    """
+    One SearchPage of the profiles matching the filters, best first for
+    `user` and without `user`'s own profile. `total` stops at
+    SEARCH_RESULTS_COUNT_CAP (`total_capped` is then True); pass
+    `next_cursor` back to get the next page.
+    """
+    filters = normalize_filters(sport, location, text)
+    searcher = get_display_profile(user) if user.is_authenticated else None
+    own = searcher.pk if searcher is not None else None
+    context = ranking_context(searcher)
+    results = cached_results(filters, context)
+    ids, total = results['ids'], results['total']
+    stored_all = len(ids) >= total
+
+    total_capped = total > count_cap()
+    if total_capped:
+        total = count_cap()
+    elif own in ids:
+        total -= 1
+    elif own is not None and not stored_all and filter_profiles(filters).filter(pk=own).exists():
+        # Our own profile may be past the stored ids
+        total -= 1
+    ids = [pk for pk in ids if pk != own]
+
+    ranked = rank_profiles(filter_profiles(filters, UserProfile.objects.select_related('user')), context)
+    ordering = ranked.query.order_by
+    values = decode_cursor(cursor, ordering) if cursor else None
+
+    # Where the page starts in the stored ids (None: past them)
+    start = 0
+    if values is not None:
+        start = next((i + 1 for i, pk in enumerate(ids) if pk == values[-1]), None)
+    if start is not None and (stored_all or start + limit < len(ids)):
+        shown = ids[start:start + limit]
+        by_pk = {profile.pk: profile for profile in ranked.filter(pk__in=shown)}
+        profiles = [by_pk[pk] for pk in shown if pk in by_pk]
+        more = start + limit < len(ids)
+    else:
+        page = after_cursor(ranked, values) if values is not None else ranked
+        if own is not None:
+            page = page.exclude(pk=own)
+        profiles = list(page[:limit + 1])
+        more = len(profiles) > limit
+        profiles = profiles[:limit]
+
+    next_cursor = encode_cursor(profiles[-1], ordering) if more and profiles else None
+    return SearchPage(profiles, total, total_capped, next_cursor)
@@ -0,0 +1,114 @@
+"""
+Daily rollups and retention for SearchHistory.
+
+Raw SearchHistory rows are kept for ``SEARCH_HISTORY_RETENTION_DAYS`` only;
+analytics read ``DailySearchRollup`` instead: one row per day, query and
+filters with the number of searches, distinct users and results.
+
+Rollups are built incrementally: every run recomputes the days from the
+latest rolled-up day (which may have been partial) up to today, and leaves
+older days alone. A day is recomputed from scratch, so runs are idempotent.
+Raw rows are only deleted once their day has been rolled up.
+"""
+
+import hashlib
+import json
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import DailySearchRollup, SearchHistory
+
+
+def filters_key(filters):
+    """Stable key for a filters dict, independent of key order."""
+    canonical = json.dumps(filters or {}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def day_bounds(day):
+    """Aware [start, end) datetimes of a local calendar day."""
+    start = timezone.make_aware(datetime.combine(day, dt_time.min))
+    return start, start + timedelta(days=1)
+
+
+def rollup_day(day):
+    """Rebuild the rollup rows of one day. Returns the number of rows written."""
+    start, end = day_bounds(day)
+    groups = {}
+    rows = (
+        SearchHistory.objects.filter(created_at__gte=start, created_at__lt=end)
+        .order_by()
+        .values_list('user_id', 'search_query', 'filters_used', 'results_count', 'repeat_count')
+    )
+    for user_id, query, filters, results_count, repeat_count in rows.iterator(chunk_size=2000):
+        key = (query, filters_key(filters))
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {'filters': filters or {}, 'searches': 0, 'results': 0, 'users': set()}
+        group['searches'] += repeat_count
+        group['results'] += results_count * repeat_count
+        group['users'].add(user_id)
+
+    with transaction.atomic():
+        DailySearchRollup.objects.filter(day=day).delete()
+        DailySearchRollup.objects.bulk_create([
+            DailySearchRollup(
+                day=day,
+                search_query=query,
+                filters_used=group['filters'],
+                filters_key=key,
+                searches=group['searches'],
+                users=len(group['users']),
+                results_total=group['results'],
+            )
+            for (query, key), group in groups.items()
+        ], batch_size=500)
+    return len(groups)
+
+
+def days_to_roll_up(today=None):
+    """Days that may have changed since the last run, oldest first."""
+    today = today or timezone.localdate()
+    last = DailySearchRollup.objects.aggregate(last=Max('day'))['last']
+    if last is None:
+        first = SearchHistory.objects.aggregate(first=Min('created_at'))['first']
+        if first is None:
+            return []
+        last = timezone.localdate(first)
+    return [last + timedelta(days=offset) for offset in range((today - last).days + 1)]
+
+
+def rollup_pending(today=None):
+    """Roll up every day that may have changed. Returns {day: rows written}."""
+    return {day: rollup_day(day) for day in days_to_roll_up(today)}
+
+
+def purge_raw_history(retention_days=None, batch_size=1000, today=None):
+    """
+    Delete raw rows older than the retention period, in batches, but never
+    rows of a day that hasn't been rolled up yet. Returns the number deleted.
+    """
+    if retention_days is None:
+        retention_days = getattr(settings, 'SEARCH_HISTORY_RETENTION_DAYS', 90)
+    today = today or timezone.localdate()
+    last_rolled = DailySearchRollup.objects.aggregate(last=Max('day'))['last']
+    if last_rolled is None:
+        return 0
+    # The last rolled-up day may still be partial, so keep it
+    keep_from = min(today - timedelta(days=retention_days), last_rolled)
+    cutoff = day_bounds(keep_from)[0]
+
+    deleted = 0
+    while True:
+        ids = list(
+            SearchHistory.objects.filter(created_at__lt=cutoff)
+            .order_by()
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += SearchHistory.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,69 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from apps.core.cache import bump_version
+from apps.users.models import UserProfile
+
+from .alerts import MATCHED_FIELDS, match_profile
+from .facets import apply_change, profile_facets
+from .feedback import exclusion_namespace
+from .fulltext import index_profile, unindex_profile
+from .models import DismissedPartner
+from .results import bump_sport_versions, parse_sports
+
+# Profile fields the result cache and facet counts depend on
+SEARCH_FIELDS = ('sports', 'city', 'country')
+
+
+@receiver(post_save, sender=UserProfile)
+def update_profile_index(sender, instance, **kwargs):
+    """Keep the full-text index in step with the profile."""
+    index_profile(instance)
+
+
+@receiver(post_delete, sender=UserProfile)
+def remove_profile_from_index(sender, instance, **kwargs):
+    unindex_profile(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def queue_search_alerts(sender, instance, update_fields=None, **kwargs):
+    """Match new and changed profiles against saved searches with alerts on."""
+    if update_fields is not None and not MATCHED_FIELDS & set(update_fields):
+        return
+    match_profile(instance)
+
+
+@receiver(post_init, sender=UserProfile)
+def remember_search_fields(sender, instance, **kwargs):
+    # The fields as loaded, so a save can tell what it changed (a sport left, a city moved from).
+    # Read from __dict__: touching a deferred field would cost a query per instance.
+    instance._loaded_search_fields = {field: instance.__dict__.get(field) for field in SEARCH_FIELDS}
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def search_fields_changed(sender, instance, signal, **kwargs):
+    """Invalidate cached results of the sports the profile had and has; move its facet counts."""
+    after = {field: instance.__dict__.get(field) for field in SEARCH_FIELDS}
+    # None: deferred when loaded, so unknown; count it as unchanged (reconciliation catches the rest)
+    before = {
+        field: after[field] if value is None else value
+        for field, value in instance._loaded_search_fields.items()
+    }
+    bump_sport_versions({*parse_sports(before['sports']), *parse_sports(after['sports'])})
+
+    # A new profile had nothing to count before; a deleted one has nothing after
+    created = kwargs.get('created', False)
+    apply_change(
+        {} if created else profile_facets(before['sports'], before['city'], before['country']),
+        {} if signal is post_delete else profile_facets(after['sports'], after['city'], after['country']),
+    )
+    instance._loaded_search_fields = after
+
+
+@receiver(post_save, sender=DismissedPartner)
+@receiver(post_delete, sender=DismissedPartner)
+def dismissals_changed(sender, instance, **kwargs):
+    """Dismissals edited one by one (the admin); feedback batches bump the version themselves."""
+    bump_version(exclusion_namespace(instance.user_id))
@@ -0,0 +1,177 @@
+"""
+Profile store snapshots as memory-mapped files, shared by every worker.
+
+Each WSGI worker holding its own ProfileSnapshot would cost ~40 MB per
+million profiles *per worker*. With ``PROFILE_STORE_DIR`` set, one builder
+(``python manage.py publish_profile_snapshot``, run from cron or with
+``--interval`` as a long-lived process) writes the snapshot to a file there,
+and workers map it read-only: the columns are NumPy views on the mapping, so
+their pages live once in the OS page cache, shared by all processes, and a
+worker's RSS does not grow with the number of users. Only the vocabularies
+(sports, countries, cities) are loaded into each process.
+
+File layout (little-endian)::
+
+    header   magic b'TUPSNAP\\0', format (u32), version (u64), rows (u64),
+             metadata length (u32)
+    metadata JSON: column dtypes and offsets, vocabularies, watermark,
+             time of the full build
+    columns  each at a 64-byte aligned offset
+
+Publishing is atomic: the file is written as ``profiles-<version>.snap.tmp``,
+fsynced and renamed, then the ``CURRENT`` pointer file (the name of the live
+snapshot) is replaced with ``os.replace``. Workers look at ``CURRENT`` every
+``PROFILE_STORE_REFRESH`` seconds and map the new file when it changes; a
+worker still scoring on the previous mapping keeps it until it drops the last
+reference. Older files are deleted after a new one is published, keeping the
+previous one; on POSIX a deleted file stays readable by those who mapped it.
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import time
+
+from django.utils.dateparse import parse_datetime
+
+from .profile_store import COLUMNS, ProfileSnapshot, load_numpy
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'TUPSNAP\0'
+FORMAT = 1
+HEADER = struct.Struct('<8sIQQI')
+ALIGNMENT = 64
+POINTER = 'CURRENT'
+SNAPSHOT_NAME = re.compile(r'profiles-\d+\.snap')
+KEEP_PREVIOUS = 1
+
+
+class SnapshotFileError(Exception):
+    """A snapshot file that can't be used (wrong format, truncated...)."""
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(snapshot, path, version):
+    """Write `snapshot` to `path` (not atomic on its own; see publish_snapshot)."""
+    np = load_numpy()
+    rows = len(snapshot)
+    columns, offset = [], 0
+    for name, dtype in COLUMNS:
+        columns.append({'name': name, 'dtype': dtype, 'offset': offset})
+        offset = _aligned(offset + snapshot.columns[name].nbytes)
+    metadata = json.dumps({
+        'columns': columns,
+        'sport_bits': snapshot.sport_bits,
+        'countries': snapshot.countries,
+        'cities': snapshot.cities,
+        'watermark': snapshot.watermark.isoformat() if snapshot.watermark else None,
+        'built_at': snapshot.built_at,
+    }).encode()
+    data_start = _aligned(HEADER.size + len(metadata))
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT, version, rows, len(metadata)))
+        f.write(metadata)
+        for column in columns:
+            f.seek(data_start + column['offset'])
+            f.write(np.ascontiguousarray(snapshot.columns[column['name']], dtype=column['dtype']).tobytes())
+        # Every column's range lies inside the file, even when empty
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_snapshot(path):
+    """(version, ProfileSnapshot) whose columns are read-only views of the mapped file."""
+    np = load_numpy()
+    with open(path, 'rb') as f:
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:  # empty file
+            raise SnapshotFileError(f'{path}: {e}')
+    if len(mapping) < HEADER.size:
+        raise SnapshotFileError(f'{path}: truncated header')
+    magic, file_format, version, rows, metadata_length = HEADER.unpack_from(mapping)
+    if magic != MAGIC or file_format != FORMAT:
+        raise SnapshotFileError(f'{path}: not a format {FORMAT} profile snapshot')
+    try:
+        metadata = json.loads(mapping[HEADER.size:HEADER.size + metadata_length])
+        data_start = _aligned(HEADER.size + metadata_length)
+        # The mapping stays open as long as any column view references it
+        columns = {
+            column['name']: np.frombuffer(
+                mapping, dtype=column['dtype'], count=rows, offset=data_start + column['offset'],
+            )
+            for column in metadata['columns']
+        }
+    except (ValueError, KeyError, TypeError) as e:
+        raise SnapshotFileError(f'{path}: {e}')
+    if set(columns) != {name for name, _dtype in COLUMNS}:
+        raise SnapshotFileError(f'{path}: unexpected columns')
+
+    snapshot = ProfileSnapshot(
+        columns,
+        metadata['sport_bits'],
+        metadata['countries'],
+        metadata['cities'],
+        parse_datetime(metadata['watermark']) if metadata['watermark'] else None,
+        metadata['built_at'],
+    )
+    return version, snapshot
+
+
+def current_file(directory):
+    """Name of the live snapshot in `directory` ('' when none was published)."""
+    try:
+        with open(os.path.join(directory, POINTER)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ''
+
+
+def read_current(directory):
+    """(file name, version, ProfileSnapshot) of the live snapshot, or None."""
+    name = current_file(directory)
+    if not name:
+        return None
+    version, snapshot = read_snapshot(os.path.join(directory, name))
+    return name, version, snapshot
+
+
+def publish_snapshot(snapshot, directory):
+    """Write `snapshot` as the new live snapshot of `directory`. Returns its version."""
+    os.makedirs(directory, exist_ok=True)
+    version = time.time_ns()
+    name = f'profiles-{version}.snap'
+    path = os.path.join(directory, name)
+    write_snapshot(snapshot, path + '.tmp', version)
+    os.replace(path + '.tmp', path)
+
+    pointer = os.path.join(directory, POINTER)
+    with open(pointer + '.tmp', 'w') as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer + '.tmp', pointer)
+    _remove_old(directory, name)
+    return version
+
+
+def _remove_old(directory, current):
+    snapshots = sorted(
+        (entry for entry in os.listdir(directory) if SNAPSHOT_NAME.fullmatch(entry)),
+        key=lambda entry: int(entry[len('profiles-'):-len('.snap')]),
+    )
+    older = [entry for entry in snapshots if entry != current]
+    for entry in older[:max(len(older) - KEEP_PREVIOUS, 0)]:
+        try:
+            os.remove(os.path.join(directory, entry))
+        except OSError as e:
+            logger.warning(f"Could not remove old profile snapshot {entry}: {e}")
@@ -0,0 +1,179 @@
+"""
+Popular-search suggestions from the search history stream.
+
+Counting searches with a GROUP BY over SearchHistory on every request doesn't
+scale, so each logged search is fed to a space-saving top-K summary instead
+(Metwally et al.): at most ``SEARCH_SUGGESTIONS_CAPACITY`` counters per
+scope; a new query evicts the smallest counter and inherits its count as the
+error bound. Every query that really occurs more than ``total / capacity``
+times is guaranteed to be kept.
+
+Scopes are (country, sport), each also with a wildcard, so one search
+updates four summaries: ``TN:tennis``, ``TN:*``, ``*:tennis`` and ``*:*``.
+
+The summaries are fed from the search history writer's flush (off the
+request path) and served from memory. Each worker keeps the searches it saw
+since its last persist as a delta; every ``SEARCH_SUGGESTIONS_PERSIST_INTERVAL``
+seconds the deltas are merged into ``SearchSuggestionSketch`` rows and the
+merged summaries of all workers are read back. Reads check that interval
+too, so a worker that serves suggestions but logs no searches still picks up
+the other workers' counts.
+"""
+
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import SearchSuggestionSketch
+
+logger = logging.getLogger(__name__)
+
+ANY = '*'
+
+
+def normalize_query(query):
+    return re.sub(r'\s+', ' ', (query or '').strip().lower())
+
+
+def scope_key(country='', sport=''):
+    return f'{country or ANY}:{sport or ANY}'
+
+
+class SpaceSaving:
+    """Space-saving heavy-hitter summary: {item: [count, error]} with a fixed capacity."""
+
+    def __init__(self, capacity, counters=None):
+        self.capacity = capacity
+        self.counters = {item: list(value) for item, value in (counters or {}).items()}
+
+    def offer(self, item, weight=1):
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+        else:
+            # Replace the smallest counter; its count becomes our error bound
+            smallest = min(self.counters, key=lambda key: self.counters[key][0])
+            floor = self.counters.pop(smallest)[0]
+            self.counters[item] = [floor + weight, floor]
+
+    def merge(self, other):
+        """Add another summary's counts, then keep the `capacity` largest."""
+        for item, (count, error) in other.counters.items():
+            counter = self.counters.setdefault(item, [0, 0])
+            counter[0] += count
+            counter[1] += error
+        if len(self.counters) > self.capacity:
+            kept = sorted(self.counters.items(), key=lambda pair: pair[1][0], reverse=True)[:self.capacity]
+            self.counters = dict(kept)
+        return self
+
+    def top(self, limit=10, prefix=''):
+        """[(item, count)] with the largest counts, optionally only items starting with `prefix`."""
+        items = (
+            (item, counter[0]) for item, counter in self.counters.items()
+            if not prefix or item.startswith(prefix)
+        )
+        return sorted(items, key=lambda pair: (-pair[1], pair[0]))[:limit]
+
+
+class HeavyHitters:
+    """Per-process view of the summaries plus the delta not persisted yet."""
+
+    capacity = property(lambda self: getattr(settings, 'SEARCH_SUGGESTIONS_CAPACITY', 200))
+    persist_interval = property(lambda self: getattr(settings, 'SEARCH_SUGGESTIONS_PERSIST_INTERVAL', 60))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries = None  # scope -> SpaceSaving, loaded on first use
+        self._delta = {}  # scope -> SpaceSaving of searches not persisted yet
+        self._last_persist = time.monotonic()
+
+    def observe(self, query, country='', sport='', weight=1):
+        """Count one search (or `weight` repeats of it)."""
+        query = normalize_query(query)
+        if not query:
+            return
+        scopes = {scope_key(c, s) for c in (country, '') for s in (sport, '')}
+        summaries = self._load()
+        with self._lock:
+            for scope in scopes:
+                for store in (summaries, self._delta):
+                    if scope not in store:
+                        store[scope] = SpaceSaving(self.capacity)
+                    store[scope].offer(query, weight)
+
+    def top(self, country='', sport='', limit=10, prefix=''):
+        try:
+            self.persist_if_due()
+        except Exception as e:
+            # Serve the summaries we have rather than fail the request
+            logger.error(f"Could not refresh search suggestions: {e}")
+        summaries = self._load()
+        with self._lock:
+            summary = summaries.get(scope_key(country, sport))
+            return summary.top(limit, normalize_query(prefix)) if summary else []
+
+    def persist_if_due(self):
+        if time.monotonic() - self._last_persist >= self.persist_interval:
+            self.persist()
+
+    def persist(self):
+        """Merge this worker's delta into the stored summaries and reload all of them."""
+        with self._lock:
+            delta, self._delta = self._delta, {}
+            self._last_persist = time.monotonic()
+
+        try:
+            with transaction.atomic():
+                rows = {
+                    row.scope: row
+                    for row in SearchSuggestionSketch.objects.select_for_update().filter(scope__in=list(delta))
+                }
+                for scope, summary in delta.items():
+                    row = rows.get(scope)
+                    if row is None:
+                        SearchSuggestionSketch.objects.create(scope=scope, counters=summary.counters)
+                    else:
+                        row.counters = SpaceSaving(self.capacity, row.counters).merge(summary).counters
+                        row.save(update_fields=['counters', 'updated_at'])
+        except Exception:
+            # Keep the counts for the next attempt
+            with self._lock:
+                for scope, summary in delta.items():
+                    self._delta.setdefault(scope, SpaceSaving(self.capacity)).merge(summary)
+            raise
+
+        summaries = self._read_all()
+        with self._lock:
+            # Searches observed while we were writing are in the new delta; replay them
+            for scope, pending in self._delta.items():
+                summaries.setdefault(scope, SpaceSaving(self.capacity)).merge(pending)
+            self._summaries = summaries
+
+    def reset(self):
+        with self._lock:
+            self._summaries = None
+            self._delta = {}
+
+    def _load(self):
+        if self._summaries is None:
+            summaries = self._read_all()
+            with self._lock:
+                if self._summaries is None:
+                    self._summaries = summaries
+        return self._summaries
+
+    def _read_all(self):
+        return {
+            scope: SpaceSaving(self.capacity, counters)
+            for scope, counters in SearchSuggestionSketch.objects.values_list('scope', 'counters')
+        }
+
+
+heavy_hitters = HeavyHitters()
@@ -1,3 +1,818 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core.cache import get_cache_stats, hit_counter
+from apps.users.models import User, UserProfile
+from .alerts import candidate_filters
+from .cities import CityTrie, city_autocomplete
+from .history import SearchHistoryBuffer, history_buffer
+from .facets import facet_counts
+from .feed import recommendation_page, viewed_marker
+from .feedback import excluded_partners
+from .fulltext import keyword_search
+from .generations import build_recommendations, current_generation, prune_stale, prune_user, publish_recommendations
+from .models import (
+    DailySearchRollup, DismissedPartner, PartnerRecommendation, RecommendationGeneration, SearchAlert, SearchFacetCount, SearchFilter, SearchHistory,
+)
+from .profile_store import ProfileSnapshot, numpy_installed, profile_rows, profile_store
+from .results import find_partners, rank_profiles, ranking_context
+from .snapshot_files import SnapshotFileError, publish_snapshot, read_current, read_snapshot
+from .rollups import rollup_pending
+from .suggestions import HeavyHitters, SpaceSaving, heavy_hitters
+
+
+def make_profile(name, sports, city='', country='TN', **fields):
+    """A user <name>@example.com with a profile; first_name defaults to the name."""
+    user = User.objects.create_user(email=f'{name}@example.com', password='testpass123')
+    fields.setdefault('first_name', name.title())
+    return UserProfile.objects.create(user=user, sports=json.dumps(sports), city=city, country=country, **fields)
+
+
+@override_settings(
+    SEARCH_HISTORY_ASYNC=False,
+    SEARCH_HISTORY_BUFFER_SIZE=3,
+    SEARCH_HISTORY_FLUSH_INTERVAL=3600,
+    SEARCH_HISTORY_COLLAPSE_WINDOW=60,
+)
+class SearchHistoryBufferTestCase(TestCase):
+    """Test cases for the buffered, batched search history writer."""
+
+    def setUp(self):
+        self.buffer = SearchHistoryBuffer()
+        history_buffer.reset()
+        User.objects.create_user(email='alice@example.com', password='testpass123')
+        User.objects.create_user(email='bob@example.com', password='testpass123')
+        # Like request.user, which comes with its profile (see apps.users.cache)
+        self.alice = User.objects.select_related('profile').get(email='alice@example.com')
+        self.bob = User.objects.select_related('profile').get(email='bob@example.com')
+
+    def test_searches_are_buffered_until_the_size_threshold(self):
+        """Nothing is written per search; a full buffer is one bulk insert."""
+        with self.assertNumQueries(0):
+            self.buffer.record(self.alice, 'tennis', {'sport': 'tennis'}, 4)
+            self.buffer.record(self.bob, 'tennis', {'sport': 'tennis'}, 4)
+        self.assertEqual(self.buffer.pending(), 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.buffer.record(self.alice, 'running', {'sport': 'running'}, 2)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "search_searchhistory"')]
+        self.assertEqual(len(inserts), 1)
+
+        self.assertEqual(SearchHistory.objects.count(), 3)
+        self.assertEqual(self.buffer.pending(), 0)
+
+    def test_repeated_search_is_collapsed(self):
+        """The same search again within the window bumps a counter."""
+        for _ in range(2):
+            self.buffer.record(self.alice, 'soccer', {'sport': 'soccer'}, 7)
+        self.buffer.flush()
+        # Already written: the next repeat becomes an UPDATE of the same row
+        self.buffer.record(self.alice, 'soccer', {'sport': 'soccer'}, 8)
+        self.buffer.flush()
+
+        entry = SearchHistory.objects.get()
+        self.assertEqual(entry.repeat_count, 3)
+        self.assertEqual(entry.results_count, 8)
+
+    def test_different_filters_are_new_rows(self):
+        """Only identical query and filters are collapsed."""
+        self.buffer.record(self.alice, 'soccer', {'sport': 'soccer', 'level': ''}, 7)
+        self.buffer.record(self.alice, 'soccer', {'sport': 'soccer', 'level': 'advanced'}, 2)
+        self.buffer.flush()
+
+        self.assertEqual(SearchHistory.objects.count(), 2)
+
+    def test_history_page_shows_buffered_searches(self):
+        """The history view flushes first."""
+        self.client.force_login(self.alice)
+        self.client.get(reverse('search:search_partners'), {'sport': 'tennis'})
+        response = self.client.get(reverse('search:search_history'))
+
+        self.assertEqual(len(response.context['history']), 1)
+
+
+class SearchHistoryRollupTestCase(TestCase):
+    """Test cases for daily search rollups and raw history retention."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(email='alice@example.com', password='testpass123')
+        self.bob = User.objects.create_user(email='bob@example.com', password='testpass123')
+        self.today = timezone.localdate()
+
+    def _search(self, user, query, days_ago=0, results=5, repeats=1):
+        entry = SearchHistory.objects.create(
+            user=user, search_query=query, filters_used={'sport': query},
+            results_count=results, repeat_count=repeats,
+        )
+        # created_at is auto_now_add; move it back by hand
+        SearchHistory.objects.filter(pk=entry.pk).update(
+            created_at=timezone.now() - timedelta(days=days_ago)
+        )
+
+    def test_rollup_counts_searches_and_users(self):
+        """Repeats count as searches, users are counted once."""
+        self._search(self.alice, 'tennis', repeats=3, results=4)
+        self._search(self.bob, 'tennis', results=8)
+        self._search(self.bob, 'running')
+
+        rollup_pending()
+
+        tennis = DailySearchRollup.objects.get(day=self.today, search_query='tennis')
+        self.assertEqual(tennis.searches, 4)
+        self.assertEqual(tennis.users, 2)
+        self.assertEqual(tennis.average_results, 5)
+        self.assertEqual(DailySearchRollup.objects.count(), 2)
+
+    def test_rollup_is_incremental_and_idempotent(self):
+        """Only days since the last rolled-up day are rebuilt."""
+        self._search(self.alice, 'tennis', days_ago=3)
+        self.assertEqual(len(rollup_pending()), 4)
+
+        self._search(self.alice, 'soccer')
+        rollup_pending()
+        # Today is the latest rolled-up day, so it is the only one rebuilt
+        self.assertEqual(rollup_pending(), {self.today: 1})
+
+        self.assertEqual(DailySearchRollup.objects.filter(search_query='tennis').count(), 1)
+        self.assertEqual(DailySearchRollup.objects.filter(search_query='soccer').count(), 1)
+
+    def test_command_purges_only_rolled_up_rows_past_retention(self):
+        """Old raw rows go, their rollups stay."""
+        self._search(self.alice, 'tennis', days_ago=40)
+        self._search(self.alice, 'soccer')
+
+        call_command('rollup_search_history', retention_days=30, batch_size=1, stdout=StringIO())
+
+        self.assertEqual(list(SearchHistory.objects.values_list('search_query', flat=True)), ['soccer'])
+        self.assertTrue(DailySearchRollup.objects.filter(search_query='tennis').exists())
+
+
+@override_settings(SEARCH_HISTORY_ASYNC=False, SEARCH_SUGGESTIONS_CAPACITY=3)
+class SearchSuggestionsTestCase(TestCase):
+    """Test cases for heavy-hitter search suggestions."""
+
+    def setUp(self):
+        heavy_hitters.reset()
+        history_buffer.reset()
+        self.addCleanup(heavy_hitters.reset)
+        self.user = User.objects.create_user(email='alice@example.com', password='testpass123')
+
+    def test_space_saving_keeps_heavy_hitters(self):
+        """Frequent items survive a stream of one-off items."""
+        summary = SpaceSaving(3)
+        for i in range(50):
+            summary.offer('tennis sfax')
+            summary.offer(f'rare {i}')
+
+        self.assertEqual(summary.top(1)[0][0], 'tennis sfax')
+        self.assertLessEqual(len(summary.counters), 3)
+
+    def test_scopes_and_persistence(self):
+        """Searches count in their country/sport scopes and survive a reload."""
+        heavy_hitters.observe('Tennis  Sfax', 'TN', 'tennis', weight=3)
+        heavy_hitters.observe('running tunis', 'TN', 'running')
+        heavy_hitters.observe('tennis paris', 'FR', 'tennis')
+        heavy_hitters.persist()
+        heavy_hitters.reset()
+
+        self.assertEqual(heavy_hitters.top('TN', 'tennis'), [('tennis sfax', 3)])
+        self.assertEqual([q for q, _c in heavy_hitters.top(sport='tennis')], ['tennis sfax', 'tennis paris'])
+        self.assertEqual(len(heavy_hitters.top('TN')), 2)
+
+    @override_settings(SEARCH_SUGGESTIONS_PERSIST_INTERVAL=0)
+    def test_reads_pick_up_other_workers(self):
+        """A worker that logs no searches still reloads the shared summaries."""
+        self.assertEqual(heavy_hitters.top('TN'), [])
+        other_worker = HeavyHitters()
+        other_worker.observe('padel tunis', 'TN', 'padel')
+        other_worker.persist()
+
+        self.assertEqual(heavy_hitters.top('TN'), [('padel tunis', 1)])
+
+    def test_endpoint_returns_prefix_matches(self):
+        """Logged searches show up in the JSON endpoint."""
+        self.client.force_login(self.user)
+        for sport in ('tennis', 'tennis', 'running'):
+            self.client.get(reverse('search:search_partners'), {'sport': sport})
+        history_buffer.flush()
+
+        response = self.client.get(reverse('search:search_suggestions'), {'q': 'ten'})
+
+        self.assertEqual(response.json(), {'suggestions': [{'query': 'tennis', 'count': 2}]})
+
+
+@override_settings(SEARCH_HISTORY_ASYNC=False)
+class KeywordSearchTestCase(TestCase):
+    """Test cases for the ranked full-text partner search."""
+
+    def setUp(self):
+        self.addCleanup(history_buffer.reset)
+        self.searcher = User.objects.create_user(email='searcher@example.com', password='testpass123')
+        self.coach = make_profile(
+            'coach', ['Running'], 'Sfax', first_name='Amine', last_name='Test', bio='Marathon coach, trains every weekend.'
+        )
+        make_profile('tennis', ['Tennis'], 'Sfax', first_name='Sara', last_name='Test', bio='Tennis player looking for a partner.')
+        make_profile('runner', ['Running'], 'Tunis', first_name='Yassine', last_name='Test', bio='Casual runner, marathon someday.')
+        self.client.force_login(self.searcher)
+
+    def _search(self, **params):
+        response = self.client.get(reverse('search:search_partners'), params)
+        return [profile.first_name for profile in response.context['results']]
+
+    def test_best_match_first(self):
+        """Profiles matching more keywords rank higher; stopwords are ignored."""
+        self.assertEqual(self._search(q='marathon coach in Sfax')[0], 'Amine')
+
+    def test_keywords_combine_with_sport_and_location(self):
+        """Sport and location filters narrow the keyword match."""
+        self.assertEqual(self._search(q='marathon', sport='Running', location='tunis'), ['Yassine'])
+        self.assertEqual(self._search(q='sfax', sport='Tennis'), ['Sara'])
+
+    def test_index_follows_profile_edits(self):
+        """Saving a profile re-indexes it; deleting removes it."""
+        self.coach.bio = 'Cycling fan'
+        self.coach.save()
+        self.assertEqual(self._search(q='coach'), [])
+
+        self.assertEqual(self._search(q='cycling'), ['Amine'])
+        self.coach.delete()
+        self.assertEqual(self._search(q='cycling'), [])
+
+    def test_every_keyword_matches_a_word_prefix(self):
+        """All keywords must match, as word prefixes, with or without the FTS index."""
+        queries = {
+            'mara coach': {'Amine'},
+            'marathon': {'Amine', 'Yassine'},
+            'runner sfax': set(),
+            'arathon': set(),
+        }
+        for fts in (True, False):
+            with patch('apps.search.fulltext.uses_fts5', return_value=fts):
+                for query, expected in queries.items():
+                    matches = keyword_search(UserProfile.objects.all(), query)
+                    self.assertEqual({profile.first_name for profile in matches}, expected, (query, fts))
+
+    def test_fts_syntax_in_input_is_harmless(self):
+        """Quotes and operators in the input don't break the query."""
+        self.assertEqual(self._search(q='"marathon" OR (coach* AND')[0], 'Amine')
+
+
+@override_settings(CITY_GAZETTEER_PATH=None, CITY_AUTOCOMPLETE_REFRESH=0)
+class CityAutocompleteTestCase(TestCase):
+    """Test cases for the prefix-trie city autocomplete."""
+
+    def setUp(self):
+        city_autocomplete.reset()
+        self.addCleanup(city_autocomplete.reset)
+        for i, (country, city) in enumerate([
+            ('TN', 'Sfax'), ('TN', 'Sfax'), ('TN', 'sfax'), ('TN', 'Sousse'), ('TN', 'Tunis'), ('FR', 'Strasbourg'),
+        ]):
+            user = User.objects.create_user(email=f'city{i}@example.com', password='testpass123')
+            UserProfile.objects.create(user=user, country=country, city=city)
+        self.user = User.objects.get(email='city0@example.com')
+
+    def test_trie_ranks_by_use_and_ignores_accents(self):
+        """Most used first, case and accents don't matter."""
+        trie = CityTrie()
+        trie.add('Sousse', 1)
+        trie.add('Sfax', 3)
+        trie.add('Sidi Bouzid', 0)
+
+        self.assertEqual(trie.complete('S'), ['Sfax', 'Sousse', 'Sidi Bouzid'])
+        self.assertEqual(trie.complete('SFÀ'), ['Sfax'])
+        self.assertEqual(trie.complete('x'), [])
+
+    def test_endpoint_is_scoped_by_country(self):
+        """One spelling per city; other countries' cities are left out."""
+        self.client.force_login(self.user)
+        url = reverse('search:city_suggestions')
+
+        self.assertEqual(self.client.get(url, {'q': 's', 'country': 'TN'}).json(), {'cities': ['Sfax', 'Sousse']})
+        self.assertEqual(self.client.get(url, {'q': 's'}).json()['cities'], ['Sfax', 'Sousse', 'Strasbourg'])
+
+    def test_new_cities_are_picked_up(self):
+        """Profiles saved after the build are added on the next refresh."""
+        city_autocomplete.complete('s', 'TN')
+        user = User.objects.create_user(email='new@example.com', password='testpass123')
+        UserProfile.objects.create(user=user, country='TN', city='Sidi Bou Said')
+
+        self.assertIn('Sidi Bou Said', city_autocomplete.complete('sid', 'TN'))
+
+
+class SearchAlertTestCase(TestCase):
+    """Test cases for saved-search alerts matched through the reverse index."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(email='alice@example.com', password='testpass123')
+        self.bob = User.objects.create_user(email='bob@example.com', password='testpass123')
+        self.tennis_sfax = self._filter(self.alice, 'Tennis in Sfax', sport_type='tennis', location='Sfax, Tunisia')
+        self.any_running = self._filter(self.bob, 'Running in Tunisia', sport_type='running', country='TN')
+        self._filter(self.bob, 'Tennis in Paris', sport_type='tennis', location='Paris')
+        self._filter(self.bob, 'Tennis, alerts off', sport_type='tennis', alerts_enabled=False)
+
+    def _filter(self, user, name, alerts_enabled=True, **criteria):
+        return SearchFilter.objects.create(user=user, name=name, alerts_enabled=alerts_enabled, **criteria)
+
+    def test_only_candidate_filters_are_looked_up(self):
+        """The index keys select the filters; other cities, sports and disabled alerts are skipped."""
+        profile = make_profile('sara', ['Tennis', 'Running'], city='SFAX')
+
+        self.assertEqual(set(candidate_filters(profile)), {self.tennis_sfax, self.any_running})
+        self.assertEqual(
+            set(SearchAlert.objects.values_list('search_filter__name', flat=True)),
+            {'Tennis in Sfax', 'Running in Tunisia'},
+        )
+
+    def test_changed_profile_is_matched_once(self):
+        """A profile moving into a filter's city is announced once, and never to itself."""
+        profile = make_profile('amine', ['tennis'], city='Tunis')
+        self._filter(profile.user, 'My own search', sport_type='tennis')
+        self.assertFalse(SearchAlert.objects.exists())
+
+        profile.city = 'Sfax'
+        profile.save()
+        profile.save()
+        profile.bio = 'Lefty'
+        profile.save(update_fields=['bio'])
+
+        self.assertEqual(list(SearchAlert.objects.values_list('search_filter', flat=True)), [self.tennis_sfax.pk])
+
+    def test_availability_days_are_checked(self):
+        """Criteria outside the index are evaluated on the candidates."""
+        self.any_running.availability_days = ['saturday']
+        self.any_running.save()
+
+        make_profile('weekday', ['running'], availability='Mondays after work')
+        make_profile('weekend', ['running'], availability='Saturday mornings')
+
+        self.assertEqual(
+            list(SearchAlert.objects.values_list('profile__first_name', flat=True)), ['Weekend']
+        )
+
+    def test_digest_worker_sends_one_email_per_user(self):
+        """Pending alerts are emailed as one digest per owner, then marked as sent."""
+        make_profile('sara', ['tennis', 'running'], city='Sfax')
+        make_profile('yassine', ['running'], city='Tunis')
+
+        call_command('send_search_alerts', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['alice@example.com', 'bob@example.com'])
+        bob_digest = next(message for message in mail.outbox if message.to == ['bob@example.com'])
+        self.assertIn('Sara', bob_digest.body)
+        self.assertIn('Yassine', bob_digest.body)
+        self.assertFalse(SearchAlert.objects.filter(sent_at__isnull=True).exists())
+
+
+@override_settings(SEARCH_HISTORY_ASYNC=False)
+class SearchResultCacheTestCase(TestCase):
+    """Test cases for the ranked, paginated and cached partner search."""
+
+    def setUp(self):
+        cache.clear()
+        hit_counter.reset()
+        self.addCleanup(history_buffer.reset)
+        self.alice = make_profile('alice', ['football'], 'Sfax')
+        self.bob = make_profile('bob', ['football', 'tennis'], 'Sfax')
+        self.sara = make_profile('sara', ['tennis'], 'Tunis')
+
+    def _page(self, profile, **filters):
+        return find_partners(User.objects.select_related('profile').get(pk=profile.user_id), **filters)
+
+    def _search(self, profile, **filters):
+        page = self._page(profile, **filters)
+        return [result.first_name for result in page.profiles], page.total
+
+    def _stats(self):
+        return get_cache_stats(['search_results'])['search_results']
+
+    def test_entry_is_shared_and_excludes_the_requester(self):
+        """Searchers with the same ranking context share one entry, each without themselves."""
+        karim = make_profile('karim', ['football'], 'Sfax')
+
+        self.assertEqual(self._search(self.alice, sport='football'), (['Karim', 'Bob'], 2))
+        self.assertEqual(self._search(karim, sport='football'), (['Bob', 'Alice'], 2))
+        self.assertEqual((self._stats()['hits'], self._stats()['misses']), (1, 1))
+
+    def test_filters_are_normalized(self):
+        """Case, spacing and parameters that don't change the matches share the entry."""
+        self.client.force_login(self.sara.user)
+        self.client.get(reverse('search:search_partners'), {'sport': 'football', 'location': 'sfax'})
+        response = self.client.get(
+            reverse('search:search_partners'), {'sport': 'football', 'location': ' SFAX ', 'level': 'advanced'}
+        )
+
+        self.assertEqual(response.context['total_results'], 2)
+        self.assertEqual(self._stats()['hits'], 1)
+
+    def test_profile_writes_invalidate_their_sports_only(self):
+        """A tennis player joining leaves football searches cached; any search without a sport is rebuilt."""
+        self._search(self.sara, sport='football')
+        self._search(self.sara)
+        make_profile('yassine', ['tennis'], 'Sfax')
+
+        self._search(self.sara, sport='football')
+        self.assertEqual(self._stats()['hits'], 1)
+        self.assertEqual(self._search(self.sara)[1], 3)
+
+        # Leaving football invalidates football searches too
+        self.bob.sports = json.dumps(['tennis'])
+        self.bob.save()
+        self.assertEqual(self._search(self.sara, sport='football'), (['Alice'], 1))
+
+    def test_ranking_follows_the_searcher(self):
+        """Shared sports, same city/country and recent activity rank first."""
+        make_profile('amine', ['tennis'], 'Tunis')
+        make_profile('pierre', ['tennis'], 'Paris', country='FR')
+        old = make_profile('old', ['tennis'], 'Tunis')
+        UserProfile.objects.filter(pk=old.pk).update(updated_at=timezone.now() - timedelta(days=60))
+
+        self.assertEqual(self._search(self.sara)[0], ['Amine', 'Old', 'Bob', 'Pierre', 'Alice'])
+
+    @override_settings(SEARCH_RESULTS_CACHE_MAX_IDS=3)
+    def test_cursor_pages_cover_every_match_once(self):
+        """Pages continue from the stored ids into keyset queries without gaps or repeats."""
+        for i in range(6):
+            make_profile(f'player{i}', ['football'], 'Tunis' if i % 2 else 'Sfax')
+
+        seen, cursor = [], None
+        for _ in range(10):
+            page = self._page(self.sara, sport='football', limit=2, cursor=cursor)
+            seen += [profile.first_name for profile in page.profiles]
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        self.assertEqual(len(seen), 8)
+        self.assertEqual(set(seen), set(UserProfile.objects.exclude(pk=self.sara.pk).values_list('first_name', flat=True)))
+
+    def test_forged_cursor_restarts_at_the_first_page(self):
+        """Cursor values of the wrong type for their ordering term are ignored, not a 500."""
+        self.client.force_login(self.sara.user)
+        first = self.client.get(reverse('search:search_partners'), {'sport': 'football'})
+        for values in ([0, 0, 999], [3, '2024-13-45T00:00:00', 1], [True, '2024-01-01T00:00:00+00:00', 1.5], True):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            response = self.client.get(reverse('search:search_partners'), {'sport': 'football', 'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.context['results']), list(first.context['results']))
+
+    @override_settings(SEARCH_RESULTS_COUNT_CAP=1)
+    def test_count_is_capped(self):
+        """Past the cap the total is reported as 'at least'."""
+        page = self._page(self.sara, sport='football')
+
+        self.assertEqual((page.total, page.total_capped), (1, True))
+        self.assertEqual(len(page.profiles), 2)
+
+    @override_settings(SEARCH_RESULTS_CACHE_MAX_IDS=1)
+    def test_total_excludes_requester_past_the_stored_ids(self):
+        """Only the first ids are stored; the total still leaves the requester out."""
+        yassine = make_profile('yassine', ['football'], 'Tunis')
+
+        self.assertEqual(self._search(yassine, sport='football'), (['Bob', 'Alice'], 2))
+        self.assertEqual(sorted(self._search(self.sara, sport='football')[0]), ['Alice', 'Bob', 'Yassine'])
+
+
+@override_settings(SEARCH_HISTORY_ASYNC=False)
+class SearchFacetTestCase(TestCase):
+    """Test cases for the incrementally maintained facet counters."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(history_buffer.reset)
+        self.alice = make_profile('alice', ['Football'], 'Sfax')
+        self.bob = make_profile('bob', ['Football', 'Tennis'], 'sfax')
+        self.pierre = make_profile('pierre', ['Tennis'], 'Paris', country='FR')
+
+    def _counts(self, facet):
+        return dict(SearchFacetCount.objects.filter(facet=facet, count__gt=0).values_list('value', 'count'))
+
+    def test_counters_follow_profile_writes(self):
+        """Creates, edits and deletes move only the facets that changed."""
+        self.assertEqual(self._counts('sport'), {'Football': 2, 'Tennis': 2})
+        self.assertEqual(self._counts('city'), {'TN:sfax': 2, 'FR:paris': 1})
+
+        self.bob.sports = json.dumps(['Tennis'])
+        self.bob.city = 'Tunis'
+        self.bob.save()
+        self.pierre.delete()
+
+        self.assertEqual(self._counts('sport'), {'Football': 1, 'Tennis': 1})
+        self.assertEqual(self._counts('city'), {'TN:sfax': 1, 'TN:tunis': 1})
+        self.assertEqual(self._counts('country'), {'TN': 2})
+
+    def test_reconcile_corrects_drift(self):
+        """Writes that skip the signals are fixed by the recount."""
+        UserProfile.objects.filter(pk=self.alice.pk).update(sports=json.dumps(['Yoga']))
+
+        call_command('reconcile_search_facets', stdout=StringIO())
+
+        self.assertEqual(self._counts('sport'), {'Football': 1, 'Tennis': 2, 'Yoga': 1})
+
+    def test_served_from_cache(self):
+        """The page and the endpoint read the cached counts; a profile write refreshes them."""
+        self.client.force_login(self.alice.user)
+        response = self.client.get(reverse('search:search_partners'))
+        self.assertIn(('Football', 'Football (2)'), response.context['sport_options'])
+        self.assertEqual([city['label'] for city in response.context['popular_cities']], ['Sfax'])
+
+        with self.assertNumQueries(0):
+            facet_counts(country='TN')
+        make_profile('sara', ['Football'], 'Sousse')
+
+        data = self.client.get(reverse('search:search_facets'), {'country': 'TN'}).json()
+        self.assertEqual(data['sport'][0], {'value': 'Football', 'label': 'Football', 'count': 3})
+        self.assertEqual([city['value'] for city in data['city']], ['Sfax', 'Sousse'])
+        self.assertEqual({item['value'] for item in data['country']}, {'TN', 'FR'})
+
+
+@override_settings(RECOMMENDATIONS_VIEWED_ASYNC=False)
+class RecommendationFeedTestCase(TestCase):
+    """Test cases for the paged recommendations feed."""
+
+    def setUp(self):
+        viewed_marker.reset()
+        self.user = User.objects.create_user(email='alice@example.com', password='testpass123')
+        for i in range(13):
+            partner = User.objects.create_user(email=f'partner{i}@example.com', password='testpass123')
+            UserProfile.objects.create(user=partner, bio=f'Partner {i}', sports=json.dumps(['Tennis']))
+            PartnerRecommendation.objects.create(
+                user=self.user, recommended_user=partner, match_score=50 + i, is_dismissed=(i == 12),
+            )
+        self.client.force_login(self.user)
+
+    def test_pages_are_best_first_and_skip_dismissed(self):
+        """Ten per page; the next page continues from the cursor."""
+        response = self.client.get(reverse('search:recommendations'))
+        first = [rec.match_score for rec in response.context['recommendations']]
+        self.assertEqual(first, [61, 60, 59, 58, 57, 56, 55, 54, 53, 52])
+        self.assertContains(response, 'Tennis')
+
+        more = self.client.get(
+            reverse('search:recommendations') + response.context['next_page_url'],
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertTemplateUsed(more, 'search/partials/recommendation_cards.html')
+        self.assertEqual([rec.match_score for rec in more.context['recommendations']], [51, 50])
+        self.assertIsNone(more.context['next_page_url'])
+
+    def test_malformed_cursor_shows_the_first_page(self):
+        """A cursor whose values don't fit the ordering is ignored."""
+        first, _cursor = recommendation_page(self.user)
+        for values in ([0, 0, 999], [55.0, '2024-13-45T00:00:00', 1], [55.0, '2024-01-01T00:00:00', 1], [True, True, True]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            response = self.client.get(reverse('search:recommendations'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.context['recommendations']), first)
+
+    def test_shown_rows_are_marked_viewed_in_one_update(self):
+        """Only the rows displayed are marked, with a single UPDATE."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('search:recommendations'))
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "search_partnerrecommendation"')]
+
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(PartnerRecommendation.objects.filter(is_viewed=True).count(), 10)
+
+
+@override_settings(RECOMMENDATIONS_PER_USER=3)
+class RecommendationGenerationTestCase(TestCase):
+    """Test cases for publishing recommendation runs as generations."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='alice@example.com', password='testpass123')
+        self.partners = [
+            User.objects.create_user(email=f'partner{i}@example.com', password='testpass123') for i in range(5)
+        ]
+
+    def _publish(self, scores):
+        return publish_recommendations(self.user, [
+            {'recommended_user': self.partners[i], 'match_score': score} for i, score in scores.items()
+        ])
+
+    def test_publish_replaces_the_previous_run(self):
+        """Only the top K of the latest run are kept, and the feed sees only them."""
+        self.assertEqual(self._publish({0: 90, 1: 80, 2: 70, 3: 60}), 1)
+        self.assertEqual(self._publish({1: 85, 3: 75, 4: 65}), 2)
+
+        self.assertEqual(current_generation(self.user), 2)
+        page, _cursor = recommendation_page(self.user)
+        self.assertEqual([rec.recommended_user for rec in page], [self.partners[1], self.partners[3], self.partners[4]])
+        self.assertEqual(PartnerRecommendation.objects.filter(user=self.user).count(), 3)
+
+    def test_flags_carry_over_to_the_new_run(self):
+        """A partner liked in the current run stays liked when recommended again."""
+        self._publish({0: 90, 1: 80})
+        PartnerRecommendation.objects.filter(recommended_user=self.partners[0]).update(is_liked=True, is_viewed=True)
+        self._publish({0: 95, 1: 85})
+
+        page, _cursor = recommendation_page(self.user)
+        self.assertEqual([(rec.is_liked, rec.is_viewed) for rec in page], [(True, True), (False, False)])
+
+    def test_late_prune_keeps_a_newer_generation(self):
+        """A run pruning after a concurrent run published leaves the newer feed alone."""
+        first = self._publish({0: 90})
+        self._publish({1: 80})
+
+        self.assertEqual(prune_user(self.user, first), 0)
+        page, _cursor = recommendation_page(self.user)
+        self.assertEqual([rec.recommended_user for rec in page], [self.partners[1]])
+
+    def test_prune_removes_rows_of_other_generations(self):
+        """Rows left by an unfinished run, or never published, are pruned."""
+        self._publish({0: 90})
+        PartnerRecommendation.objects.create(user=self.user, recommended_user=self.partners[1], match_score=50, generation=7)
+        other = self.partners[2]
+        PartnerRecommendation.objects.create(user=other, recommended_user=self.partners[3], match_score=50)
+
+        self.assertEqual(prune_stale(chunk_size=1), 1)
+        self.assertEqual(PartnerRecommendation.objects.filter(user=self.user).count(), 1)
+        self.assertTrue(PartnerRecommendation.objects.filter(user=other).exists())
+        self.assertEqual(self._publish({2: 60}), 2)
+        self.assertEqual(RecommendationGeneration.objects.get(user=self.user).current, 2)
+
+
+class RecommendationFeedbackTestCase(TestCase):
+    """Test cases for batched recommendation feedback and the exclusion set."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='alice@example.com', password='testpass123')
+        self.other = User.objects.create_user(email='bob@example.com', password='testpass123')
+        self.partners = [
+            User.objects.create_user(email=f'partner{i}@example.com', password='testpass123') for i in range(4)
+        ]
+        publish_recommendations(self.user, [
+            {'recommended_user': partner, 'match_score': 90 - i} for i, partner in enumerate(self.partners)
+        ])
+        self.recs = list(PartnerRecommendation.objects.filter(user=self.user).order_by('-match_score'))
+        self.client.force_login(self.user)
+
+    def _post(self, events):
+        return self.client.post(
+            reverse('search:recommendation_feedback'), json.dumps({'events': events}), content_type='application/json',
+        )
+
+    def test_batch_is_applied_with_one_update_per_action(self):
+        """Many events, a handful of statements; other users' rows are left alone."""
+        theirs = PartnerRecommendation.objects.create(user=self.other, recommended_user=self.partners[0], match_score=50)
+        events = [
+            {'id': self.recs[0].pk, 'action': 'dismiss'},
+            {'id': self.recs[1].pk, 'action': 'dismiss'},
+            {'id': self.recs[2].pk, 'action': 'like'},
+            {'id': self.recs[2].pk, 'action': 'viewed'},
+            {'id': self.recs[3].pk, 'action': 'viewed'},
+            {'id': theirs.pk, 'action': 'dismiss'},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self._post(events)
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "search_partnerrecommendation"')]
+
+        self.assertEqual(response.json()['updated'], {'dismiss': 2, 'like': 1, 'viewed': 2})
+        self.assertEqual(len(updates), 3)
+        self.assertFalse(PartnerRecommendation.objects.get(pk=theirs.pk).is_dismissed)
+        self.assertEqual(excluded_partners(self.user), {self.partners[0].pk, self.partners[1].pk})
+        self.assertFalse(DismissedPartner.objects.filter(user=self.other).exists())
+
+    def test_invalid_batch_changes_nothing(self):
+        response = self._post([{'id': self.recs[0].pk, 'action': 'dismiss'}, {'id': 'x', 'action': 'like'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PartnerRecommendation.objects.filter(is_dismissed=True).exists())
+        self.assertEqual(self.client.get(reverse('search:recommendation_feedback')).status_code, 405)
+
+    def test_dismissed_partners_are_never_suggested_again(self):
+        """The exclusion set survives new generations, and is invalidated by new dismissals."""
+        self.assertEqual(excluded_partners(self.user), frozenset())
+        self.client.post(reverse('search:dismiss_recommendation', args=[self.recs[0].pk]))
+        self.assertEqual(excluded_partners(self.user), {self.partners[0].pk})
+
+        publish_recommendations(self.user, [
+            {'recommended_user': partner, 'match_score': 95} for partner in self.partners
+        ])
+        page, _cursor = recommendation_page(self.user)
+        self.assertEqual({rec.recommended_user for rec in page}, set(self.partners[1:]))
+
+        DismissedPartner.objects.filter(user=self.user).delete()
+        self.assertEqual(excluded_partners(self.user), frozenset())
+
+
+@override_settings(PROFILE_STORE_REFRESH=0, PROFILE_STORE_REBUILD=3600)
+class ProfileStoreTestCase(TestCase):
+    """Test cases for the columnar profile store and the recommendations built from it."""
+
+    def setUp(self):
+        cache.clear()
+        profile_store.reset()
+        self.alice = make_profile('alice', ['Tennis', 'Running'], 'Sfax', availability='Monday and Friday evenings')
+        self.others = [
+            make_profile('bob', ['Tennis'], 'Sfax', availability='monday'),
+            make_profile('carol', ['Running', 'Tennis'], 'Tunis', availability='Friday'),
+            make_profile('dan', ['Football'], 'SFAX'),
+            make_profile('eve', ['Swimming'], 'Paris', country='FR', availability='sunday'),
+        ]
+
+    @skipUnless(numpy_installed(), 'NumPy is not installed')
+    def test_scores_match_the_sql_ranking(self):
+        """Same scores and order as rank_profiles, without a query."""
+        context = ranking_context(self.alice)
+        expected = list(
+            rank_profiles(UserProfile.objects.exclude(pk=self.alice.pk), context).values_list('user_id', 'match_score')
+        )
+        snapshot = profile_store.snapshot()
+        self.assertEqual(len(snapshot), 5)
+        self.assertEqual(snapshot.top(context, 10, exclude_user_ids={self.alice.user_id}), expected)
+
+        with self.assertNumQueries(0):
+            mask = snapshot.match(sport='Tennis', city='sfax')
+        self.assertEqual(snapshot.columns['ids'][mask].tolist(), [self.alice.pk, self.others[0].pk])
+
+    @skipUnless(numpy_installed(), 'NumPy is not installed')
+    def test_refresh_picks_up_saved_profiles(self):
+        snapshot = profile_store.snapshot()
+        self.others[3].sports = json.dumps(['Tennis'])
+        self.others[3].save()
+        frank = make_profile('frank', ['Tennis'], 'Sousse')
+
+        refreshed = profile_store.snapshot()
+        self.assertIsNot(refreshed, snapshot)
+        self.assertEqual(len(snapshot), 5)
+        self.assertEqual(refreshed.columns['ids'].tolist(), sorted([self.alice.pk, frank.pk] + [p.pk for p in self.others]))
+        self.assertEqual(refreshed.match(sport='Tennis').sum(), 5)
+
+    def test_build_recommendations_skips_dismissed_partners(self):
+        """Published best first, as a percentage of the best possible score."""
+        DismissedPartner.objects.create(user=self.alice.user, partner=self.others[1].user)
+        build_recommendations(self.alice)
+
+        page, _cursor = recommendation_page(self.alice.user)
+        self.assertEqual([rec.recommended_user for rec in page], [self.others[0].user, self.others[2].user, self.others[3].user])
+        self.assertIn('Lives nearby', page[0].reasons)
+        self.assertTrue(all(0 < rec.match_score <= 100 for rec in page))
+
+
+@skipUnless(numpy_installed(), 'NumPy is not installed')
+class ProfileSnapshotFileTestCase(TestCase):
+    """Test cases for the memory-mapped profile snapshot shared by workers."""
+
+    def setUp(self):
+        profile_store.reset()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(profile_store.reset)
+        for i, sports in enumerate([['Tennis'], ['Running', 'Tennis'], []]):
+            make_profile(f'user{i}', sports, 'Sfax', availability='monday')
+
+    def test_round_trip_maps_read_only_columns(self):
+        built = ProfileSnapshot.from_rows(profile_rows())
+        version = publish_snapshot(built, self.directory)
+
+        _name, mapped_version, mapped = read_current(self.directory)
+        self.assertEqual(mapped_version, version)
+        for name, column in built.columns.items():
+            self.assertEqual(mapped.columns[name].tolist(), column.tolist())
+            self.assertFalse(mapped.columns[name].flags.writeable)
+        self.assertEqual((mapped.sport_bits, mapped.cities, mapped.watermark), (built.sport_bits, built.cities, built.watermark))
+        self.assertEqual(mapped.match(sport='Tennis').sum(), 2)
+
+        path = os.path.join(self.directory, 'broken.snap')
+        with open(path, 'wb') as f:
+            f.write(b'not a snapshot at all, just some bytes')
+        with self.assertRaises(SnapshotFileError):
+            read_snapshot(path)
+
+    def test_workers_switch_to_the_published_version(self):
+        """Workers map the published snapshot and pick up the next one; old files are removed."""
+        with override_settings(PROFILE_STORE_DIR=self.directory, PROFILE_STORE_REFRESH=0):
+            call_command('publish_profile_snapshot', stdout=StringIO())
+            first = profile_store.snapshot()
+            first_version = profile_store.version
+            self.assertEqual(len(first), 3)
+
+            make_profile('late', ['Tennis'])
+            out = StringIO()
+            call_command('publish_profile_snapshot', stdout=out)
+            self.assertIn('1 profile(s) saved since', out.getvalue())
+            call_command('publish_profile_snapshot', '--full', stdout=StringIO())
+
+            current = profile_store.snapshot()
+            self.assertGreater(profile_store.version, first_version)
+            self.assertEqual(current.match(sport='Tennis').sum(), 3)
+            # The previous mapping is still readable by whoever holds it
+            self.assertEqual(first.match(sport='Tennis').sum(), 2)
+            snapshots = [name for name in os.listdir(self.directory) if name.endswith('.snap')]
+            self.assertEqual(len(snapshots), 2)
@@ -11,10 +11,20 @@ urlpatterns = [
     path('recommendations/', views.recommendations, name='recommendations'),
     path('recommendations/<int:recommendation_id>/dismiss/', 
          views.dismiss_recommendation, name='dismiss_recommendation'),
+    path('recommendations/feedback/', views.recommendation_feedback, name='recommendation_feedback'),
     
     # Search filters
     path('filters/save/', views.save_search_filter, name='save_filter'),
     
+    # Popular searches (JSON)
+    path('suggestions/', views.search_suggestions, name='search_suggestions'),
+    
+    # Facet counts (JSON)
+    path('facets/', views.search_facets, name='search_facets'),
+    
+    # City autocomplete (JSON)
+    path('cities/', views.city_suggestions, name='city_suggestions'),
+    
     # Search history
     path('history/', views.search_history_view, name='search_history'),
     
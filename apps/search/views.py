@@ -1,17 +1,33 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_POST
 from django.conf import settings
 import json
 from math import radians, sin, cos, sqrt, atan2
 
 # Import User and UserProfile from apps.users
+from apps.users.display import get_display_profile
 from apps.users.models import User, UserProfile
 
 # Import local models
-from .models import SearchFilter, PartnerRecommendation, SearchHistory
+from .models import SearchFilter, SearchHistory
+from .cities import city_autocomplete
+from .facets import facet_counts
+from .feed import recommendation_page, viewed_marker
+from .feedback import apply_feedback, parse_events
 from .forms import SearchFilterForm
+from .history import history_buffer, record_search
+from .results import find_partners
+from .suggestions import heavy_hitters
+
+
+# Sport filter options on the search page (the values profiles store)
+SEARCH_SPORTS = [
+    'Football', 'Basketball', 'Tennis', 'Running', 'Cycling',
+    'Swimming', 'Volleyball', 'Gym/Fitness', 'Yoga',
+]
 
 
 def calculate_distance(lat1, lon1, lat2, lon2):
@@ -50,56 +66,66 @@ def search_partners(request):
     max_distance = request.GET.get('max_distance', 10)
     level = request.GET.get('level', '')
     availability = request.GET.get('availability', '')
+    keywords = request.GET.get('q', '').strip()
+    cursor = request.GET.get('cursor', '')
     
-    # Start with all profiles
-    profiles = UserProfile.objects.select_related('user').all()
-    
-    # Exclude current user if authenticated
-    if request.user.is_authenticated:
-        profiles = profiles.exclude(user=request.user)
-    
-    # Apply sport filter
-    if sport:
-        filtered_profiles = []
-        for profile in profiles:
-            profile_sports = parse_sports(profile.sports)
-            if sport in profile_sports:
-                filtered_profiles.append(profile)
-        profiles = filtered_profiles
-    else:
-        profiles = list(profiles)
+    # Ranked for this user in SQL; the first pages come from the shared result cache
+    page = find_partners(request.user, sport, location, keywords, limit=20, cursor=cursor)
+    profiles = page.profiles
     
     # Add parsed sports to each profile for template
     for profile in profiles:
         profile.sports_list = parse_sports(profile.sports)
     
-    # Save search history only if authenticated
-    if request.user.is_authenticated:
-        SearchHistory.objects.create(
-            user=request.user,
-            search_query=f"{sport} {location}".strip(),
-            filters_used={
+    # Save search history only if authenticated (buffered, written in batches);
+    # following pages are the same search
+    if request.user.is_authenticated and not cursor:
+        record_search(
+            request.user,
+            ' '.join(part for part in (keywords, sport, location) if part),
+            {
+                'q': keywords,
                 'sport': sport,
                 'location': location,
                 'max_distance': max_distance,
                 'level': level,
                 'availability': availability
             },
-            results_count=len(profiles)
+            page.total
         )
     
+    next_page_url = None
+    if page.next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = page.next_cursor
+        next_page_url = '?' + params.urlencode()
+    
+    # Precomputed facet counts (cached), e.g. "Football (1,240)"
+    searcher = get_display_profile(request.user)
+    facets = facet_counts(country=searcher.country if searcher is not None else '')
+    sport_counts = {item['value']: item['count'] for item in facets['sport']}
+    sport_options = [
+        (value, f'{value} ({sport_counts[value]:,})' if value in sport_counts else value)
+        for value in SEARCH_SPORTS
+    ]
+    
     # Get saved filters only if authenticated
     saved_filters = []
     if request.user.is_authenticated:
         saved_filters = SearchFilter.objects.filter(user=request.user)
     
     context = {
-        'results': profiles[:20],  # Limit to 20 results
+        'results': profiles,  # 20 per page
         'sport': sport,
         'location': location,
+        'keywords': keywords,
         'max_distance': max_distance,
         'level': level,
-        'total_results': len(profiles),
+        'total_results': page.total,
+        'total_capped': page.total_capped,
+        'next_page_url': next_page_url,
+        'sport_options': sport_options,
+        'popular_cities': facets['city'],
         'saved_filters': saved_filters
     }
     
@@ -108,32 +134,28 @@ def search_partners(request):
 
 @login_required
 def recommendations(request):
-    """View showing AI-based partner recommendations"""
+    """View showing AI-based partner recommendations, PAGE_SIZE at a time ("load more")"""
     
-    # Get recommendations only if authenticated
-    recommendations_list = []
-    if request.user.is_authenticated:
-        recommendations_list = PartnerRecommendation.objects.select_related(
-            'recommended_user', 
-            'recommended_user__profile'
-        ).filter(
-            user=request.user,
-            is_dismissed=False
-        )[:10]
-        
-        # Mark as viewed
-        recommendations_list.update(is_viewed=True)
-        
-        # Add parsed sports to each recommendation
-        for rec in recommendations_list:
-            rec.recommended_user.profile.sports_list = parse_sports(
-                rec.recommended_user.profile.sports
-            )
+    recommendations_list, next_cursor = recommendation_page(request.user, request.GET.get('cursor'))
+    
+    # Marked as viewed in one UPDATE, after the response
+    viewed_marker.mark([rec.pk for rec in recommendations_list])
+    
+    # Add parsed sports to each recommendation
+    for rec in recommendations_list:
+        profile = getattr(rec.recommended_user, 'profile', None)
+        if profile is not None:
+            profile.sports_list = parse_sports(profile.sports)
     
     context = {
         'recommendations': recommendations_list,
+        'next_page_url': f'?cursor={next_cursor}' if next_cursor else None,
     }
     
+    # "Load more" fetches just the next cards
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return render(request, 'search/partials/recommendation_cards.html', context)
+    
     return render(request, 'search/recommendations.html', context)
 
 @login_required
@@ -149,6 +171,10 @@ def save_search_filter(request):
         if form.is_valid():
             search_filter = form.save(commit=False)
             search_filter.user = request.user
+            # Alerts for a filter without a city stay within the owner's country
+            profile = get_display_profile(request.user)
+            if profile is not None and not search_filter.location:
+                search_filter.country = profile.country
             search_filter.save()
             return redirect('search:search_partners')
     else:
@@ -165,13 +191,9 @@ def dismiss_recommendation(request, recommendation_id):
     if not request.user.is_authenticated:
         return JsonResponse({'status': 'error', 'message': 'Authentication required'})
     
-    recommendation = get_object_or_404(
-        PartnerRecommendation, 
-        id=recommendation_id, 
-        user=request.user
-    )
-    recommendation.is_dismissed = True
-    recommendation.save()
+    # One UPDATE, no row loaded (see apps.search.feedback)
+    if not apply_feedback(request.user, {'dismiss': {recommendation_id}})['dismiss']:
+        raise Http404('No recommendation matches the given query.')
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({'status': 'success'})
@@ -179,6 +201,59 @@ def dismiss_recommendation(request, recommendation_id):
     return redirect('search:recommendations')
 
 
+@login_required
+@require_POST
+def recommendation_feedback(request):
+    """Batch of dismiss/like/viewed events as JSON: {"events": [{"id": 12, "action": "dismiss"}, ...]}"""
+    try:
+        payload = json.loads(request.body)
+        grouped = parse_events(payload.get('events') if isinstance(payload, dict) else None)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    return JsonResponse({'status': 'success', 'updated': apply_feedback(request.user, grouped)})
+
+
+@login_required
+def search_suggestions(request):
+    """Popular searches as JSON, scoped by country and sport; `q` filters by prefix."""
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    suggestions = heavy_hitters.top(
+        country=request.GET.get('country', ''),
+        sport=request.GET.get('sport', ''),
+        limit=limit,
+        prefix=request.GET.get('q', ''),
+    )
+    return JsonResponse({
+        'suggestions': [{'query': query, 'count': count} for query, count in suggestions],
+    })
+
+
+@login_required
+def search_facets(request):
+    """Profile counts per sport, country and city as JSON; ?country=<code> scopes the cities."""
+    try:
+        cities = min(max(int(request.GET.get('cities', 10)), 1), 50)
+    except ValueError:
+        cities = 10
+    return JsonResponse(facet_counts(country=request.GET.get('country', ''), city_limit=cities))
+
+
+@login_required
+def city_suggestions(request):
+    """City autocomplete as JSON: ?q=<prefix>&country=<code>."""
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 10)
+    except ValueError:
+        limit = 10
+    prefix = request.GET.get('q', '')
+    cities = city_autocomplete.complete(prefix, request.GET.get('country', ''), limit) if prefix.strip() else []
+    return JsonResponse({'cities': cities})
+
+
 # @login_required  # Comment this out for now
 def search_history_view(request):
     """View user's search history"""
@@ -186,6 +261,8 @@ def search_history_view(request):
     # Get history only if authenticated
     history = []
     if request.user.is_authenticated:
+        # Write this worker's buffered searches so the latest ones show up
+        history_buffer.flush()
         history = SearchHistory.objects.filter(user=request.user)[:20]
     
     context = {
@@ -0,0 +1,32 @@
+"""
+Warm-up steps for the search app (registered with ``apps.core.warmup``).
+
+The city trie, the facet counts and the profile snapshot are all built on
+first use; without these steps the first request (or recommendation run) in
+each worker pays for it.
+"""
+
+from .cities import city_autocomplete
+from .facets import facet_counts
+from .models import SearchFacetCount
+from .profile_store import profile_store
+
+
+def warm_city_autocomplete():
+    """Build the city tries. Returns the number of completions for an empty prefix."""
+    return len(city_autocomplete.complete(''))
+
+
+def warm_facet_counts():
+    """Cache the facet counts for every country with profiles, and for no country."""
+    countries = list(SearchFacetCount.objects.filter(facet='country', count__gt=0).values_list('value', flat=True))
+    for country in ['', *countries]:
+        facet_counts(country=country)
+    return len(countries) + 1
+
+
+def warm_profile_store():
+    """Map the published profile snapshot, or build one. Returns its profile count."""
+    if not profile_store.available:
+        return 'skipped, NumPy is not installed'
+    return len(profile_store.snapshot())
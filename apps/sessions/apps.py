@@ -5,3 +5,6 @@ class SessionsConfig(AppConfig):
     name = 'apps.sessions'
     label = 'user_sessions'  # <-- rend le label unique
     verbose_name = 'Sessions et Planification'
+
+    def ready(self):
+        from . import signals  # noqa: F401
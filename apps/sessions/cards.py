@@ -0,0 +1,123 @@
+"""
+Cached session cards for the session list.
+
+Each card in ``sessions/list.html`` is rendered from
+``sessions/partials/card.html`` and cached as HTML. The key covers everything
+the card shows:
+
+- the session id and ``updated_at`` (any edit changes the key),
+- the session's invitation version, bumped whenever one of its invitations
+  is written (see ``apps.sessions.signals``), for the invitee count,
+- the viewer's role (creator / invited / other / anonymous), which decides
+  the action buttons,
+- the layout (image left or right) and whether the "Live Now" badge shows.
+
+The CSRF token is the only per-user value inside a card: cards are cached with
+a placeholder that is swapped for the real token on the way out.
+
+A page of cards costs two cache round trips (versions, then HTML); only the
+misses are rendered. Hits and misses are reported under the ``session_card``
+namespace of ``/api/metrics/cache/``.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.middleware.csrf import get_token
+from django.template.defaultfilters import timeuntil_filter
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from apps.core.cache import bump_version, cached_get_many, get_versions, make_key
+
+from .models import Invitation
+
+SESSION_CARD_CACHE_TIMEOUT = getattr(settings, 'SESSION_CARD_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# Stands in for the CSRF token in cached HTML (same value in every worker)
+CSRF_PLACEHOLDER = 'session-card-csrf-placeholder'
+
+
+def invitations_namespace(session_id):
+    return f'session_invitations:{session_id}'
+
+
+def bump_invitations_version(session_id):
+    """Invalidate the cached cards of one session."""
+    bump_version(invitations_namespace(session_id))
+
+
+def with_invitee_counts(queryset):
+    """Annotate `invitee_count` with a subquery (stays correct on filtered/distinct querysets)."""
+    counts = (
+        Invitation.objects.filter(session=OuterRef('pk'))
+        .order_by()
+        .values('session')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return queryset.annotate(invitee_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+def viewer_role(session, user, invited_session_ids=()):
+    if not user.is_authenticated:
+        return 'anonymous'
+    if session.creator_id == user.pk:
+        return 'creator'
+    if session.id in invited_session_ids:
+        return 'invited'
+    return 'other'
+
+
+def is_live(session):
+    # Same test the template always used for the "Live Now" badge
+    return timeuntil_filter(session.start_datetime) < '1 hour'
+
+
+def render_session_cards(sessions, request, invited_session_ids=()):
+    """
+    Return [(session, {'role': ..., 'html': ...})] for a page of sessions,
+    serving each card from the cache when possible.
+    """
+    sessions = list(sessions)
+    versions = get_versions(*(invitations_namespace(session.pk) for session in sessions))
+
+    entries = []
+    for index, session in enumerate(sessions):
+        role = viewer_role(session, request.user, invited_session_ids)
+        image_left = index % 2 == 0
+        live = is_live(session)
+        key = make_key(
+            'session_card', session.pk, session.updated_at.timestamp(),
+            versions[invitations_namespace(session.pk)], role,
+            'left' if image_left else 'right', int(live),
+        )
+        entries.append((session, role, image_left, live, key))
+
+    found = cached_get_many('session_card', [entry[-1] for entry in entries])
+
+    rendered = {}
+    for session, role, image_left, live, key in entries:
+        if key in found or key in rendered:
+            continue
+        rendered[key] = render_to_string('sessions/partials/card.html', {
+            'session': session,
+            'role': role,
+            'image_left': image_left,
+            'live': live,
+            'csrf_token': CSRF_PLACEHOLDER,
+        })
+    if rendered:
+        cache.set_many(rendered, SESSION_CARD_CACHE_TIMEOUT)
+    found.update(rendered)
+
+    cards = []
+    csrf_token = None
+    for session, role, _image_left, _live, key in entries:
+        html = found[key]
+        if CSRF_PLACEHOLDER in html:
+            csrf_token = csrf_token or get_token(request)
+            html = html.replace(CSRF_PLACEHOLDER, csrf_token)
+        cards.append((session, {'role': role, 'html': mark_safe(html)}))
+    return cards
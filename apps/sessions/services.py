@@ -2,14 +2,31 @@
 Services module for the sessions app.
 Contains business logic for AI-powered insights generation using Google Gemini API.
 Keeps views.py clean and reusable.
+
+google.generativeai takes about a second to import, so it is only loaded the
+first time an insight is generated, not by every worker and management command.
 """
 
 import logging
 from django.conf import settings
-import google.generativeai as genai
 
 logger = logging.getLogger(__name__)
 
+_genai = None
+
+
+def get_genai():
+    """Import and configure the Gemini client on first use."""
+    global _genai
+    if _genai is None:
+        if not settings.GEMINI_API_KEY:
+            raise RuntimeError('GEMINI_API_KEY is not set')
+        import google.generativeai as genai
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        _genai = genai
+    return _genai
+
+
 def generate_ai_insight(session):
     """
     Generate AI-powered insights for a given session using Google Gemini API.
@@ -22,8 +39,8 @@ def generate_ai_insight(session):
         str: Generated Markdown insights or fallback message.
     """
     try:
-        # Configure the API with the Gemini key directly
-        genai.configure(api_key=settings.GEMINI_API_KEY)
+        # Loaded and configured once per process
+        genai = get_genai()
         
         # Extract session details safely (tailored to Session model)
         session_title = f"{session.sport_type} Session"  # Derive from sport_type
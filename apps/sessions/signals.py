@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cards import bump_invitations_version
+from .models import Invitation
+
+
+@receiver(post_save, sender=Invitation)
+@receiver(post_delete, sender=Invitation)
+def invalidate_session_cards(sender, instance, **kwargs):
+    """The invitee count is part of the cached card."""
+    bump_invitations_version(instance.session_id)
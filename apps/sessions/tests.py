@@ -1,3 +1,104 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core.cache import get_cache_stats, hit_counter
+from apps.users.models import User
+from .models import Session, Invitation
+
+
+class SessionCardCacheTestCase(TestCase):
+    """Test cases for the cached session cards on the session list."""
+
+    def setUp(self):
+        cache.clear()
+        hit_counter.reset()
+        self.creator = User.objects.create_user(email='creator@example.com', password='testpass123')
+        self.viewer = User.objects.create_user(email='viewer@example.com', password='testpass123')
+        self.session = Session.objects.create(
+            sport_type='tennis',
+            start_datetime=timezone.now() + timedelta(days=2),
+            location='Central Court',
+            status='proposed',
+            creator=self.creator,
+        )
+
+    def _list(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse('sessions:list'))
+
+    def _stats(self):
+        return get_cache_stats(['session_card'])['session_card']
+
+    def test_second_render_is_a_hit(self):
+        """The same viewer role reuses the cached card."""
+        self._list(self.viewer)
+        response = self._list(self.viewer)
+
+        self.assertContains(response, 'Central Court')
+        self.assertEqual(self._stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_cards_vary_by_role(self):
+        """The creator and other users get their own card with their own buttons."""
+        creator_page = self._list(self.creator)
+        viewer_page = self._list(self.viewer)
+
+        self.assertContains(creator_page, 'Edit Session')
+        self.assertNotContains(viewer_page, 'Edit Session')
+        self.assertContains(viewer_page, 'Request to Join')
+        self.assertEqual(self._stats()['hits'], 0)
+
+    def test_csrf_token_is_per_request(self):
+        """Cached cards never carry another user's CSRF token."""
+        self._list(self.viewer)
+        response = self._list(self.viewer)
+
+        self.assertNotContains(response, 'session-card-csrf-placeholder')
+        self.assertContains(response, 'name="csrfmiddlewaretoken" value="')
+
+    def test_new_invitation_refreshes_count(self):
+        """Inviting someone bumps the session's invitation version."""
+        self._list(self.viewer)
+        Invitation.objects.create(session=self.session, invitee=self.viewer)
+        response = self._list(self.viewer)
+
+        self.assertContains(response, '1 Invitees')
+        self.assertContains(response, 'Invited')
+        self.assertEqual(self._stats()['hits'], 0)
+
+
+class AIInsightCacheTestCase(TestCase):
+    """Test cases for the cached Gemini insight of a session."""
+
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create_user(email='creator@example.com', password='testpass123')
+        self.invitee = User.objects.create_user(email='invitee@example.com', password='testpass123')
+        self.session, self.other = [
+            Session.objects.create(
+                sport_type='tennis',
+                start_datetime=timezone.now() + timedelta(days=2),
+                location=location,
+                status='proposed',
+                creator=self.creator,
+            )
+            for location in ('Central Court', 'North Court')
+        ]
+        self.client.force_login(self.creator)
+
+    @patch('apps.sessions.views.generate_ai_insight', return_value='Bring water.')
+    def test_only_own_invitations_invalidate(self, generate):
+        """Invitations to another session keep the insight; one to this session refreshes it."""
+        url = reverse('sessions:ai_insight', args=[self.session.pk])
+        self.client.get(url)
+        Invitation.objects.create(session=self.other, invitee=self.invitee)
+        self.client.get(url)
+        self.assertEqual(generate.call_count, 1)
 
-# Create your tests here.
+        Invitation.objects.create(session=self.session, invitee=self.invitee)
+        self.client.get(url)
+        self.assertEqual(generate.call_count, 2)
@@ -9,11 +9,11 @@ from django.db.models import Q
 from django.core.mail import send_mail  # For optional email notification
 from django.conf import settings  # For email config
 from django.core.paginator import Paginator  # For pagination
-from django.views.decorators.cache import cache_page  # Optional caching for AI
+from apps.core.cache import get_or_compute, versioned_key, bump_model_version
+from .cards import bump_invitations_version, invitations_namespace, render_session_cards, with_invitee_counts
 from .models import Session, Invitation, SuggestedSlot
 from .forms import SessionForm, InviteForm, ResponseForm
 from .services import generate_ai_insight  # Import the service for AI insights
-from markdown import markdown  # For AI Markdown rendering (pip install markdown)
 
 User = get_user_model()
 
@@ -21,14 +21,14 @@ def session_list(request):
     """List all sessions for authenticated users (discovery mode); limited public for anonymous."""
     if request.user.is_authenticated:
         # Show ALL sessions for discovery
-        queryset = Session.objects.all().select_related('creator').prefetch_related('invitation_set__invitee').order_by('-start_datetime')
+        queryset = with_invitee_counts(Session.objects.all()).order_by('-start_datetime')
 
         # Optional: Filter to personal if ?view=my
         if request.GET.get('view') == 'my':
-            queryset = Session.objects.filter(
+            queryset = with_invitee_counts(Session.objects.filter(
                 Q(creator=request.user) |
                 Q(invitees=request.user)
-            ).select_related('creator').prefetch_related('invitation_set__invitee').distinct().order_by('-start_datetime')
+            )).distinct().order_by('-start_datetime')
 
         # Pre-compute flags for template (avoid list conversion for performance)
         invited_session_ids = set(Invitation.objects.filter(invitee=request.user).values_list('session_id', flat=True))
@@ -43,17 +43,22 @@ def session_list(request):
             'object_list': sessions,
             'invited_session_ids': invited_session_ids,
             'is_creator_ids': is_creator_ids,
+            # Cards come from the cache; only changed ones are rendered
+            'session_cards': render_session_cards(sessions, request, invited_session_ids),
         }
     else:
         # Limited public for anonymous
-        queryset = Session.objects.filter(status__in=['proposed', 'confirmed']).order_by('-start_datetime')[:10]
-        context = {'object_list': queryset}
+        queryset = with_invitee_counts(Session.objects.filter(status__in=['proposed', 'confirmed'])).order_by('-start_datetime')[:10]
+        context = {
+            'object_list': queryset,
+            'session_cards': render_session_cards(queryset, request),
+        }
     return render(request, 'sessions/list.html', context)
 
 
 def session_detail(request, pk):
     """Show session details: accessible to all authenticated users."""
-    session = get_object_or_404(Session, pk=pk)
+    session = get_object_or_404(Session.objects.select_related('creator__profile'), pk=pk)
     
     # Anonymous: only public sessions
     if not request.user.is_authenticated and session.status not in ['proposed', 'confirmed']:
@@ -61,7 +66,7 @@ def session_detail(request, pk):
         return redirect('sessions:list')
     
     # Pre-compute for template
-    invitations = session.invitation_set.select_related('invitee').all()
+    invitations = session.invitation_set.select_related('invitee__profile').all()
     responses_count = session.invitation_set.filter(status__in=['accepted', 'refused', 'rescheduled']).count()
     responses_with_notes = session.invitation_set.filter(response_notes__isnull=False).select_related('invitee').all()
     user_invitation = None
@@ -157,7 +162,7 @@ def invite_users(request, pk):
 
     # Get users who are not already invited and not the creator
     excluded_users = [request.user.id] + list(session.invitation_set.values_list('invitee_id', flat=True))
-    available_users = User.objects.exclude(id__in=excluded_users)
+    available_users = User.objects.exclude(id__in=excluded_users).select_related('profile')
 
     if request.method == 'POST':
         form = InviteForm(request.POST)
@@ -222,17 +227,31 @@ def respond_invitation(request, invitation_id):
     })
 
 
+AI_INSIGHT_TIMEOUT = 60 * 60 * 24
+AI_INSIGHT_ERRORS = ('No insights', 'Failed', 'Gemini returned')
+
+
 @login_required
-@cache_page(60 * 5)  # Cache for 5 minutes (optional, for API savings)
 def ai_insight(request, pk):
     """Generate and display AI insights for a session."""
     session = get_object_or_404(Session, pk=pk)
     
-    # Generate fresh insights (no model persistence; use cache decorator for reuse)
-    raw_insights = generate_ai_insight(session)
+    # One Gemini call per session state, shared by every worker and viewer.
+    # Editing the session changes updated_at; its invitation changes bump its invitation version.
+    key = versioned_key(
+        'ai_insight', session.pk, session.updated_at.timestamp(),
+        depends_on=(invitations_namespace(session.pk),)
+    )
+    raw_insights = get_or_compute(
+        'ai_insight', key, lambda: generate_ai_insight(session),
+        timeout=AI_INSIGHT_TIMEOUT,
+        should_cache=lambda text: bool(text) and not text.startswith(AI_INSIGHT_ERRORS)
+    )
     
     # Convert to HTML if valid
-    if raw_insights and not raw_insights.startswith(('No insights', 'Failed', 'Gemini returned')):
+    if raw_insights and not raw_insights.startswith(AI_INSIGHT_ERRORS):
+        # Imported here so workers that never render an insight don't load it
+        from markdown import markdown
         insights_html = markdown(raw_insights, extensions=['extra', 'fenced_code'])
     else:
         insights_html = None
@@ -294,6 +313,9 @@ def manage_requests(request, pk):
         elif action == 'decline_all':
             updated = pending.update(status='refused')
             messages.success(request, f'Declined {updated} request(s).')
+        # Bulk updates skip post_save, so invalidate by hand
+        bump_model_version(Invitation)
+        bump_invitations_version(session.pk)
         return redirect('sessions:manage_requests', pk=pk)
 
     return render(request, 'sessions/manage_requests.html', {
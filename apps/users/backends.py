@@ -1,5 +1,9 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
+
+from .cache import load_user
+from .throttling import check_and_hit
 
 User = get_user_model()
 
@@ -19,6 +23,11 @@ class EmailAuthBackend(ModelBackend):
         if email is None or password is None:
             return None
         
+        # Refuse before hashing once the IP or email is over its limit.
+        # PermissionDenied also stops authenticate() from trying the fallback backends.
+        if check_and_hit('login', request, email):
+            raise PermissionDenied('Too many login attempts')
+        
         try:
             # Normalize email to lowercase
             email = email.lower().strip()
@@ -38,8 +47,7 @@ class EmailAuthBackend(ModelBackend):
     def get_user(self, user_id):
         """
         Get a user by their primary key.
+        The user and its profile come from the cache (see apps.users.cache),
+        so authenticated requests skip both lookups on a cache hit.
         """
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
+        return load_user(user_id)
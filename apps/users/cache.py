@@ -0,0 +1,52 @@
+"""
+Cached loader for the authenticated user.
+
+Every authenticated request resolves ``request.user`` through
+``EmailAuthBackend.get_user`` and most pages then touch ``user.profile`` via the
+``user_extras`` template filters. This module loads both in a single
+``select_related('profile')`` query and keeps the result in the cache.
+
+Invalidation is version based: each user has its own version namespace (see
+``apps.core.cache``). Saving or deleting the user or its profile bumps it (see
+``apps.users.signals``), so stale entries are simply never read again and
+expire on their own.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from apps.core.cache import bump_version, cached_get, versioned_key
+
+User = get_user_model()
+
+# How long a cached user stays valid when nothing touches it (seconds)
+USER_CACHE_TIMEOUT = getattr(settings, 'USER_CACHE_TIMEOUT', 60 * 5)
+
+
+def _namespace(user_id):
+    return f'users:user:{user_id}'
+
+
+def bump_user_version(user_id):
+    """Invalidate every cached copy of a user."""
+    bump_version(_namespace(user_id))
+
+
+def load_user(user_id):
+    """
+    Return the user with its profile already attached, or None if it doesn't exist.
+    Served from the cache when possible; otherwise one select_related query.
+    """
+    key = versioned_key(_namespace(user_id))
+    user = cached_get('users', key)
+    if user is not None:
+        return user
+
+    try:
+        user = User.objects.select_related('profile').get(pk=user_id)
+    except User.DoesNotExist:
+        return None
+
+    cache.set(key, user, USER_CACHE_TIMEOUT)
+    return user
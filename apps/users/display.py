@@ -0,0 +1,101 @@
+"""
+Request-scoped batch loading of profiles for the user_extras template filters.
+
+``user_initials``, ``user_display_name`` and ``user_avatar_url`` all need
+``user.profile``. For users fetched without ``select_related('profile')`` that
+is one lazy query per user rendered, which is hundreds of queries on a session
+with many invitees.
+
+While a request is being handled (``UserDisplayMiddleware``), every ``User``
+instance loaded from the database is noted. The first time a filter needs a
+profile that isn't loaded yet, the profiles of *all* noted users that still
+lack one are fetched in a single query and attached to their instances. Users
+that already came with ``select_related('profile')`` are left alone.
+"""
+
+from contextvars import ContextVar
+
+from django.db.models.signals import post_init
+
+from .models import User, UserProfile
+
+_current_resolver = ContextVar('user_display_resolver', default=None)
+
+# Descriptor behind `user.profile`; knows whether the value is already loaded
+_profile_descriptor = User.profile
+
+
+class UserDisplayResolver:
+    """Collects users seen during one request and loads their profiles in bulk."""
+
+    def __init__(self):
+        self.pending = {}  # user pk -> [instances without a loaded profile]
+        self.profiles = {}  # user pk -> profile or None
+
+    def add(self, user):
+        if user.pk is None or _profile_descriptor.is_cached(user):
+            return
+        if user.pk in self.profiles:
+            _profile_descriptor.related.set_cached_value(user, self.profiles[user.pk])
+            return
+        self.pending.setdefault(user.pk, []).append(user)
+
+    def load(self):
+        """One query for every pending user."""
+        if not self.pending:
+            return
+        pending_all, pending, self.pending = self.pending, {}, {}
+        # Users noted at post_init may have been given their profile by select_related since
+        for pk, instances in pending_all.items():
+            instances = [instance for instance in instances if not _profile_descriptor.is_cached(instance)]
+            if instances:
+                pending[pk] = instances
+        if not pending:
+            return
+        found = {profile.user_id: profile for profile in UserProfile.objects.filter(user_id__in=list(pending))}
+        for pk, instances in pending.items():
+            profile = found.get(pk)
+            self.profiles[pk] = profile
+            for instance in instances:
+                # None is cached too: hasattr(user, 'profile') is then False without a query
+                _profile_descriptor.related.set_cached_value(instance, profile)
+
+    def get_profile(self, user):
+        if not _profile_descriptor.is_cached(user):
+            self.add(user)
+            self.load()
+        return getattr(user, 'profile', None)
+
+
+def get_display_profile(user):
+    """user.profile or None, batch-loaded with the rest of the page when possible."""
+    resolver = _current_resolver.get()
+    if resolver is not None and getattr(user, 'pk', None) is not None:
+        return resolver.get_profile(user)
+    try:
+        return user.profile
+    except (UserProfile.DoesNotExist, AttributeError):
+        return None
+
+
+def _track_loaded_user(sender, instance, **kwargs):
+    resolver = _current_resolver.get()
+    if resolver is not None and instance.pk is not None:
+        resolver.add(instance)
+
+
+post_init.connect(_track_loaded_user, sender=User, dispatch_uid='users.display.track_loaded_user')
+
+
+class UserDisplayMiddleware:
+    """Gives each request its own UserDisplayResolver."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_resolver.set(UserDisplayResolver())
+        try:
+            return self.get_response(request)
+        finally:
+            _current_resolver.reset(token)
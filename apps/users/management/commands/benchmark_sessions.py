@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from importlib import import_module
+import time
+
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+}
+
+# Roughly what the signup wizard keeps in the session between steps
+WIZARD_DATA = {
+    'signup_email': 'bench@example.com',
+    'signup_password': 'BenchPass123',
+    'signup_sports': ['football', 'tennis', 'running'],
+    'signup_availability': 'Weekday evenings',
+    'signup_first_name': 'Bench',
+    'signup_last_name': 'Mark',
+    'signup_gender': 'male',
+    'signup_country': 'TN',
+    'signup_city': 'Sfax',
+}
+
+
+class Command(BaseCommand):
+    help = 'Measures the per-request cost of each session engine (load, and load + save)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500)
+        parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=list(ENGINES))
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        self.stdout.write(f'Session engine benchmark ({iterations} requests each)\n')
+        self.stdout.write(f'{"engine":<10} {"read ms/req":>12} {"read q/req":>11} {"write ms/req":>13} {"write q/req":>12}')
+        self.stdout.write('-' * 62)
+
+        for name in options['engines']:
+            store_class = import_module(ENGINES[name]).SessionStore
+            read_ms, read_queries = self.measure(store_class, iterations, write=False)
+            write_ms, write_queries = self.measure(store_class, iterations, write=True)
+            self.stdout.write(
+                f'{name:<10} {read_ms:>12.3f} {read_queries:>11.2f} {write_ms:>13.3f} {write_queries:>12.2f}'
+            )
+
+    def measure(self, store_class, iterations, write):
+        """
+        An authenticated request loads the session once; a wizard step also
+        modifies it and saves it back.
+        """
+        session = store_class()
+        session.update(WIZARD_DATA)
+        session.create()
+        key = session.session_key
+
+        try:
+            # Warm up (fills the cache for the cached engines)
+            store_class(key).load()
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for i in range(iterations):
+                    request_session = store_class(key)
+                    request_session.get('signup_email')
+                    if write:
+                        request_session['signup_city'] = f'Sfax {i}'
+                        request_session.save()
+                elapsed = time.perf_counter() - started
+        finally:
+            store_class(key).delete()
+
+        return elapsed * 1000 / iterations, len(queries) / iterations
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from apps.users.models import UserProfile
+from apps.users.storage import avatar_storage
+from apps.users.thumbnails import AVATAR_THUMBNAIL_SIZES, FORMATS, variant_name
+from datetime import timedelta
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Deletes avatar files (and their thumbnails) that no profile references anymore'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24,
+                            help='Keep unreferenced files younger than this (in-flight uploads)')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        storage = avatar_storage()
+        referenced = set(
+            UserProfile.objects.exclude(avatar='').exclude(avatar__isnull=True)
+            .values_list('avatar', flat=True)
+        )
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+
+        deleted = freed = 0
+        for name in self.walk(storage, 'avatars'):
+            if '/thumbs/' in name or name in referenced:
+                continue
+            if storage.get_modified_time(name) > cutoff:
+                continue
+
+            doomed = [name] + [
+                variant_name(name, size, fmt)
+                for size in AVATAR_THUMBNAIL_SIZES for fmt in FORMATS
+            ]
+            for path in doomed:
+                if storage.exists(path):
+                    freed += storage.size(path)
+                    if not options['dry_run']:
+                        storage.delete(path)
+            deleted += 1
+            self.stdout.write(f'{"Would delete" if options["dry_run"] else "Deleted"} {name}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} orphaned avatar(s), {freed / 1024:.0f} KB {"reclaimable" if options["dry_run"] else "freed"}'
+        ))
+
+    def walk(self, storage, directory):
+        if not storage.exists(directory):
+            return
+        dirs, files = storage.listdir(directory)
+        for filename in files:
+            yield f'{directory}/{filename}'
+        for sub in dirs:
+            yield from self.walk(storage, f'{directory}/{sub}')
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from apps.users.models import UserProfile
+from apps.users.thumbnails import generate_avatar_thumbnails, has_thumbnails
+import time
+
+
+class Command(BaseCommand):
+    help = 'Generates pre-sized WebP/JPEG variants for existing avatars'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        generated = skipped = failed = 0
+
+        avatars = (
+            UserProfile.objects.exclude(avatar='').exclude(avatar__isnull=True)
+            .values_list('avatar', flat=True).distinct().iterator()
+        )
+        for name in avatars:
+            if not options['force'] and has_thumbnails(name):
+                skipped += 1
+                continue
+            try:
+                generate_avatar_thumbnails(name)
+                generated += 1
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'✗ {name}: {e}'))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{generated} avatar(s) processed, {skipped} already done, {failed} failed in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from importlib import import_module
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes expired sessions in small batches. Run it from cron, or keep it '
+        'running with --every to purge on a schedule.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows deleted per query (default: 1000)')
+        parser.add_argument('--every', type=int, default=0,
+                            help='Repeat every N seconds instead of running once')
+
+    def handle(self, *args, **options):
+        engine = import_module(settings.SESSION_ENGINE)
+
+        while True:
+            started = time.perf_counter()
+            deleted = self.purge(engine.SessionStore, options['batch_size'])
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(self.style.SUCCESS(
+                f'Purged {deleted} expired session(s) in {elapsed:.1f} ms'
+            ))
+
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def purge(self, session_store, batch_size):
+        """Delete expired rows in batches so the table is never locked for long."""
+        if not issubclass(session_store, DBSessionStore):
+            # Cache-only sessions expire on their own
+            session_store.clear_expired()
+            return 0
+
+        model = session_store.get_model_class()
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(
+                model.objects.filter(expire_date__lt=now)
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                return deleted
+            deleted += model.objects.filter(session_key__in=keys).delete()[0]
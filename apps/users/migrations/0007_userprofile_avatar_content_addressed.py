@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:02
+
+import apps.users.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_remove_userprofile_address_remove_userprofile_state_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='avatar',
+            field=models.ImageField(blank=True, help_text='User profile picture', null=True, storage=apps.users.storage.avatar_storage, upload_to='avatars/'),
+        ),
+    ]
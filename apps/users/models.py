@@ -4,6 +4,8 @@ from django.utils import timezone
 import uuid
 from datetime import timedelta
 
+from .storage import avatar_storage
+
 
 class CustomUserManager(UserManager):
     """
@@ -137,7 +139,7 @@ class UserProfile(models.Model):
     country = models.CharField(max_length=10, choices=COUNTRY_CHOICES, help_text="Required", default='TN')
     
     # Personal Information (Optional fields)
-    avatar = models.ImageField(upload_to='avatars/', blank=True, null=True, help_text="User profile picture")
+    avatar = models.ImageField(upload_to='avatars/', storage=avatar_storage, blank=True, null=True, help_text="User profile picture")
     date_of_birth = models.DateField(blank=True, null=True, help_text="Date of birth")
     age = models.PositiveIntegerField(blank=True, null=True, help_text="Age in years")
     city = models.CharField(max_length=100, blank=True, default='', help_text="City name")
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import bump_user_version
+from .models import User, UserProfile
+from .thumbnails import has_thumbnails, schedule_avatar_thumbnails
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the cached user whenever the account row changes."""
+    bump_user_version(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_user_profile(sender, instance, **kwargs):
+    """The profile is cached together with its user, so invalidate the user entry."""
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=UserProfile)
+def generate_avatar_variants(sender, instance, **kwargs):
+    """Queue pre-sized variants for a newly uploaded avatar."""
+    if instance.avatar and not has_thumbnails(instance.avatar.name, instance.avatar.storage):
+        schedule_avatar_thumbnails(instance.avatar.name)
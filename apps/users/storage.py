@@ -0,0 +1,69 @@
+"""
+Content-addressed storage for avatars.
+
+Uploaded files are named after the SHA-256 of their bytes instead of the
+user-supplied filename:
+
+    avatars/me.png -> avatars/3f/3f2a...9c.png
+
+so identical uploads are stored once, and a URL always points at the same
+bytes. That makes avatar URLs immutable: they can be cached by browsers and
+proxies forever (see ``apps.core.views.immutable_media``). Because a file can
+be shared by several profiles, nothing is deleted when a profile changes its
+avatar; ``python manage.py gc_avatars`` removes files no profile references.
+Storing bytes that are already there refreshes the file's modification time,
+so a re-uploaded orphan gets a new grace period.
+"""
+
+import hashlib
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+
+# <dir>/<2 hex>/<64 hex>.<ext>, or one of its thumbnails: <dir>/<2 hex>/thumbs/<64 hex>_<size>.<ext>
+CONTENT_ADDRESSED_RE = re.compile(r'(^|/)[0-9a-f]{2}/(thumbs/)?[0-9a-f]{64}(_\d+)?(\.[^/.]+)?$')
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_ADDRESSED_RE.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content hash and skips duplicate writes."""
+
+    def content_name(self, name, content):
+        hasher = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        digest = hasher.hexdigest()
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        return '/'.join(part for part in (directory, digest[:2], digest + ext) if part)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = self.content_name(name, content)
+        if self.exists(name):
+            # Same bytes are already stored under this name. Touch the file:
+            # it may be an old orphan, which gc_avatars would otherwise treat
+            # as past its grace period and delete under the new reference
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                pass  # collected in the meantime; store it again
+            else:
+                return name
+        # Two concurrent identical uploads can still race here; the loser gets
+        # the usual random suffix, which only costs one extra copy
+        return super().save(name, content, max_length=max_length)
+
+
+def avatar_storage():
+    """Storage for UserProfile.avatar (callable so migrations don't serialise it)."""
+    return ContentAddressedStorage()
@@ -1,5 +1,8 @@
 from django import template
 
+from apps.users.display import get_display_profile
+from apps.users.thumbnails import avatar_variant_url
+
 register = template.Library()
 
 
@@ -15,9 +18,10 @@ def user_initials(user):
         return "?"
     
     # Try to get first_name and last_name from profile
-    if hasattr(user, 'profile'):
-        first_name = getattr(user.profile, 'first_name', '').strip()
-        last_name = getattr(user.profile, 'last_name', '').strip()
+    profile = get_display_profile(user)
+    if profile is not None:
+        first_name = getattr(profile, 'first_name', '').strip()
+        last_name = getattr(profile, 'last_name', '').strip()
         
         if first_name and last_name:
             return f"{first_name[0]}{last_name[0]}".upper()
@@ -57,8 +61,9 @@ def user_display_name(user):
         return "Unknown User"
     
     # Try to get full_name from profile
-    if hasattr(user, 'profile') and hasattr(user.profile, 'full_name'):
-        full_name = user.profile.full_name
+    profile = get_display_profile(user)
+    if profile is not None and hasattr(profile, 'full_name'):
+        full_name = profile.full_name
         if full_name and full_name != user.username:  # Don't return username again
             return full_name
     
@@ -74,17 +79,40 @@ def user_display_name(user):
 
 
 @register.filter(name='user_avatar_url')
-def user_avatar_url(user):
+def user_avatar_url(user, size=None):
     """
     Returns the URL of the user's avatar if they have one.
+    With a size, returns the pre-sized JPEG variant closest to it (the original
+    until the variants are generated).
     Returns None if no avatar is set.
     
-    Usage in template: {{ user|user_avatar_url }}
+    Usage in template: {{ user|user_avatar_url }} or {{ user|user_avatar_url:48 }}
+    """
+    if not user:
+        return None
+    
+    profile = get_display_profile(user)
+    if profile is not None and profile.avatar:
+        if size:
+            return avatar_variant_url(profile.avatar, size, 'jpg')
+        return profile.avatar.url
+    
+    return None
+
+
+@register.filter(name='user_avatar_webp_url')
+def user_avatar_webp_url(user, size):
+    """
+    Returns the WebP variant of the user's avatar closest to `size` px.
+    Meant for <source type="image/webp"> next to user_avatar_url's JPEG.
+    
+    Usage in template: {{ user|user_avatar_webp_url:48 }}
     """
     if not user:
         return None
     
-    if hasattr(user, 'profile') and user.profile.avatar:
-        return user.profile.avatar.url
+    profile = get_display_profile(user)
+    if profile is not None and profile.avatar:
+        return avatar_variant_url(profile.avatar, size, 'webp')
     
     return None
@@ -3,10 +3,34 @@ Test script for the Multi-Step Signup Wizard
 Run this after setting up the database to verify functionality
 """
 
-from django.test import TestCase, Client
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
+import os
+import shutil
+import tempfile
+
+from PIL import Image
+
+from django.contrib.auth import authenticate
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
+from apps.users.backends import EmailAuthBackend
+from apps.users.display import UserDisplayResolver, _current_resolver
 from apps.users.models import User, UserProfile, EmailVerificationToken
+from apps.users.storage import is_content_addressed
+from apps.users.templatetags.user_extras import (
+    user_avatar_url, user_avatar_webp_url, user_display_name, user_initials,
+)
+from apps.users.thumbnails import generate_avatar_thumbnails, variant_name
+from apps.users.throttling import get_throttle_stats
 import json
 
 
@@ -221,6 +245,266 @@ class SignupWizardTestCase(TestCase):
         self.assertNotIn('_auth_user_id', self.client.session)
 
 
+
+class CachedUserLoaderTestCase(TestCase):
+    """Test cases for the cached authenticated-user loader."""
+    
+    def setUp(self):
+        """Create an active user with a profile and start from an empty cache."""
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='cached@example.com',
+            password='testpass123',
+            is_active=True
+        )
+        self.profile = UserProfile.objects.create(
+            user=self.user,
+            first_name='Cached',
+            last_name='User'
+        )
+        self.backend = EmailAuthBackend()
+    
+    def test_cache_hit_skips_user_and_profile_queries(self):
+        """Second lookup is served from the cache, profile included."""
+        with self.assertNumQueries(1):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(user.profile.first_name, 'Cached')
+        
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(user.profile.first_name, 'Cached')
+    
+    def test_profile_save_invalidates_cached_user(self):
+        """Saving the profile bumps the version so the next lookup is fresh."""
+        self.backend.get_user(self.user.pk)
+        self.profile.first_name = 'Renamed'
+        self.profile.save()
+        
+        user = self.backend.get_user(self.user.pk)
+        self.assertEqual(user.profile.first_name, 'Renamed')
+    
+    def test_user_without_profile(self):
+        """A missing profile is cached too and never triggers a lazy query."""
+        other = User.objects.create_user(email='noprofile@example.com', password='testpass123')
+        self.backend.get_user(other.pk)
+        
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(other.pk)
+            self.assertFalse(hasattr(user, 'profile'))
+    
+    def test_missing_user(self):
+        """Unknown ids return None."""
+        self.assertIsNone(self.backend.get_user(999999))
+
+
+@override_settings(AUTH_THROTTLE_RATES={
+    'login': {'ip': (100, 300), 'email': (3, 300)},
+    'signup': {'ip': (2, 3600)},
+    'resend_verification': {'ip': (100, 3600), 'email': (1, 3600)},
+})
+class AuthThrottlingTestCase(TestCase):
+    """Test cases for login / signup / resend throttling."""
+    
+    def setUp(self):
+        """Throttle counters live in the cache, so start (and end) clean."""
+        cache.clear()
+        self.client = Client()
+        self.addCleanup(cache.clear)
+    
+    def test_login_blocked_before_hashing(self):
+        """Once the email limit is reached, no password hash is computed."""
+        for _ in range(3):
+            self.client.post(reverse('users:login'), {
+                'email': 'victim@example.com',
+                'password': 'wrong-password'
+            })
+        
+        with patch('django.contrib.auth.hashers.PBKDF2PasswordHasher.encode') as encode:
+            response = self.client.post(reverse('users:login'), {
+                'email': 'victim@example.com',
+                'password': 'wrong-password'
+            })
+            encode.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(get_throttle_stats()['login']['allowed'], 3)
+    
+    def test_backend_refuses_when_throttled(self):
+        """Direct authenticate() calls are throttled too."""
+        User.objects.create_user(email='direct@example.com', password='testpass123', is_active=True)
+        for _ in range(3):
+            authenticate(None, username='direct@example.com', password='wrong')
+        self.assertIsNone(authenticate(None, username='direct@example.com', password='testpass123'))
+        self.assertEqual(get_throttle_stats()['login']['blocked'], 1)
+    
+    def test_signup_step1_throttled_by_ip(self):
+        """Signup step 1 is limited per client IP."""
+        for i in range(2):
+            self.client.post(reverse('users:signup_step1'), {'email': f'new{i}@example.com'})
+        response = self.client.post(reverse('users:signup_step1'), {'email': 'new3@example.com'})
+        self.assertEqual(response.status_code, 429)
+    
+    def test_resend_verification_throttled_by_email(self):
+        """Resending verification is limited per email address."""
+        User.objects.create_user(email='resend@example.com', password='testpass123')
+        self.client.post(reverse('users:resend_verification'), {'email': 'resend@example.com'})
+        response = self.client.post(reverse('users:resend_verification'), {'email': 'resend@example.com'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(EmailVerificationToken.objects.filter(user__email='resend@example.com').count(), 1)
+
+
+class PurgeSessionsTestCase(TestCase):
+    """Test cases for the expired-session purge command."""
+    
+    def test_purges_only_expired_sessions_in_batches(self):
+        """Expired rows are removed across several batches, live ones are kept."""
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key=f'expired{i}', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='alive', session_data='', expire_date=now + timedelta(days=1))
+        
+        out = StringIO()
+        call_command('purge_sessions', batch_size=2, stdout=out)
+        
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['alive'])
+        self.assertIn('Purged 5 expired session(s)', out.getvalue())
+
+
+class AvatarThumbnailTestCase(TestCase):
+    """Test cases for pre-sized avatar variants."""
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, AVATAR_THUMBNAILS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        self.user = User.objects.create_user(email='avatar@example.com', password='testpass123')
+    
+    def _upload(self):
+        buffer = BytesIO()
+        Image.new('RGBA', (900, 600), (200, 30, 30, 255)).save(buffer, 'PNG')
+        return SimpleUploadedFile('me.png', buffer.getvalue(), content_type='image/png')
+    
+    def test_variants_generated_after_commit(self):
+        """Every size is written in WebP and JPEG once the upload commits."""
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = UserProfile.objects.create(user=self.user, avatar=self._upload())
+        
+        for size in (40, 48, 60, 200):
+            for fmt in ('webp', 'jpg'):
+                name = variant_name(profile.avatar.name, size, fmt)
+                self.assertTrue(profile.avatar.storage.exists(name), name)
+        with profile.avatar.storage.open(variant_name(profile.avatar.name, 48, 'jpg')) as f:
+            self.assertEqual(Image.open(f).size, (48, 48))
+    
+    def test_filter_picks_closest_variant(self):
+        """user_avatar_url:size serves the variant, falling back to the original before it exists."""
+        profile = UserProfile.objects.create(user=self.user, avatar=self._upload())
+        self.user.refresh_from_db()
+        self.assertEqual(user_avatar_url(self.user, 48), profile.avatar.url)
+        
+        generate_avatar_thumbnails(profile.avatar.name)
+        self.assertTrue(user_avatar_url(self.user, 50).endswith('_60.jpg'))
+        self.assertTrue(user_avatar_webp_url(self.user, 40).endswith('_40.webp'))
+        self.assertEqual(user_avatar_url(self.user), profile.avatar.url)
+
+
+class ContentAddressedAvatarTestCase(TestCase):
+    """Test cases for content-addressed avatar storage and orphan collection."""
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+    
+    def _profile(self, email, data):
+        user = User.objects.create_user(email=email, password='testpass123')
+        return UserProfile.objects.create(user=user, avatar=SimpleUploadedFile('photo.png', data))
+    
+    def test_identical_uploads_share_one_file(self):
+        """Same bytes, same name; the name is the content hash."""
+        first = self._profile('one@example.com', b'same-bytes')
+        second = self._profile('two@example.com', b'same-bytes')
+        
+        self.assertEqual(first.avatar.name, second.avatar.name)
+        self.assertTrue(is_content_addressed(first.avatar.name))
+        self.assertTrue(first.avatar.name.endswith('.png'))
+    
+    def test_reupload_refreshes_an_orphan(self):
+        """Uploading bytes already stored restarts the file's grace period."""
+        orphan = self._profile('orphan@example.com', b'orphaned')
+        path = orphan.avatar.path
+        os.utime(path, (0, 0))
+        
+        self._profile('again@example.com', b'orphaned')
+        
+        self.assertGreater(os.path.getmtime(path), timezone.now().timestamp() - 60)
+    
+    def test_gc_removes_only_orphans(self):
+        """Unreferenced avatars past the grace period are deleted, shared ones are kept."""
+        kept = self._profile('keep@example.com', b'kept')
+        orphan = self._profile('orphan@example.com', b'orphaned')
+        orphan_name = orphan.avatar.name
+        orphan.avatar = None
+        orphan.save()
+        
+        call_command('gc_avatars', grace_hours=0, stdout=StringIO())
+        
+        storage = kept.avatar.storage
+        self.assertTrue(storage.exists(kept.avatar.name))
+        self.assertFalse(storage.exists(orphan_name))
+
+class UserDisplayResolverTestCase(TestCase):
+    """Test cases for batch-loading profiles behind the user_extras filters."""
+    
+    def setUp(self):
+        for i in range(5):
+            user = User.objects.create_user(email=f'member{i}@example.com', password='testpass123')
+            if i % 2 == 0:
+                UserProfile.objects.create(user=user, first_name=f'First{i}', last_name='Member')
+        token = _current_resolver.set(UserDisplayResolver())
+        self.addCleanup(_current_resolver.reset, token)
+    
+    def test_profiles_loaded_in_one_query(self):
+        """Rendering every user costs one profile query, not one per user."""
+        users = list(User.objects.filter(email__startswith='member').order_by('email'))
+        
+        with self.assertNumQueries(1):
+            names = [user_display_name(user) for user in users]
+            initials = [user_initials(user) for user in users]
+            avatars = [user_avatar_url(user, 40) for user in users]
+        
+        self.assertEqual(names[0], 'First0 Member')
+        self.assertEqual(names[1], 'member1')
+        self.assertEqual(initials[0], 'FM')
+        self.assertTrue(all(avatar is None for avatar in avatars))
+    
+    def test_select_related_profiles_untouched(self):
+        """Users fetched with their profile need no extra query."""
+        users = list(User.objects.filter(email__startswith='member').select_related('profile'))
+        
+        with self.assertNumQueries(0):
+            for user in users:
+                user_display_name(user)
+    
+    def test_select_related_users_are_not_reloaded(self):
+        """Loading other users' profiles leaves the select_related ones and their edits alone."""
+        member0 = User.objects.select_related('profile').get(email='member0@example.com')
+        member1 = User.objects.get(email='member1@example.com')
+        member0.profile.first_name = 'Edited'
+        
+        with CaptureQueriesContext(connection) as queries:
+            user_display_name(member1)
+        
+        self.assertEqual(len(queries), 1)
+        self.assertIn(f'IN ({member1.pk})', queries[0]['sql'])
+        with self.assertNumQueries(0):
+            self.assertEqual(user_display_name(member0), 'Edited Member')
+
+
 # Instructions for running tests:
 print("""
 To run these tests:
@@ -0,0 +1,133 @@
+"""
+Sliding-window throttling for the authentication endpoints.
+
+Login attempts run a full password hash (PBKDF2), even for unknown emails, so a
+credential-stuffing burst can pin every worker's CPU. The throttles below are
+checked before any hashing and are keyed both by client IP and by the email
+being targeted. Counters live in the shared cache so every worker sees the same
+totals.
+
+The sliding window is the usual two-bucket approximation: the previous fixed
+window's count is weighted by how much of it still overlaps the sliding window
+and added to the current window's count.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# scope -> {key type: (max attempts, window in seconds)}
+DEFAULT_THROTTLE_RATES = {
+    'login': {'ip': (20, 5 * 60), 'email': (5, 5 * 60)},
+    'signup': {'ip': (20, 60 * 60), 'email': (5, 60 * 60)},
+    'resend_verification': {'ip': (10, 60 * 60), 'email': (3, 60 * 60)},
+}
+
+
+def _rates(scope):
+    rates = getattr(settings, 'AUTH_THROTTLE_RATES', DEFAULT_THROTTLE_RATES)
+    return rates.get(scope, DEFAULT_THROTTLE_RATES.get(scope, {}))
+
+
+def get_client_ip(request):
+    """Client IP, honouring X-Forwarded-For only when a trusted proxy sits in front."""
+    if getattr(settings, 'AUTH_THROTTLE_TRUST_X_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '') or 'unknown'
+
+
+class SlidingWindowCounter:
+    """Approximate sliding-window counter stored in the cache."""
+
+    def __init__(self, key, limit, window):
+        self.key = key
+        self.limit = limit
+        self.window = window
+
+    def _bucket_key(self, bucket):
+        return f'throttle:{self.key}:{bucket}'
+
+    def count(self, now=None):
+        """Estimated number of hits within the last `window` seconds."""
+        now = time.time() if now is None else now
+        bucket = int(now // self.window)
+        values = cache.get_many([self._bucket_key(bucket - 1), self._bucket_key(bucket)])
+        previous = values.get(self._bucket_key(bucket - 1), 0)
+        current = values.get(self._bucket_key(bucket), 0)
+        overlap = 1 - (now % self.window) / self.window
+        return previous * overlap + current
+
+    def hit(self, now=None):
+        """Record one hit in the current bucket."""
+        now = time.time() if now is None else now
+        key = self._bucket_key(int(now // self.window))
+        # Buckets must outlive the following window, which still reads them
+        cache.add(key, 0, self.window * 2)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.set(key, 1, self.window * 2)
+
+    def is_exceeded(self, now=None):
+        return self.count(now) >= self.limit
+
+
+def _counters(scope, request, email=None):
+    counters = []
+    rates = _rates(scope)
+    if request is not None and 'ip' in rates:
+        limit, window = rates['ip']
+        counters.append(SlidingWindowCounter(f'{scope}:ip:{get_client_ip(request)}', limit, window))
+    if email and 'email' in rates:
+        limit, window = rates['email']
+        counters.append(SlidingWindowCounter(f'{scope}:email:{email.lower().strip()}', limit, window))
+    return counters
+
+
+def _record(scope, outcome):
+    key = f'throttle:stats:{scope}:{outcome}'
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def is_throttled(scope, request, email=None):
+    """Check the limits without recording an attempt."""
+    return any(counter.is_exceeded() for counter in _counters(scope, request, email))
+
+
+def check_and_hit(scope, request, email=None):
+    """
+    Record an attempt and return True if it must be rejected.
+    Rejected attempts are not counted again, so a blocked client can't extend
+    its own lockout indefinitely.
+    """
+    counters = _counters(scope, request, email)
+    now = time.time()
+    if any(counter.is_exceeded(now) for counter in counters):
+        _record(scope, 'blocked')
+        return True
+    for counter in counters:
+        counter.hit(now)
+    _record(scope, 'allowed')
+    return False
+
+
+def get_throttle_stats():
+    """Allowed/blocked totals per scope, for monitoring."""
+    scopes = list(getattr(settings, 'AUTH_THROTTLE_RATES', DEFAULT_THROTTLE_RATES))
+    keys = [f'throttle:stats:{scope}:{outcome}' for scope in scopes for outcome in ('allowed', 'blocked')]
+    values = cache.get_many(keys)
+    return {
+        scope: {
+            outcome: values.get(f'throttle:stats:{scope}:{outcome}', 0)
+            for outcome in ('allowed', 'blocked')
+        }
+        for scope in scopes
+    }
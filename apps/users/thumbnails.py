@@ -0,0 +1,124 @@
+"""
+Avatar thumbnails.
+
+Avatars can be up to 5 MB but are mostly shown at 40-60 px, so every uploaded
+avatar gets square, pre-sized variants (WebP plus a JPEG fallback) stored next
+to it under ``thumbs/``:
+
+    avatars/jane.png -> avatars/thumbs/jane_48.webp, avatars/thumbs/jane_48.jpg, ...
+
+Variants are generated after the upload's transaction commits, on a background
+thread, so the profile form doesn't wait for Pillow. ``user_avatar_url`` picks
+the smallest variant at least as large as the size asked for and falls back to
+the original until the variants exist. Existing avatars are processed with
+``python manage.py generate_avatar_thumbnails``.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+AVATAR_THUMBNAIL_SIZES = tuple(sorted(getattr(settings, 'AVATAR_THUMBNAIL_SIZES', (40, 48, 60, 200))))
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+# One worker is plenty: uploads are rare and this keeps Pillow off the request threads
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='avatar-thumbnails')
+
+# Variant names known to exist in this process (positive results only, names never get reused)
+_existing_variants = set()
+
+
+def variant_name(avatar_name, size, fmt):
+    """Storage name of one variant, e.g. avatars/thumbs/jane_48.webp."""
+    directory, filename = os.path.split(avatar_name)
+    stem = os.path.splitext(filename)[0]
+    return f'{directory}/thumbs/{stem}_{size}.{fmt}' if directory else f'thumbs/{stem}_{size}.{fmt}'
+
+
+def pick_size(size):
+    """Smallest generated size that still covers `size` px."""
+    size = int(size)
+    for candidate in AVATAR_THUMBNAIL_SIZES:
+        if candidate >= size:
+            return candidate
+    return AVATAR_THUMBNAIL_SIZES[-1]
+
+
+def avatar_variant_url(avatar, size, fmt='jpg', storage=None):
+    """URL of the variant closest to `size`, or the original while it isn't generated yet."""
+    storage = storage or avatar.storage
+    name = variant_name(avatar.name, pick_size(size), fmt)
+    if name not in _existing_variants:
+        if not storage.exists(name):
+            return avatar.url
+        _existing_variants.add(name)
+    return storage.url(name)
+
+
+def has_thumbnails(avatar_name, storage=None):
+    storage = storage or default_storage
+    largest = variant_name(avatar_name, AVATAR_THUMBNAIL_SIZES[-1], 'jpg')
+    return storage.exists(largest)
+
+
+def generate_avatar_thumbnails(avatar_name, storage=None):
+    """Write every size/format variant of one avatar. Returns the names written."""
+    # Pillow is only needed here; keep it out of every worker's startup
+    from PIL import Image, ImageOps
+
+    storage = storage or default_storage
+    with storage.open(avatar_name, 'rb') as f:
+        image = Image.open(f)
+        # Let the JPEG decoder downscale while decoding; much cheaper for large photos
+        image.draft('RGB', (AVATAR_THUMBNAIL_SIZES[-1] * 2, AVATAR_THUMBNAIL_SIZES[-1] * 2))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'P') else 'RGB')
+
+    written = []
+    # Work from the largest size down so each resize starts from a small image
+    source = image
+    for size in reversed(AVATAR_THUMBNAIL_SIZES):
+        source = ImageOps.fit(source, (size, size), Image.LANCZOS)
+        for fmt, (pil_format, options) in FORMATS.items():
+            frame = source
+            if pil_format == 'JPEG' and frame.mode != 'RGB':
+                # JPEG has no alpha: flatten onto white
+                background = Image.new('RGB', frame.size, (255, 255, 255))
+                background.paste(frame, mask=frame.getchannel('A'))
+                frame = background
+            buffer = BytesIO()
+            frame.save(buffer, pil_format, **options)
+            name = variant_name(avatar_name, size, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            written.append(storage.save(name, ContentFile(buffer.getvalue())))
+    return written
+
+
+def _generate_safely(avatar_name):
+    try:
+        generate_avatar_thumbnails(avatar_name)
+    except Exception as e:
+        logger.error(f"Could not generate thumbnails for {avatar_name}: {e}")
+
+
+def schedule_avatar_thumbnails(avatar_name):
+    """Generate variants once the current transaction commits, off the request thread."""
+    if getattr(settings, 'AVATAR_THUMBNAILS_ASYNC', True):
+        transaction.on_commit(lambda: _executor.submit(_generate_safely, avatar_name))
+    else:
+        transaction.on_commit(lambda: _generate_safely(avatar_name))
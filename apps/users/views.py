@@ -11,6 +11,7 @@ from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.contrib.auth.decorators import login_required
 from .models import User, UserProfile, EmailVerificationToken
+from .throttling import is_throttled, check_and_hit
 import json
 import uuid
 import re
@@ -20,6 +21,7 @@ def login_view(request):
     """Simple login handler: renders form and authenticates by email/password."""
     error_message = None
     warning_message = None
+    status = 200
     
     if request.method == 'POST':
         email = request.POST.get('email', '').strip().lower()
@@ -37,6 +39,11 @@ def login_view(request):
             except ValidationError:
                 error_message = 'Please enter a valid email address.'
             
+            # Throttled clients are turned away before any password hashing happens
+            if not error_message and is_throttled('login', request, email):
+                error_message = 'Too many sign-in attempts. Please wait a few minutes and try again.'
+                status = 429
+            
             if not error_message:
                 # Authenticate using email directly (our custom backend handles this)
                 user = authenticate(request, username=email, password=password)
@@ -62,7 +69,7 @@ def login_view(request):
         'error_message': error_message,
         'warning_message': warning_message,
         'success_messages': success_messages
-    })
+    }, status=status)
 
 
 # ===== Multi-Step Signup Wizard =====
@@ -73,6 +80,7 @@ def signup_step1_email(request):
     Check if email already exists, if not store in session and proceed.
     """
     error_message = None
+    status = 200
     
     if request.method == 'POST':
         email = request.POST.get('email', '').strip().lower()
@@ -87,6 +95,10 @@ def signup_step1_email(request):
             except ValidationError:
                 error_message = 'Please enter a valid email address (e.g., user@example.com).'
             
+            if not error_message and check_and_hit('signup', request, email):
+                error_message = 'Too many sign-up attempts. Please wait a while and try again.'
+                status = 429
+            
             if not error_message:
                 # Check if user already exists
                 if User.objects.filter(email=email).exists():
@@ -102,7 +114,7 @@ def signup_step1_email(request):
     
     return render(request, 'users/signup_step1_minimal.html', {
         'error_message': error_message
-    })
+    }, status=status)
 
 
 def signup_step2_details(request):
@@ -353,6 +365,7 @@ def verify_email(request, token):
 def resend_verification(request):
     """Allow user to resend verification email."""
     error_message = None
+    status = 200
     
     if request.method == 'POST':
         email = request.POST.get('email', '').strip().lower()
@@ -366,6 +379,10 @@ def resend_verification(request):
             except ValidationError:
                 error_message = 'Please enter a valid email address.'
         
+        if not error_message and check_and_hit('resend_verification', request, email):
+            error_message = 'Too many verification emails requested. Please wait a while and try again.'
+            status = 429
+        
         if not error_message:
             try:
                 user = User.objects.get(email=email, is_active=False)
@@ -407,7 +424,7 @@ def resend_verification(request):
     storage = messages.get_messages(request)
     storage.used = True
     
-    return render(request, 'users/resend_verification_minimal.html', {'error_message': error_message})
+    return render(request, 'users/resend_verification_minimal.html', {'error_message': error_message}, status=status)
 
 
 # Legacy signup view (keeping for reference, but wizard should be used)
@@ -8,7 +8,8 @@ from decouple import config, Csv
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-GEMINI_API_KEY = config('GEMINI_API_KEY')
+# Only needed for AI insights; without it they show an error message instead
+GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -41,10 +42,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.core.middleware.StaticFilesMiddleware',  # Only active with SERVE_STATIC and DEBUG off
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.users.display.UserDisplayMiddleware',  # Batch-loads profiles for user_extras filters
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -69,6 +72,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Compile templates, build URL tables and prime caches when a WSGI worker
+# starts, instead of on its first request (see apps.core.warmup)
+WARMUP_ON_STARTUP = config('WARMUP_ON_STARTUP', default=not DEBUG, cast=bool)
+
 
 # Database
 # For local development we default to SQLite. Set DB_ENGINE in your .env to switch to MySQL/Postgres.
@@ -99,6 +106,56 @@ else:
     }
 
 
+# Cache
+# CACHE_BACKEND selects where cached data lives:
+#   locmem    - per-process memory (default with DEBUG; fine for runserver and tests)
+#   file      - shared by every worker on the host, stored under CACHE_LOCATION
+#               (default with DEBUG off)
+#   memcached - a local memcached stand-in, CACHE_LOCATION = host:port
+#   redis     - CACHE_LOCATION = redis://host:port/db
+# Use anything but locmem once more than one worker serves traffic; the
+# core.W001 system check warns about locmem with DEBUG off.
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem' if DEBUG else 'file')
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'teamup'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': _CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': config('CACHE_LOCATION', default=_CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='teamup'),
+        'TIMEOUT': 60 * 5,
+        'OPTIONS': {'MAX_ENTRIES': 10000} if CACHE_BACKEND in ('locmem', 'file') else {},
+    }
+}
+
+# Writes to these models bump their cache version (see apps.core.cache)
+CACHE_VERSIONED_MODELS = [
+    'user_sessions.Session',
+    'user_sessions.Invitation',
+    'users.UserProfile',
+]
+# Namespaces reported by /api/metrics/cache/
+CACHE_STATS_NAMESPACES = ['users', 'ai_insight', 'session_card', 'search_results', 'search_facets', 'search_exclusions']
+
+# Sessions
+# 'db' is Django's default (one SELECT per authenticated request), 'cached_db'
+# reads through the cache and writes through to the database, 'cache' keeps
+# sessions in the cache only. Only use 'cached_db'/'cache' with a cache shared
+# by all workers. Expired rows are removed by `python manage.py purge_sessions`.
+SESSION_BACKEND = config('SESSION_BACKEND', default='db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+}[SESSION_BACKEND]
+SESSION_CACHE_ALIAS = 'default'
+SESSION_COOKIE_AGE = config('SESSION_COOKIE_AGE', default=60 * 60 * 24 * 14, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -139,9 +196,62 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
+# collectstatic writes content-hashed names plus .gz/.br variants and
+# hard-links identical files (see apps.core.staticfiles)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'apps.core.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Serve STATIC_ROOT from Django itself when there's no reverse proxy in front
+SERVE_STATIC = config('SERVE_STATIC', default=True, cast=bool)
+# Cache lifetime for static files without a content hash in their name
+STATIC_MAX_AGE = 60 * 60
+
 # Media files
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Serve MEDIA_ROOT from Django outside DEBUG (no reverse proxy)
+SERVE_MEDIA = config('SERVE_MEDIA', default=False, cast=bool)
+
+# Search history is buffered per process and written in batches (see apps.search.history)
+SEARCH_HISTORY_BUFFER_SIZE = 100
+SEARCH_HISTORY_FLUSH_INTERVAL = 5  # seconds
+SEARCH_HISTORY_COLLAPSE_WINDOW = 60  # seconds; repeats of the same search bump a counter
+# Popular-search summaries: counters kept per (country, sport) scope, and how
+# often each worker merges its counts into the shared copy (apps.search.suggestions)
+SEARCH_SUGGESTIONS_CAPACITY = 200
+SEARCH_SUGGESTIONS_PERSIST_INTERVAL = 60  # seconds
+# City autocomplete (apps.search.cities): seconds between picking up new
+# cities / full rebuilds, cities kept per country, optional offline gazetteer
+CITY_AUTOCOMPLETE_REFRESH = 60
+CITY_AUTOCOMPLETE_REBUILD = 60 * 60
+CITY_AUTOCOMPLETE_MAX_PER_COUNTRY = 5000
+CITY_GAZETTEER_PATH = BASE_DIR / 'data' / 'cities.txt'
+# Partner search results are cached per normalized filters and ranking context (apps.search.results);
+# profile writes invalidate them, the timeout only bounds memory
+SEARCH_RESULTS_CACHE_TIMEOUT = 60 * 60
+SEARCH_RESULTS_CACHE_MAX_IDS = 1000  # ranked ids kept per entry
+SEARCH_RESULTS_COUNT_CAP = 1000  # "1000+ partners found" past this
+# Recommendations shown are marked viewed in bulk on a background thread (apps.search.feed)
+RECOMMENDATIONS_VIEWED_ASYNC = True
+# Rows kept per user and recommendation run (apps.search.generations)
+RECOMMENDATIONS_PER_USER = 50
+# In-memory profile columns for matching, when NumPy is installed (apps.search.profile_store)
+PROFILE_STORE_REFRESH = 60
+PROFILE_STORE_REBUILD = 60 * 60
+# Directory of the snapshot shared by every worker, published by publish_profile_snapshot
+# (apps.search.snapshot_files); '' = each process builds its own
+PROFILE_STORE_DIR = config('PROFILE_STORE_DIR', default='')
+# Raw rows older than this are deleted once rolled up (rollup_search_history)
+SEARCH_HISTORY_RETENTION_DAYS = config('SEARCH_HISTORY_RETENTION_DAYS', default=90, cast=int)
+
+# Avatar variants generated at upload time (px, square; see apps.users.thumbnails)
+AVATAR_THUMBNAIL_SIZES = (40, 48, 60, 200)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -157,6 +267,16 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',  # Fallback to default
 ]
 
+# Login / signup / resend-verification throttling (see apps.users.throttling)
+# scope -> {key type: (max attempts, window in seconds)}
+AUTH_THROTTLE_RATES = {
+    'login': {'ip': (20, 5 * 60), 'email': (5, 5 * 60)},
+    'signup': {'ip': (20, 60 * 60), 'email': (5, 60 * 60)},
+    'resend_verification': {'ip': (10, 60 * 60), 'email': (3, 60 * 60)},
+}
+# Only enable behind a reverse proxy that sets X-Forwarded-For
+AUTH_THROTTLE_TRUST_X_FORWARDED_FOR = config('AUTH_THROTTLE_TRUST_X_FORWARDED_FOR', default=False, cast=bool)
+
 # Authentication URLs
 # Authentication URLs
 LOGIN_URL = 'users:login'  # This will now resolve to /accounts/login/
@@ -14,3 +14,18 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Compile templates, build the URL resolver and prime caches before this
+# worker takes its first request (see apps.core.warmup)
+from django.conf import settings  # noqa: E402
+
+if settings.WARMUP_ON_STARTUP:
+    from django.db import connections  # noqa: E402
+
+    from apps.core.warmup import warm_up  # noqa: E402
+    try:
+        warm_up()
+    finally:
+        # A pre-fork server (gunicorn --preload) imports this module before
+        # forking; workers must not share the connections opened here
+        connections.close_all()